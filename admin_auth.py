@@ -0,0 +1,35 @@
+# admin_auth.py
+"""
+运维接口（/metrics、/admin/profile、/api/db/pool-stats、/api/cache/stats、POST /api/jobs/<id>/retry）的访问控制。
+
+- 设置了 MEDHUB_ADMIN_TOKEN：请求需带 Authorization: Bearer <token>（或 X-Admin-Token: <token>）
+- 未设置：只允许本机访问（127.0.0.1 / ::1）。前面有同机的 nginx 等反向代理时所有请求都来自本机，
+  这种部署必须设置 MEDHUB_ADMIN_TOKEN，或在代理上屏蔽这些路径
+
+用法：在视图函数上加 @require_admin
+"""
+
+import hmac
+import os
+from functools import wraps
+
+ADMIN_TOKEN = os.environ.get("MEDHUB_ADMIN_TOKEN", "")
+LOCAL_ADDRS = {"127.0.0.1", "::1"}
+
+
+def is_admin_request(request):
+    if ADMIN_TOKEN:
+        auth = request.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else request.headers.get("X-Admin-Token", "")
+        return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+    return request.remote_addr in LOCAL_ADDRS
+
+
+def require_admin(view):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        from flask import jsonify, request
+        if not is_admin_request(request):
+            return jsonify({"success": False, "message": "forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapped
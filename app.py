@@ -1,64 +1,143 @@
 # app.py
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from db_utils import get_connection
-from werkzeug.utils import secure_filename
+from db_utils import get_connection, get_pool_stats
+from pagination import parse_page_args, apply_keyset, split_page
+from streaming import stream_format, stream_rows
+from bulk import BULK_MAX_ROWS, insert_many, summarize
+import schema
+from cache import reference_cache
+import cache
+from conditional import table_version, version_validators, not_modified, with_validators
+from blob_store import BlobStore, blob_lock, reference_count, modality_dir_for, file_format_of
+from contextlib import nullcontext
+from jobs_api import jobs_bp
+from search_api import search_bp
+from search import has_index, phrase_matchable
+from tasks import enqueue_postprocess, purge_derived
+from stats_api import stats_bp
+import stats_aggregates
+import metrics
+import profiler
+from admin_auth import require_admin
+from appointment_stats import BREAKDOWNS, GRANULARITIES, appointment_statistics, parse_window, window_ttl
 import os
 
 # Flask 应用，当前目录作为静态目录（便于前端访问文件）
 app = Flask(__name__, static_folder=".", static_url_path="/")
 CORS(app)
+app.register_blueprint(jobs_bp)   # /api/jobs（后台任务状态）
+app.register_blueprint(search_bp)   # /api/search（全文检索）
+app.register_blueprint(stats_bp)   # /api/stats/sankey, /api/statistics/monthly（读汇总表）
+# 多模态蓝图：文件下载（Range / 条件请求）、分片上传、缩略图 variant、时间序列 series。
+# 它也定义了 GET/POST /api/multimodal 和 DELETE /api/multimodal/<id>，与本文件中的同名路由完全相同；
+# 本文件的路由先注册，匹配时优先，这几个接口保持 code/message/data 的返回格式
+from multimodal import multimodal_bp
+app.register_blueprint(multimodal_bp)
+metrics.init_app(app)   # /metrics（Prometheus 文本格式）
+profiler.init_app(app)  # MEDHUB_PROFILE=1 时：慢查询日志 + /admin/profile
+cache.init_from_env()   # MEDHUB_CACHE_URL 设置时参考数据缓存改用 Redis，多进程间失效同步
 
 # 上传文件统一存放目录（在后端根目录下自动创建）
 UPLOAD_ROOT = "uploaded_files"
 os.makedirs(UPLOAD_ROOT, exist_ok=True)
 
+# 按内容寻址存储：uploaded_files/<modality>/blobs/ab/cd/<sha256>.<ext>
+blob_store = BlobStore(UPLOAD_ROOT)
+
 
 # 统一响应封装
-def ok(data=None, message="ok"):
-    return jsonify({"code": 0, "message": message, "data": data})
+def ok(data=None, message="ok", **extra):
+    body = {"code": 0, "message": message, "data": data}
+    body.update(extra)
+    return jsonify(body)
 
 
 def error(message="error", code=1):
     return jsonify({"code": code, "message": message, "data": None})
 
 
+# 批量新增的公共流程：请求体为对象数组（或 {"items": [...]}），逐行返回成功/失败
+def bulk_create(sql, to_params, metric=None):
+    items = request.get_json(silent=True)
+    if isinstance(items, dict):
+        items = items.get("items")
+    if not isinstance(items, list) or not items:
+        return error("request body must be a non-empty array", code=400)
+    if len(items) > BULK_MAX_ROWS:
+        return error(f"at most {BULK_MAX_ROWS} rows per request", code=400)
+
+    results = [(False, "item must be an object")] * len(items)
+    valid = [(i, item) for i, item in enumerate(items) if isinstance(item, dict)]
+    conn = get_connection()
+    try:
+        db_results = insert_many(conn, sql, [to_params(item) for _, item in valid])
+        if metric:
+            # 各块已分别提交，汇总表单独一个事务；中途失败由定时刷新修正
+            stats_aggregates.apply(conn, metric, [item.get("id") for (_, item), (success, _)
+                                                  in zip(valid, db_results) if success])
+    finally:
+        conn.close()
+    for (i, _), r in zip(valid, db_results):
+        results[i] = r
+
+    ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+    return ok(summarize(results, ids), message="batch processed")
+
+
+# 连接池监控
+@app.get("/api/db/pool-stats")
+@require_admin
+def pool_stats():
+    return ok(get_pool_stats())
+
+
+# 参考数据缓存命中统计
+@app.get("/api/cache/stats")
+@require_admin
+def cache_stats():
+    return ok(reference_cache.stats())
+
+
 # =========================
 # 1. departments 科室
 # =========================
 
+def _load_departments():
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM departments")
+        rows = schema.DEPARTMENTS.fetch_all(cur)
+        cur.close()
+    return rows
+
+
 @app.get("/api/departments")
 def list_departments():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM departments")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return ok(rows)
+    return ok(reference_cache.get_or_load("departments", "all", _load_departments))
 
 
 @app.post("/api/departments")
 def create_department():
     data = request.json or {}
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = "INSERT INTO departments (id, name, location) VALUES (%s, %s, %s)"
-    cur.execute(sql, (data.get("id"), data.get("name"), data.get("location")))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = "INSERT INTO departments (id, name, location) VALUES (%s, %s, %s)"
+        cur.execute(sql, (data.get("id"), data.get("name"), data.get("location")))
+        conn.commit()
+        cur.close()
+    reference_cache.invalidate("departments")
     return ok(message="created")
 
 
 @app.delete("/api/departments/<dept_id>")
 def delete_department(dept_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM departments WHERE id=%s", (dept_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM departments WHERE id=%s", (dept_id,))
+        conn.commit()
+        cur.close()
+    reference_cache.invalidate("departments")
     return ok(message="deleted")
 
 
@@ -66,60 +145,66 @@ def delete_department(dept_id):
 # 2. doctors 医生
 # =========================
 
+def _load_doctors(department_id):
+    with get_connection() as conn:
+        cur = conn.cursor()
+        if department_id:
+            cur.execute(
+                "SELECT id, name, department_id, title, specialty, phone "
+                "FROM doctors WHERE department_id=%s",
+                (department_id,),
+            )
+        else:
+            cur.execute("SELECT id, name, department_id, title, specialty, phone FROM doctors")
+        rows = schema.DOCTORS.fetch_all(cur)
+        cur.close()
+    return rows
+
+
 @app.get("/api/doctors")
 def list_doctors():
     department_id = request.args.get("departmentId")
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    if department_id:
-        cur.execute(
-            "SELECT id, name, department_id, title, specialty, phone "
-            "FROM doctors WHERE department_id=%s",
-            (department_id,),
-        )
-    else:
-        cur.execute("SELECT id, name, department_id, title, specialty, phone FROM doctors")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    rows = reference_cache.get_or_load(
+        "doctors", department_id or "all", lambda: _load_doctors(department_id)
+    )
     return ok(rows)
 
 
 @app.post("/api/doctors")
 def create_doctor():
     data = request.json or {}
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO doctors (id, name, password, department_id, title, specialty, phone)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """
-    cur.execute(
-        sql,
-        (
-            data.get("id"),
-            data.get("name"),
-            data.get("password", "123456"),
-            data.get("departmentId"),
-            data.get("title"),
-            data.get("specialty"),
-            data.get("phone"),
-        ),
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO doctors (id, name, password, department_id, title, specialty, phone)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        cur.execute(
+            sql,
+            (
+                data.get("id"),
+                data.get("name"),
+                data.get("password", "123456"),
+                data.get("departmentId"),
+                data.get("title"),
+                data.get("specialty"),
+                data.get("phone"),
+            ),
+        )
+        conn.commit()
+        cur.close()
+    reference_cache.invalidate("doctors")
     return ok(message="created")
 
 
 @app.delete("/api/doctors/<doc_id>")
 def delete_doctor(doc_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM doctors WHERE id=%s", (doc_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM doctors WHERE id=%s", (doc_id,))
+        conn.commit()
+        cur.close()
+    reference_cache.invalidate("doctors")
     return ok(message="deleted")
 
 
@@ -127,50 +212,53 @@ def delete_doctor(doc_id):
 # 3. medicines 药品
 # =========================
 
+def _load_medicines():
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM medicines")
+        rows = schema.MEDICINES.fetch_all(cur)
+        cur.close()
+    return rows
+
+
 @app.get("/api/medicines")
 def list_medicines():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM medicines")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return ok(rows)
+    return ok(reference_cache.get_or_load("medicines", "all", _load_medicines))
 
 
 @app.post("/api/medicines")
 def create_medicine():
     data = request.json or {}
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO medicines (id, name, price, stock, specification)
-        VALUES (%s, %s, %s, %s, %s)
-    """
-    cur.execute(
-        sql,
-        (
-            data.get("id"),
-            data.get("name"),
-            data.get("price"),
-            data.get("stock"),
-            data.get("specification"),
-        ),
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO medicines (id, name, price, stock, specification)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        cur.execute(
+            sql,
+            (
+                data.get("id"),
+                data.get("name"),
+                data.get("price"),
+                data.get("stock"),
+                data.get("specification"),
+            ),
+        )
+        conn.commit()
+        cur.close()
+    reference_cache.invalidate("medicines")
     return ok(message="created")
 
 
 @app.delete("/api/medicines/<med_id>")
 def delete_medicine(med_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM medicines WHERE id=%s", (med_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM medicines WHERE id=%s", (med_id,))
+        conn.commit()
+        cur.close()
+    reference_cache.invalidate("medicines")
     return ok(message="deleted")
 
 
@@ -181,59 +269,75 @@ def delete_medicine(med_id):
 @app.get("/api/patients")
 def list_patients():
     name_kw = request.args.get("name")
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    if name_kw:
-        cur.execute(
-            "SELECT id, name, gender, age, phone, address, create_time "
-            "FROM patients WHERE name LIKE %s",
-            (f"%{name_kw}%",),
-        )
-    else:
-        cur.execute("SELECT id, name, gender, age, phone, address, create_time FROM patients")
-    rows = cur.fetchall()
-    for r in rows:
-        r["createTime"] = r.pop("create_time")
-    cur.close()
-    conn.close()
-    return ok(rows)
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return error(str(e), code=400)
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = "SELECT id, name, gender, age, phone, address, create_time FROM patients WHERE 1=1"
+        params = []
+        if name_kw:
+            if phrase_matchable(name_kw) and has_index(conn, "patients", "ft_patients_name"):
+                # ngram 全文索引上的短语查询，不扫全表；过短、含标点或 InnoDB 停用词的关键词
+                # MATCH 会漏行（见 search.phrase_matchable），仍用 LIKE
+                sql += " AND MATCH(name) AGAINST (%s IN BOOLEAN MODE)"
+                params.append('"%s"' % name_kw)
+            else:
+                sql += " AND name LIKE %s"
+                params.append(f"%{name_kw}%")
+        sql, params = apply_keyset(sql, params, after, limit)
+        cur.execute(sql, tuple(params))
+        rows, next_cursor = split_page(schema.PATIENTS.fetch_all(cur), limit)
+        cur.close()
+    return ok(rows, nextCursor=next_cursor)
+
+
+PATIENT_INSERT_SQL = """
+    INSERT INTO patients (id, name, password, gender, age, phone, address, create_time)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, CURDATE())
+"""
+
+
+def _patient_params(data):
+    return (
+        data.get("id"),
+        data.get("name"),
+        data.get("password", "123456"),
+        data.get("gender"),
+        data.get("age"),
+        data.get("phone"),
+        data.get("address"),
+    )
 
 
 @app.post("/api/patients")
 def create_patient():
     data = request.json or {}
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO patients (id, name, password, gender, age, phone, address, create_time)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, CURDATE())
-    """
-    cur.execute(
-        sql,
-        (
-            data.get("id"),
-            data.get("name"),
-            data.get("password", "123456"),
-            data.get("gender"),
-            data.get("age"),
-            data.get("phone"),
-            data.get("address"),
-        ),
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(PATIENT_INSERT_SQL, _patient_params(data))
+        conn.commit()
+        # 汇总表在业务提交后单独累加，不在业务事务里持有计数行的锁
+        stats_aggregates.apply(conn, "patients", [data.get("id")])
+        cur.close()
     return ok(message="created")
 
 
+@app.post("/api/patients/batch")
+def create_patients_batch():
+    return bulk_create(PATIENT_INSERT_SQL, _patient_params, metric="patients")
+
+
 @app.delete("/api/patients/<pid>")
 def delete_patient(pid):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM patients WHERE id=%s", (pid,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        deltas = stats_aggregates.collect(conn, "patients", [pid], -1)
+        cur.execute("DELETE FROM patients WHERE id=%s", (pid,))
+        conn.commit()
+        stats_aggregates.apply_deltas(conn, deltas)
+        cur.close()
     return ok(message="deleted")
 
 
@@ -245,8 +349,6 @@ def delete_patient(pid):
 def list_medical_records():
     patient_id = request.args.get("patientId")
     doctor_id = request.args.get("doctorId")
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
     sql = "SELECT * FROM medical_records WHERE 1=1"
     params = []
     if patient_id:
@@ -255,53 +357,70 @@ def list_medical_records():
     if doctor_id:
         sql += " AND doctor_id=%s"
         params.append(doctor_id)
-    cur.execute(sql, tuple(params))
-    rows = cur.fetchall()
-    for r in rows:
-        r["patientId"] = r.pop("patient_id")
-        r["doctorId"] = r.pop("doctor_id")
-        r["treatmentPlan"] = r.pop("treatment_plan")
-        r["visitDate"] = r.pop("visit_date")
-    cur.close()
-    conn.close()
-    return ok(rows)
+
+    # 流式导出：?format=ndjson / ?format=json
+    fmt = stream_format(request.args)
+    if fmt:
+        return stream_rows(get_connection, sql + " ORDER BY id", params,
+                           schema.MEDICAL_RECORDS, fmt)
+
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return error(str(e), code=400)
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql, params = apply_keyset(sql, params, after, limit)
+        cur.execute(sql, tuple(params))
+        rows, next_cursor = split_page(schema.MEDICAL_RECORDS.fetch_all(cur), limit)
+        cur.close()
+    return ok(rows, nextCursor=next_cursor)
+
+
+MEDICAL_RECORD_INSERT_SQL = """
+    INSERT INTO medical_records
+    (id, patient_id, doctor_id, diagnosis, treatment_plan, visit_date)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def _medical_record_params(data):
+    return (
+        data.get("id"),
+        data.get("patientId"),
+        data.get("doctorId"),
+        data.get("diagnosis"),
+        data.get("treatmentPlan"),
+        data.get("visitDate"),
+    )
 
 
 @app.post("/api/medical-records")
 def create_medical_record():
     data = request.json or {}
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO medical_records
-        (id, patient_id, doctor_id, diagnosis, treatment_plan, visit_date)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    cur.execute(
-        sql,
-        (
-            data.get("id"),
-            data.get("patientId"),
-            data.get("doctorId"),
-            data.get("diagnosis"),
-            data.get("treatmentPlan"),
-            data.get("visitDate"),
-        ),
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(MEDICAL_RECORD_INSERT_SQL, _medical_record_params(data))
+        conn.commit()
+        stats_aggregates.apply(conn, "visits", [data.get("id")])
+        cur.close()
     return ok(message="created")
 
 
+@app.post("/api/medical-records/batch")
+def create_medical_records_batch():
+    return bulk_create(MEDICAL_RECORD_INSERT_SQL, _medical_record_params, metric="visits")
+
+
 @app.delete("/api/medical-records/<mrid>")
 def delete_medical_record(mrid):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM medical_records WHERE id=%s", (mrid,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        deltas = stats_aggregates.collect(conn, "visits", [mrid], -1)
+        cur.execute("DELETE FROM medical_records WHERE id=%s", (mrid,))
+        conn.commit()
+        stats_aggregates.apply_deltas(conn, deltas)
+        cur.close()
     return ok(message="deleted")
 
 
@@ -312,57 +431,65 @@ def delete_medical_record(mrid):
 @app.get("/api/prescriptions")
 def list_prescriptions():
     record_id = request.args.get("recordId")
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    if record_id:
-        cur.execute("SELECT * FROM prescription_details WHERE record_id=%s", (record_id,))
-    else:
-        cur.execute("SELECT * FROM prescription_details")
-    rows = cur.fetchall()
-    for r in rows:
-        r["recordId"] = r.pop("record_id")
-        r["medicineId"] = r.pop("medicine_id")
-        r["usageInfo"] = r.pop("usage_info")
-    cur.close()
-    conn.close()
-    return ok(rows)
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return error(str(e), code=400)
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = "SELECT * FROM prescription_details WHERE 1=1"
+        params = []
+        if record_id:
+            sql += " AND record_id=%s"
+            params.append(record_id)
+        sql, params = apply_keyset(sql, params, after, limit)
+        cur.execute(sql, tuple(params))
+        rows, next_cursor = split_page(schema.PRESCRIPTION_DETAILS.fetch_all(cur), limit)
+        cur.close()
+    return ok(rows, nextCursor=next_cursor)
+
+
+PRESCRIPTION_INSERT_SQL = """
+    INSERT INTO prescription_details
+    (id, record_id, medicine_id, dosage, usage_info, days)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def _prescription_params(data):
+    return (
+        data.get("id"),
+        data.get("recordId"),
+        data.get("medicineId"),
+        data.get("dosage"),
+        data.get("usageInfo"),
+        data.get("days"),
+    )
 
 
 @app.post("/api/prescriptions")
 def create_prescription():
     data = request.json or {}
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO prescription_details
-        (id, record_id, medicine_id, dosage, usage_info, days)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    cur.execute(
-        sql,
-        (
-            data.get("id"),
-            data.get("recordId"),
-            data.get("medicineId"),
-            data.get("dosage"),
-            data.get("usageInfo"),
-            data.get("days"),
-        ),
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(PRESCRIPTION_INSERT_SQL, _prescription_params(data))
+        conn.commit()
+        cur.close()
     return ok(message="created")
 
 
+@app.post("/api/prescriptions/batch")
+def create_prescriptions_batch():
+    return bulk_create(PRESCRIPTION_INSERT_SQL, _prescription_params)
+
+
 @app.delete("/api/prescriptions/<preid>")
 def delete_prescription(preid):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM prescription_details WHERE id=%s", (preid,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM prescription_details WHERE id=%s", (preid,))
+        conn.commit()
+        cur.close()
     return ok(message="deleted")
 
 
@@ -373,64 +500,112 @@ def delete_prescription(preid):
 @app.get("/api/appointments")
 def list_appointments():
     status = request.args.get("status")
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return error(str(e), code=400)
+    where = " WHERE 1=1"
+    params = []
     if status:
-        cur.execute("SELECT * FROM appointments WHERE status=%s", (status,))
-    else:
-        cur.execute("SELECT * FROM appointments")
-    rows = cur.fetchall()
-    for r in rows:
-        r["patientName"] = r.pop("patient_name")
-        r["patientPhone"] = r.pop("patient_phone")
-        r["departmentId"] = r.pop("department_id")
-        r["doctorId"] = r.pop("doctor_id")
-        r["createTime"] = r.pop("create_time")
-    cur.close()
-    conn.close()
-    return ok(rows)
+        where += " AND status=%s"
+        params.append(status)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        # 条件请求：状态会被原地更新，版本号取 ON UPDATE 维护的 updated_at（migrations/v004）
+        version = table_version(cur, "appointments", where, params, ts_column="updated_at")
+        etag, last_modified = version_validators(version)
+        resp = not_modified(etag, last_modified)
+        if resp is not None:
+            cur.close()
+            return resp
+
+        sql, params = apply_keyset("SELECT * FROM appointments" + where, params, after, limit)
+        cur.execute(sql, tuple(params))
+        rows, next_cursor = split_page(schema.APPOINTMENTS.fetch_all(cur), limit)
+        cur.close()
+    return with_validators(ok(rows, nextCursor=next_cursor), etag, last_modified)
+
+
+# 挂号统计：?date=2025-06&granularity=hour|day|week&by=department|doctor
+@app.get("/api/appointments/statistics")
+def appointment_statistics_view():
+    granularity = request.args.get("granularity", "hour")
+    by = request.args.get("by") or None
+    if granularity not in GRANULARITIES:
+        return error(f"granularity must be one of {', '.join(GRANULARITIES)}", code=400)
+    if by is not None and by not in BREAKDOWNS:
+        return error(f"by must be one of {', '.join(BREAKDOWNS)}", code=400)
+    try:
+        start, end = parse_window(request.args.get("date"))
+    except ValueError:
+        return error("Invalid date format", code=400)
+
+    def load():
+        conn = get_connection()
+        try:
+            return appointment_statistics(conn, granularity, by, start, end)
+        finally:
+            conn.close()
+
+    key = f"{granularity}:{by}:{start}:{end}"
+    stats = reference_cache.get_or_load("appointment_stats", key, load, ttl=window_ttl(end))
+    return ok(stats)
+
+
+APPOINTMENT_INSERT_SQL = """
+    INSERT INTO appointments
+    (id, patient_name, patient_phone, age, gender,
+     department_id, doctor_id, description, status, create_time)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+
+def _appointment_params(data):
+    return (
+        data.get("id"),
+        data.get("patientName"),
+        data.get("patientPhone"),
+        data.get("age"),
+        data.get("gender"),
+        data.get("departmentId"),
+        data.get("doctorId"),
+        data.get("description"),
+        data.get("status"),
+        data.get("createTime"),
+    )
 
 
 @app.post("/api/appointments")
 def create_appointment():
     data = request.json or {}
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO appointments
-        (id, patient_name, patient_phone, age, gender,
-         department_id, doctor_id, description, status, create_time)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """
-    cur.execute(
-        sql,
-        (
-            data.get("id"),
-            data.get("patientName"),
-            data.get("patientPhone"),
-            data.get("age"),
-            data.get("gender"),
-            data.get("departmentId"),
-            data.get("doctorId"),
-            data.get("description"),
-            data.get("status"),
-            data.get("createTime"),  
-        ),
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(APPOINTMENT_INSERT_SQL, _appointment_params(data))
+        conn.commit()
+        stats_aggregates.apply(conn, "appointments", [data.get("id")])
+        cur.close()
+    reference_cache.invalidate("appointment_stats")
     return ok(message="created")
 
 
+@app.post("/api/appointments/batch")
+def create_appointments_batch():
+    resp = bulk_create(APPOINTMENT_INSERT_SQL, _appointment_params, metric="appointments")
+    reference_cache.invalidate("appointment_stats")
+    return resp
+
+
 @app.delete("/api/appointments/<apid>")
 def delete_appointment(apid):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM appointments WHERE id=%s", (apid,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        deltas = stats_aggregates.collect(conn, "appointments", [apid], -1)
+        cur.execute("DELETE FROM appointments WHERE id=%s", (apid,))
+        conn.commit()
+        stats_aggregates.apply_deltas(conn, deltas)
+        cur.close()
+    reference_cache.invalidate("appointment_stats")
     return ok(message="deleted")
 
 
@@ -442,33 +617,42 @@ def delete_appointment(apid):
 def list_multimodal():
     modality = request.args.get("modality")
     patient_id = request.args.get("patientId")
-
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    sql = "SELECT * FROM multimodal_data WHERE 1=1"
+    where = " WHERE 1=1"
     params = []
     if modality:
-        sql += " AND modality=%s"
+        where += " AND modality=%s"
         params.append(modality)
     if patient_id:
-        sql += " AND patient_id=%s"
+        where += " AND patient_id=%s"
         params.append(patient_id)
-    cur.execute(sql, tuple(params))
-    rows = cur.fetchall()
-
-    for r in rows:
-        r["patientId"] = r.pop("patient_id")
-        r["recordId"] = r.pop("record_id")
-        r["sourceTable"] = r.pop("source_table")
-        r["sourcePk"] = r.pop("source_pk")
-        r["textContent"] = r.pop("text_content")
-        r["filePath"] = r.pop("file_path")
-        r["fileFormat"] = r.pop("file_format")
-        r["createdAt"] = r.pop("created_at")
-
-    cur.close()
-    conn.close()
-    return ok(rows)
+    sql = "SELECT * FROM multimodal_data" + where
+
+    # 流式导出：?format=ndjson / ?format=json
+    fmt = stream_format(request.args)
+    if fmt:
+        return stream_rows(get_connection, sql + " ORDER BY id", params,
+                           schema.MULTIMODAL_DATA, fmt)
+
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return error(str(e), code=400)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        version = table_version(cur, "multimodal_data", where, params, ts_column="created_at")
+        etag, last_modified = version_validators(version)
+        resp = not_modified(etag, last_modified)
+        if resp is not None:
+            cur.close()
+            return resp
+
+        sql, params = apply_keyset(sql, params, after, limit)
+        cur.execute(sql, tuple(params))
+        rows, next_cursor = split_page(schema.MULTIMODAL_DATA.fetch_all(cur), limit)
+
+        cur.close()
+    return with_validators(ok(rows, nextCursor=next_cursor), etag, last_modified)
 
 
 @app.post("/api/multimodal")
@@ -492,77 +676,80 @@ def create_multimodal():
 
     file_path = None
     file_format = None
+    tmp_path = None
 
-    if upload_file:
-        filename = secure_filename(upload_file.filename)
-        file_format = filename.split(".")[-1].lower()
-        # 保存到 uploaded_files 下
-        saved_path = os.path.join(UPLOAD_ROOT, filename)
-        upload_file.save(saved_path)
-        file_path = saved_path  # 写入数据库的路径
+    if upload_file and upload_file.filename:
+        # 先落临时文件并计算 sha256，相同内容只存一份（见 blob_store.py）
+        file_format = file_format_of(upload_file.filename)
+        tmp_path, sha256 = blob_store.spool(upload_file.stream)
+        modality_dir = modality_dir_for(form.get("modality"))
+        file_path = blob_store.blob_path(modality_dir, sha256, file_format)  # 写入数据库的路径
 
-    conn = get_connection()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO multimodal_data
-        (id, patient_id, record_id, source_table, source_pk,
-         modality, text_content, file_path, file_format, description)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """
-    cur.execute(
-        sql,
-        (
-            form.get("id"),
-            form.get("patientId"),
-            form.get("recordId"),
-            form.get("sourceTable"),
-            form.get("sourcePk"),
-            form.get("modality"),
-            form.get("textContent"),
-            file_path,
-            file_format,
-            form.get("description"),
-        ),
-    )
+    params = schema.multimodal_values(form.get, file_path, file_format, source_defaults=False)
 
-    conn.commit()
-    cur.close()
-    conn.close()
-    return ok(message="created", data={"filePath": file_path})
+    with get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            with blob_lock(conn, file_path) if file_path else nullcontext():
+                created = False
+                try:
+                    # 先写记录（主键重复等在移动文件前失败），再把临时文件移入存储、提交
+                    cur.execute(schema.INSERT_MULTIMODAL_SQL, params)
+                    # 派生图等上传后处理交给后台任务（worker.py），与记录一起提交
+                    job_ids = []
+                    if tmp_path:
+                        job_ids = enqueue_postprocess(conn, form.get("id"), file_path, form.get("modality"))
+                        _, created = blob_store.ingest_file(tmp_path, sha256, modality_dir, file_format)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    if created:
+                        blob_store.restore(file_path, tmp_path)
+                    raise
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            cur.close()
+    return ok(message="created", data={"filePath": file_path, "jobIds": job_ids})
 
 
 @app.delete("/api/multimodal/<mid>")
 def delete_multimodal(mid):
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
 
-    # 1. 查文件路径
-    cur.execute("SELECT file_path FROM multimodal_data WHERE id=%s", (mid,))
-    row = cur.fetchone()
+        # 1. 查文件路径
+        cur.execute("SELECT file_path FROM multimodal_data WHERE id=%s", (mid,))
+        row = cur.fetchone()
 
-    if row is None:
-        cur.close()
-        conn.close()
-        return error("record not found", code=404)
+        if row is None:
+            cur.close()
+            return error("record not found", code=404)
 
-    file_path = row["file_path"]
+        file_path = row["file_path"]
 
-    # 2. 删数据库记录
-    cur.execute("DELETE FROM multimodal_data WHERE id=%s", (mid,))
-    conn.commit()
-    cur.close()
-    conn.close()
+        # 2. 删数据库记录；同一文件可能被多条记录引用，与新增引用互斥地统计剩余引用数
+        with blob_lock(conn, file_path) if file_path else nullcontext():
+            cur.execute("DELETE FROM multimodal_data WHERE id=%s", (mid,))
+            remaining = reference_count(conn, file_path) if file_path else 0
+            conn.commit()
+        cur.close()
 
-    # 3. 删真实文件
-    if file_path and os.path.exists(file_path):
+    # 3. 最后一个引用删除后才删真实文件，连同派生图和时间序列导入结果
+    if file_path and not remaining and os.path.exists(file_path):
+        # 两步分开处理：派生图清理失败也要删源文件；即使删文件失败，也不影响数据库记录已删除
+        try:
+            purge_derived(os.path.normpath(os.path.abspath(file_path)))
+        except Exception:
+            pass
         try:
             os.remove(file_path)
         except Exception:
-            # 即使删文件失败，也不影响数据库记录已删除
             pass
 
     return ok(message="deleted file and record")
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # 仅用于本地开发；生产环境：gunicorn -c gunicorn.conf.py wsgi:app
+    app.run(host="0.0.0.0", port=5000, debug=os.environ.get("MEDHUB_DEBUG") == "1", threaded=True)
@@ -0,0 +1,85 @@
+# appointment_stats.py
+"""
+挂号统计：在 SQL 中按时间桶 GROUP BY，不再把每条 create_time 取回 Python 逐条计数。
+
+- granularity：hour（一天中的小时 0-23，与原接口相同）、day（日期）、week（所在周的周一）
+- by         ：可选，department / doctor，按科室或医生再分组
+- 时间窗口    ：date=YYYY / YYYY-MM / YYYY-MM-DD，条件为 create_time >= 起点 AND create_time < 终点，
+               create_time 上有索引时只扫描窗口内的行
+
+结果按 (粒度, 分组, 窗口) 缓存；已结束的窗口不会再变化（除非补录），缓存时间更长。
+"""
+
+import datetime
+
+# 粒度 -> 时间桶表达式（create_time 是 'YYYY-MM-DD HH:MM:SS' 字符串）
+GRANULARITIES = {
+    "hour": "HOUR(a.create_time)",
+    "day": "DATE(a.create_time)",
+    "week": "DATE_SUB(DATE(a.create_time), INTERVAL WEEKDAY(a.create_time) DAY)",
+}
+
+# 分组 -> (选出的列, JOIN, 返回字段名)
+BREAKDOWNS = {
+    "department": ("a.department_id, dept.name",
+                   "LEFT JOIN departments dept ON dept.id = a.department_id",
+                   ("departmentId", "departmentName")),
+    "doctor": ("a.doctor_id, d.name",
+               "LEFT JOIN doctors d ON d.id = a.doctor_id",
+               ("doctorId", "doctorName")),
+}
+
+OPEN_WINDOW_TTL = 60          # 包含今天的窗口（秒）
+CLOSED_WINDOW_TTL = 3600      # 已结束的窗口
+
+
+def parse_window(value):
+    """date 参数 -> (起点, 终点) 日期；格式不对抛 ValueError，空值返回 (None, None)"""
+    if not value:
+        return None, None
+    parts = value.split("-")
+    if len(parts) == 3:
+        start = datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        return start, start + datetime.timedelta(days=1)
+    if len(parts) == 2:
+        start = datetime.datetime.strptime(value, "%Y-%m").date()
+        return start, (start + datetime.timedelta(days=32)).replace(day=1)
+    if len(parts) == 1:
+        start = datetime.datetime.strptime(value, "%Y").date()
+        return start, start.replace(year=start.year + 1)
+    raise ValueError(value)
+
+
+def window_ttl(end, today=None):
+    today = today or datetime.date.today()
+    return CLOSED_WINDOW_TTL if end is not None and end <= today else OPEN_WINDOW_TTL
+
+
+def appointment_statistics(conn, granularity="hour", by=None, start=None, end=None):
+    """返回按时间桶（及科室 / 医生）分组的挂号数列表"""
+    bucket = GRANULARITIES[granularity]
+    columns, joins, names = BREAKDOWNS[by] if by else ("", "", ())
+
+    sql = f"SELECT {bucket} AS bucket{', ' + columns if columns else ''}, COUNT(*) " \
+          f"FROM appointments a {joins} WHERE {bucket} IS NOT NULL"
+    params = []
+    if start is not None:
+        sql += " AND a.create_time >= %s AND a.create_time < %s"
+        params += [start.isoformat(), end.isoformat()]
+    sql += f" GROUP BY bucket{', ' + columns if columns else ''} ORDER BY bucket, COUNT(*) DESC"
+
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, tuple(params))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    stats = []
+    for row in rows:
+        value = row[0]
+        item = {granularity: value.isoformat() if hasattr(value, "isoformat") else int(value)}
+        item.update(zip(names, row[1:-1]))
+        item["count"] = int(row[-1])
+        stats.append(item)
+    return stats
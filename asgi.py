@@ -0,0 +1,43 @@
+# asgi.py
+"""
+ASGI 入口：多模态接口由异步版本（multimodal_async.py）处理，其余请求转给 WSGI 应用（wsgi.py）。
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+    hypercorn asgi:app --bind 0.0.0.0:5000 --workers 4
+
+- 路径和方法能匹配异步蓝图中的路由时交给 Quart，否则交给 asgiref 包装的 Flask 应用（在线程池中执行），
+  包括 /series：wsgi:app 注册了多模态蓝图，见 wsgi.py
+- lifespan 事件交给 Quart：启动时建 aiomysql 连接池，停止时关闭
+- MEDHUB_ASYNC_BODY_TIMEOUT：接收请求体的超时秒数（分片上传的单个分片），默认 600
+
+依赖：pip install quart aiomysql aiofiles asgiref uvicorn
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart
+from werkzeug.exceptions import HTTPException
+
+import multimodal_async
+from wsgi import app as wsgi_app
+
+async_app = Quart(__name__)
+# 上传大小由分片上传会话自己限制（upload_sessions.MAX_UPLOAD_SIZE）
+async_app.config["MAX_CONTENT_LENGTH"] = None
+async_app.config["BODY_TIMEOUT"] = int(os.environ.get("MEDHUB_ASYNC_BODY_TIMEOUT", "600"))
+async_app.register_blueprint(multimodal_async.multimodal_async_bp)
+multimodal_async.init_app(async_app)
+
+fallback_app = WsgiToAsgi(wsgi_app)
+_async_routes = async_app.url_map.bind("")
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "http":
+        try:
+            _async_routes.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            await fallback_app(scope, receive, send)
+            return
+    await async_app(scope, receive, send)
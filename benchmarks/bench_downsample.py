@@ -0,0 +1,103 @@
+# benchmarks/bench_downsample.py
+"""
+时间序列降采样基准：原始 CSV 下发 vs /api/multimodal/<id>/series 的服务端降采样。
+
+用法：
+    python benchmarks/bench_downsample.py --points 1000000 --max-points 2000 --repeat 5
+
+不启动 Flask、不连接数据库：在临时目录生成一个血压 CSV（timestamp,systolic,diastolic），
+导入列式存储后分别测量：
+- raw csv      ：读出整个 CSV（服务端成本）+ 用 csv 模块解析（前端原本要做的解析，用 Python 近似）
+- series/*     ：加载内存映射 + 窗口 + 降采样 + JSON 序列化（与接口中的处理相同）
+全窗口与 10% 窗口各测一次；序列超过 PYRAMID_MIN_POINTS 时导入会建金字塔，查询会用到它。
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeseries import SeriesStore, to_json  # noqa: E402
+
+
+def make_csv(path, n):
+    rng = np.random.default_rng(42)
+    start = np.datetime64("2024-01-01T00:00:00", "s")
+    t = start + np.arange(n) * np.timedelta64(30, "s")          # 每 30 秒一个读数
+    day = np.sin(np.arange(n) * 2 * np.pi / 2880)                # 日节律
+    systolic = 120 + 10 * day + rng.normal(0, 4, n)
+    diastolic = 80 + 6 * day + rng.normal(0, 3, n)
+    stamps = np.datetime_as_string(t, unit="s")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("timestamp,systolic,diastolic\n")
+        for i in range(n):
+            f.write(f"{stamps[i].replace('T', ' ')},{systolic[i]:.1f},{diastolic[i]:.1f}\n")
+
+
+def raw_csv(path):
+    with open(path, "rb") as f:
+        body = f.read()
+    rows = list(csv.reader(io.StringIO(body.decode("utf-8"))))
+    return len(body), len(rows) - 1
+
+
+def series_api(store, path, start, end, max_points, method):
+    series = store.load(path)
+    t, values, _ = series.downsample(start, end, max_points, method)
+    body = json.dumps(to_json(t, values)).encode("utf-8")
+    return len(body), len(t)
+
+
+def best_of(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--max-points", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "patient_blood_pressure_bench.csv")
+        make_csv(path, args.points)
+        store = SeriesStore(os.path.join(tmp, ".series"))
+
+        started = time.perf_counter()
+        meta = store.ingest(path)
+        print(f"ingest: {args.points:,} points in {time.perf_counter() - started:.2f}s, "
+              f"pyramid levels: {meta.get('pyramid', [])}")
+
+        span = meta["end"] - meta["start"]
+        windows = [("full", None, None),
+                   ("10%", meta["start"] + span * 45 // 100, meta["start"] + span * 55 // 100)]
+
+        cases = [("raw csv (full)", lambda: raw_csv(path))]
+        for label, start, end in windows:
+            for method in ("lttb", "minmax"):
+                cases.append((f"series/{method} ({label})",
+                              lambda s=start, e=end, m=method:
+                              series_api(store, path, s, e, args.max_points, m)))
+
+        print(f"{'case':<26}{'latency ms':>12}{'bytes':>14}{'points':>12}")
+        for name, fn in cases:
+            seconds, (size, points) = best_of(fn, args.repeat)
+            print(f"{name:<26}{seconds * 1000:>12.1f}{size:>14,}{points:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_row_mapping.py
+"""
+行映射微基准：原先 “dictionary 游标 + 逐个 pop 改名” vs schema.TableMapper。
+
+用法：
+    python benchmarks/bench_row_mapping.py --rows 200000 --repeat 5
+
+不连接数据库，用与 multimodal_data / appointments 相同列结构的元组模拟游标返回的行。
+dictionary 游标本身就是对每行做 dict(zip(column_names, row))，这里按同样方式模拟。
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema  # noqa: E402
+
+MULTIMODAL_COLUMNS = (
+    "id", "patient_id", "record_id", "source_table", "source_pk", "modality",
+    "text_content", "file_path", "file_format", "description", "created_at",
+)
+APPOINTMENT_COLUMNS = (
+    "id", "patient_name", "patient_phone", "age", "gender", "department_id",
+    "doctor_id", "description", "status", "create_time",
+)
+
+
+def make_rows(n):
+    now = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    multimodal = [
+        (f"img_{i}", f"p{i % 1000}", None, "MedicalImage", f"CT{i}", "image",
+         None, f"uploaded_files/image/{i}.jpg", "jpg", "CT 影像", now)
+        for i in range(n)
+    ]
+    appointments = [
+        (f"ap{i}", "赵六", "13700000000", 50, "男", "dept1", "doc1", "胸闷", "pending", now)
+        for i in range(n)
+    ]
+    return multimodal, appointments
+
+
+def legacy_multimodal(rows):
+    out = [dict(zip(MULTIMODAL_COLUMNS, r)) for r in rows]
+    for r in out:
+        r["patientId"] = r.pop("patient_id")
+        r["recordId"] = r.pop("record_id")
+        r["sourceTable"] = r.pop("source_table")
+        r["sourcePk"] = r.pop("source_pk")
+        r["textContent"] = r.pop("text_content")
+        r["filePath"] = r.pop("file_path")
+        r["fileFormat"] = r.pop("file_format")
+        r["createdAt"] = r.pop("created_at")
+    return out
+
+
+def legacy_appointments(rows):
+    out = [dict(zip(APPOINTMENT_COLUMNS, r)) for r in rows]
+    for r in out:
+        r["patientName"] = r.pop("patient_name")
+        r["patientPhone"] = r.pop("patient_phone")
+        r["departmentId"] = r.pop("department_id")
+        r["doctorId"] = r.pop("doctor_id")
+        r["createTime"] = r.pop("create_time")
+    return out
+
+
+def best_of(fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    multimodal, appointments = make_rows(args.rows)
+
+    cases = [
+        ("multimodal_data", multimodal, legacy_multimodal,
+         lambda rows: schema.MULTIMODAL_DATA.map_rows(MULTIMODAL_COLUMNS, rows)),
+        ("appointments", appointments, legacy_appointments,
+         lambda rows: schema.APPOINTMENTS.map_rows(APPOINTMENT_COLUMNS, rows)),
+    ]
+
+    # 两种实现的输出必须一致
+    for name, rows, legacy, mapped in cases:
+        assert legacy(rows[:100]) == mapped(rows[:100]), name
+
+    print(f"{'table':<18}{'legacy rows/s':>16}{'mapper rows/s':>16}{'speedup':>10}")
+    for name, rows, legacy, mapped in cases:
+        t_old = best_of(legacy, rows, args.repeat)
+        t_new = best_of(mapped, rows, args.repeat)
+        print(f"{name:<18}{len(rows) / t_old:>16,.0f}{len(rows) / t_new:>16,.0f}{t_old / t_new:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# benchmarks/load_test.py
+"""
+接口压测：在独立的基准库里造数，并发请求各接口，输出吞吐、p50 / p95 / p99 延迟和内存，结果存 JSON 便于对比。
+
+用法：
+    # 1. 建基准库（表结构从业务库复制：CREATE TABLE ... LIKE）并造数
+    python benchmarks/load_test.py --database meddata_bench --seed --patients 20000
+    # 2. 压测（默认在进程内用 Flask 测试客户端驱动 app.py，不经过网络）
+    python benchmarks/load_test.py --database meddata_bench --concurrency 16 --duration 15 \\
+        --out benchmarks/results/after.json --compare benchmarks/results/before.json
+    # 也可以压已经启动的服务（此时 --server-pid 用来读取服务进程内存）
+    python benchmarks/load_test.py --database meddata_bench --url http://127.0.0.1:5000 --server-pid 12345
+
+- 造数交给 datagen.py（多进程、固定随机种子，同样的参数得到同样的数据，并在 uploaded_files/bench/ 下生成占位文件）
+- 各接口依次单独压测：先预热 --warmup 秒，再在 --duration 秒内统计
+- 内存：进程内模式为本进程 RSS（压测前 / 后 / 峰值），--url 模式读取 --server-pid 的 RSS
+- 不会在业务库上造数：--database 必须与业务库不同
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datagen  # noqa: E402
+import db_utils  # noqa: E402
+
+# 场景名 -> URL 模板（占位符来自 sample_values）
+SCENARIOS = {
+    "patients": "/api/patients?limit=100",
+    "patients_page": "/api/patients?limit=100&after={patient_id}",
+    "patients_name": "/api/patients?name={patient_name}",
+    "medical_records_by_patient": "/api/medical-records?patientId={patient_id}",
+    "appointments_by_status": "/api/appointments?status=pending",
+    "appointment_statistics": "/api/appointments/statistics?date={year}&by=department",
+    "multimodal": "/api/multimodal?limit=100",
+    "multimodal_by_modality": "/api/multimodal?modality=image&limit=100",
+    "multimodal_by_patient": "/api/multimodal?patientId={patient_id}",
+    "file": "{file_url}",
+}
+FILE_URLS = {
+    "static": "/{file_path}",                      # app.py：以静态文件方式提供
+    "api": "/api/multimodal/file/{id}",            # 多模态蓝图（app.py 与 create_app 都已注册）
+}
+
+
+# ---------- 基准库 ----------
+
+def prepare_database(database, source):
+    """建基准库，表结构从业务库复制"""
+    if database == source:
+        raise SystemExit("refusing to seed the application database, use a separate --database")
+    conn = db_utils.mysql.connector.connect(**dict(db_utils.DB_CONFIG, database=source))
+    try:
+        cur = conn.cursor()
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` DEFAULT CHARACTER SET utf8mb4")
+        for table in datagen.TABLES:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS `{database}`.`{table}` LIKE `{source}`.`{table}`")
+        cur.close()
+    finally:
+        conn.close()
+
+
+def seed(volumes, seed_value, processes, method, base_date=datagen.DEFAULT_BASE_DATE):
+    """用 datagen 在基准库造数（清空后重建）"""
+    datagen.generate(dict(db_utils.DB_CONFIG), volumes, seed_value, processes, method, truncate=True,
+                     root=ROOT, base_date=base_date)
+
+
+def sample_values(file_endpoint, base_date=datagen.DEFAULT_BASE_DATE):
+    conn = db_utils.get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, name FROM patients ORDER BY id LIMIT 1 OFFSET 100")
+        patient_id, patient_name = cur.fetchone() or ("", "")
+        cur.execute("SELECT id, file_path FROM multimodal_data WHERE file_path IS NOT NULL LIMIT 1")
+        mm_id, file_path = cur.fetchone() or ("", "")
+        cur.close()
+    finally:
+        conn.close()
+    values = {"patient_id": quote(patient_id), "patient_name": quote(patient_name[:2]),
+              # 造数日期以 base_date 为准，统计场景查它所在的年份，不随运行日期变化
+              "year": base_date[:4]}
+    values["file_url"] = FILE_URLS[file_endpoint].format(id=quote(mm_id), file_path=quote(file_path))
+    return values
+
+
+# ---------- 压测 ----------
+
+def _rss(pid=None):
+    """当前 RSS（字节）；读不到 /proc 时退回本进程峰值"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(int(round(p / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def get(self, path):
+        resp = self._client.get(path)
+        body = resp.get_data()         # 流式响应在这里才真正生成
+        return resp.status_code, len(body)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self._conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def get(self, path):
+        self._conn.request("GET", path)
+        resp = self._conn.getresponse()
+        body = resp.read()
+        return resp.status, len(body)
+
+
+def run_scenario(make_client, path, concurrency, duration, warmup, server_pid=None):
+    latencies, errors, sizes = [], [0], [0]
+    lock = threading.Lock()
+    phase = {"record": False, "stop": False}
+    peak = [0]
+
+    def worker():
+        client = make_client()
+        local, local_errors, local_bytes = [], 0, 0
+        while not phase["stop"]:
+            started = time.perf_counter()
+            try:
+                status, size = client.get(path)
+                ok = status < 400
+            except Exception:
+                ok, size = False, 0
+                client = make_client()
+            elapsed = time.perf_counter() - started
+            if phase["record"]:
+                local.append(elapsed)
+                local_bytes += size
+                local_errors += 0 if ok else 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+            sizes[0] += local_bytes
+
+    rss_before = _rss(server_pid)
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    time.sleep(warmup)
+    phase["record"] = True
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        time.sleep(0.2)
+        peak[0] = max(peak[0], _rss(server_pid))
+    phase["stop"] = True
+    elapsed = time.perf_counter() - started
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    return {
+        "path": path,
+        "requests": len(ms),
+        "errors": errors[0],
+        "throughput": round(len(ms) / elapsed, 2),
+        "p50Ms": round(_percentile(ms, 50), 3) if ms else None,
+        "p95Ms": round(_percentile(ms, 95), 3) if ms else None,
+        "p99Ms": round(_percentile(ms, 99), 3) if ms else None,
+        "maxMs": round(ms[-1], 3) if ms else None,
+        "avgBytes": round(sizes[0] / len(ms)) if ms else None,
+        "rssBeforeMb": round(rss_before / 2 ** 20, 1),
+        "rssPeakMb": round(max(peak[0], rss_before) / 2 ** 20, 1),
+        "rssAfterMb": round(_rss(server_pid) / 2 ** 20, 1),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\n{'scenario':<30}{'throughput':>14}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b or not b["requests"] or not r["requests"]:
+            continue
+
+        def delta(key):
+            return f"{(r[key] - b[key]) / b[key] * 100:+.1f}%" if b[key] else "n/a"
+        print(f"{name:<30}{delta('throughput'):>14}{delta('p50Ms'):>12}"
+              f"{delta('p95Ms'):>12}{delta('p99Ms'):>12}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MedData Hub API load test")
+    parser.add_argument("--database", required=True, help="基准库名（不能是业务库）")
+    parser.add_argument("--source-database", default=db_utils.DB_CONFIG["database"],
+                        help="复制表结构的业务库")
+    parser.add_argument("--seed", action="store_true", help="建库并造数后退出")
+    parser.add_argument("--seed-value", type=int, default=datagen.DEFAULT_SEED)
+    parser.add_argument("--base-date", default=datagen.DEFAULT_BASE_DATE,
+                        help="造数日期的基准日，压测时须与造数时一致")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="造数进程数")
+    parser.add_argument("--method", choices=("executemany", "load-data"), default="executemany",
+                        help="造数写入方式")
+    for table, count in datagen.DEFAULT_VOLUMES.items():
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, default=count, dest=table)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="逗号分隔")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="每个场景统计的秒数")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--url", help="压测已启动的服务，如 http://127.0.0.1:5000")
+    parser.add_argument("--server-pid", type=int, help="--url 模式下读取该进程的内存")
+    parser.add_argument("--file-endpoint", choices=FILE_URLS, default=None,
+                        help="文件场景走静态路径还是 /api/multimodal/file/<id>（进程内默认 static）")
+    parser.add_argument("--out", help="结果 JSON 路径")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    if args.database == args.source_database:
+        parser.error("--database must differ from the application database")
+    volumes = {table: getattr(args, table) for table in datagen.DEFAULT_VOLUMES}
+
+    if args.seed:
+        prepare_database(args.database, args.source_database)
+    # 连接池第一次使用时才创建，在此之前切到基准库
+    db_utils.DB_CONFIG["database"] = args.database
+    if args.seed:
+        seed(volumes, args.seed_value, args.processes, args.method, args.base_date)
+        return
+
+    unknown = [s for s in args.scenarios.split(",") if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    file_endpoint = args.file_endpoint or ("api" if args.url else "static")
+    values = sample_values(file_endpoint, args.base_date)
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+    else:
+        os.chdir(ROOT)                  # app.py 以当前目录为静态目录
+        from app import app
+
+        def make_client():
+            return InProcessClient(app)
+
+    results = {}
+    print(f"{'scenario':<30}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'errors':>8}{'rss MB':>9}")
+    for name in args.scenarios.split(","):
+        path = SCENARIOS[name].format(**values)
+        r = run_scenario(make_client, path, args.concurrency, args.duration, args.warmup,
+                         args.server_pid if args.url else None)
+        results[name] = r
+        print(f"{name:<30}{r['throughput']:>10}{r['p50Ms'] or '-':>10}{r['p95Ms'] or '-':>10}"
+              f"{r['p99Ms'] or '-':>10}{r['errors']:>8}{r['rssPeakMb']:>9}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "mode": "http" if args.url else "in-process",
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "database": args.database,
+        },
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"saved {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
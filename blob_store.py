@@ -0,0 +1,118 @@
+# blob_store.py
+"""
+上传文件的内容寻址存储（按 sha256 去重）。
+
+路径：<root>/<modality>/blobs/<sha[0:2]>/<sha[2:4]>/<sha256>.<ext>
+- 相同内容只存一份，同名不同内容的文件也不会再互相覆盖
+- 两级 256 路分片目录，单个模态有上百万文件时每个目录也只有几十个文件，按哈希直接定位
+- 引用计数即 multimodal_data 中 file_path 指向该文件的行数：删除记录后计数为 0 才删除文件
+- 新增引用与删除文件之间用 MySQL 命名锁（GET_LOCK）互斥，避免刚被引用的文件被删掉
+
+下面的路径工具和 lock_name 不依赖 Flask / 数据库驱动，app.py、multimodal.py、multimodal_async.py 共用。
+"""
+
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager
+
+COPY_CHUNK = 1024 * 1024
+LOCK_TIMEOUT = 10   # 秒
+
+MODALITY_DIRS = ["text", "image", "audio", "video", "pdf", "timeseries", "other"]
+
+
+def modality_dir_for(modality):
+    # 按模态分子目录，如：uploaded_files/image
+    return modality if modality in MODALITY_DIRS else "other"
+
+
+def file_format_of(filename):
+    # 取原始文件名的扩展名（secure_filename 会去掉中文，"心理咨询录音.mp3" 会变成 "mp3"）
+    _, ext = os.path.splitext(filename or "")
+    ext = ext.lstrip(".").lower()
+    return ext if ext.isalnum() and len(ext) <= 20 else None
+
+
+def relative_path(path):
+    # 存数据库用相对路径，相对于项目根目录，例如：uploaded_files/image/test.jpg
+    return os.path.relpath(path, os.getcwd()).replace("\\", "/")
+
+
+def absolute_path(file_path):
+    # 数据库中的相对路径 -> 绝对路径
+    return os.path.normpath(file_path if os.path.isabs(file_path) else os.path.join(os.getcwd(), file_path))
+
+
+def lock_name(key):
+    """blob_lock 使用的 MySQL 命名锁名（异步版本用同一个名字，两边互斥）"""
+    return "medhub_blob:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, ".uploads")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def blob_path(self, modality_dir, sha256, ext=None):
+        name = f"{sha256}.{ext}" if ext else sha256
+        return os.path.join(self.root, modality_dir, "blobs", sha256[:2], sha256[2:4], name)
+
+    def ingest_file(self, src_path, sha256, modality_dir, ext=None):
+        """
+        把已校验过哈希的文件放入存储：新内容时 src_path 被移走，内容已存在时 src_path 原样保留，
+        由调用方在数据库提交后删除。返回 (blob 绝对路径, 是否为新文件)
+        """
+        dest = self.blob_path(modality_dir, sha256, ext)
+        if os.path.exists(dest):
+            return dest, False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(src_path, dest)
+        return dest, True
+
+    def restore(self, dest, src_path):
+        """撤销 ingest_file 移入的新文件（提交失败时），文件移回 src_path，上传可以重试"""
+        os.replace(dest, src_path)
+
+    def spool(self, stream):
+        """把上传流写入临时文件并计算 sha256，返回 (临时文件路径, sha256)"""
+        tmp_path = os.path.join(self.tmp_dir, f"direct-{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                for data in iter(lambda: stream.read(COPY_CHUNK), b""):
+                    digest.update(data)
+                    f.write(data)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return tmp_path, digest.hexdigest()
+
+
+def reference_count(conn, file_path):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM multimodal_data WHERE file_path = %s", (file_path,))
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+
+
+@contextmanager
+def blob_lock(conn, key):
+    """按文件相对路径加 MySQL 命名锁（跨进程、跨机器有效）"""
+    name = lock_name(key)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT GET_LOCK(%s, %s)", (name, LOCK_TIMEOUT))
+        if cur.fetchone()[0] != 1:
+            raise TimeoutError(f"could not acquire blob lock for {key}")
+        try:
+            yield
+        finally:
+            cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cur.fetchone()
+    finally:
+        cur.close()
@@ -0,0 +1,65 @@
+# bulk.py
+"""
+批量插入工具。
+
+按 chunk_size 分块，每块先用 executemany 一次性写入（mysql-connector 会改写成
+多行 VALUES，一次往返）并提交；若该块中有坏行导致整体失败，则回滚该块，
+改为在同一事务里逐行插入，每行一个 SAVEPOINT，坏行只回滚自己，其余行照常提交。
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 500
+BULK_MAX_ROWS = 10000   # 单次请求最多接受的行数
+
+
+def insert_many(conn, sql, rows, chunk_size=BULK_CHUNK_SIZE):
+    """
+    rows: 参数元组列表
+    返回与 rows 等长的结果列表，每项为 (success, message)
+    """
+    results = [None] * len(rows)
+    cur = conn.cursor()
+    try:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                cur.executemany(sql, chunk)
+                conn.commit()
+                for i in range(start, start + len(chunk)):
+                    results[i] = (True, None)
+            except Exception as e:
+                conn.rollback()
+                logger.warning("Bulk chunk at %d failed (%s), retrying row by row.", start, e)
+                _insert_rows_with_savepoints(conn, cur, sql, chunk, start, results)
+    finally:
+        cur.close()
+    return results
+
+
+def _insert_rows_with_savepoints(conn, cur, sql, chunk, start, results):
+    for offset, params in enumerate(chunk):
+        cur.execute("SAVEPOINT bulk_row")
+        try:
+            cur.execute(sql, params)
+            cur.execute("RELEASE SAVEPOINT bulk_row")
+            results[start + offset] = (True, None)
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT bulk_row")
+            results[start + offset] = (False, str(e))
+    conn.commit()
+
+
+def summarize(results, ids):
+    """把 insert_many 的结果整理成接口返回的逐行结果"""
+    items = []
+    for index, ((success, message), row_id) in enumerate(zip(results, ids)):
+        items.append({"index": index, "id": row_id, "success": success, "message": message})
+    return {
+        "total": len(items),
+        "succeeded": sum(1 for r in items if r["success"]),
+        "failed": sum(1 for r in items if not r["success"]),
+        "results": items,
+    }
@@ -0,0 +1,179 @@
+# cache.py
+"""
+参考数据（科室 / 医生 / 药品）的读穿透缓存。
+
+- LocalBackend：进程内 TTL + LRU（默认）
+- SharedBackend：多进程共享缓存，包装 redis-py 风格的客户端（get / set(ex=) / delete / incr），
+  本地开发可用 LocalStandInClient 代替真实的 Redis
+- 失效方式：每个命名空间有一个“代号”（generation），invalidate 时代号 +1，
+  旧代号下的所有 key 自然失效，无需逐个删除（doctors 按科室缓存多份也能一次清掉）
+- 后端选择：启动时调用 init_from_env()，设置了 MEDHUB_CACHE_URL（redis://...）时用共享缓存。
+  多进程部署只用进程内缓存时，一个进程里的 invalidate 不会通知其他进程，
+  其他进程最多在 MEDHUB_REFERENCE_TTL 秒内仍返回修改前的数据
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+REFERENCE_TTL = float(os.environ.get("MEDHUB_REFERENCE_TTL", "300"))   # 秒
+CACHE_URL = os.environ.get("MEDHUB_CACHE_URL", "")
+LOCAL_MAX_ENTRIES = 1024
+
+_MISSING = object()
+
+
+class LocalBackend:
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()     # key -> (expires_at, value)
+        self._counters = {}            # 代号单独存放，不参与 LRU 淘汰
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+
+class SharedBackend:
+    def __init__(self, client, prefix="medhub:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return _MISSING
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value),
+                        ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+
+class LocalStandInClient:
+    """redis-py 客户端子集的进程内替身，只用于本地开发 / 测试"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) is not None else 0
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (b"0", None))
+            value = int(value) + 1
+            self._data[key] = (str(value).encode(), expires_at)
+            return value
+
+
+class ReadThroughCache:
+    def __init__(self, backend, default_ttl=REFERENCE_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._invalidations = defaultdict(int)
+
+    def get_or_load(self, namespace, key, loader, ttl=None):
+        full_key = f"{namespace}:{self.backend.counter(namespace + ':gen')}:{key}"
+        value = self.backend.get(full_key)
+        if value is not _MISSING:
+            self._hits[namespace] += 1
+            return value
+        self._misses[namespace] += 1
+        value = loader()
+        self.backend.set(full_key, value, ttl or self.default_ttl)
+        return value
+
+    def invalidate(self, namespace):
+        self.backend.incr(f"{namespace}:gen")
+        self._invalidations[namespace] += 1
+
+    def stats(self):
+        namespaces = set(self._hits) | set(self._misses) | set(self._invalidations)
+        return {
+            ns: {
+                "hits": self._hits[ns],
+                "misses": self._misses[ns],
+                "invalidations": self._invalidations[ns],
+            }
+            for ns in sorted(namespaces)
+        }
+
+
+reference_cache = ReadThroughCache(LocalBackend())
+
+
+def use_shared_backend(client, prefix="medhub:"):
+    """切换到共享缓存（多进程部署时使用），例如 use_shared_backend(redis.Redis(...))"""
+    reference_cache.backend = SharedBackend(client, prefix)
+
+
+def init_from_env():
+    """按 MEDHUB_CACHE_URL 选择缓存后端，未设置时保留进程内缓存；返回是否使用共享缓存"""
+    if not CACHE_URL:
+        return False
+    import redis   # 可选依赖，只有配置了共享缓存时才需要安装
+    use_shared_backend(redis.Redis.from_url(CACHE_URL))
+    return True
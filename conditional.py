@@ -0,0 +1,64 @@
+# conditional.py
+"""
+列表接口的条件请求（ETag / Last-Modified → 304）。
+
+版本号用一条聚合查询得到：COUNT(*)、MAX(id)、可选的 MAX(时间列)，
+再与查询参数一起做哈希作为 ETag。会被原地更新的表用 ON UPDATE 维护的 updated_at
+作为时间列（migrations/v004），配合 (过滤列, 时间列) 索引，该查询只读索引、只返回一行，
+比把整页数据查出来、序列化、传输一遍要便宜得多。
+
+304 只按 ETag 判断：数据库时间列是服务器本地时间，与 If-Modified-Since（GMT）直接比较会差一个时区，
+而且 MAX(时间列) 看不到删除，删除只能由 COUNT(*) / MAX(id) 反映在 ETag 里。
+"""
+
+import hashlib
+
+from flask import make_response, request
+
+# 校验参数之外的请求参数（如防重放用的 _t）不参与 ETag
+IGNORED_ARGS = {"_t"}
+
+
+def version_sql(table, where_sql, ts_column=None):
+    cols = ["COUNT(*)", "MAX(id)"]
+    if ts_column:
+        cols.append(f"MAX({ts_column})")
+    return f"SELECT {', '.join(cols)} FROM {table}{where_sql}"
+
+
+def table_version(cursor, table, where_sql, params, ts_column=None):
+    cursor.execute(version_sql(table, where_sql, ts_column), tuple(params))
+    return tuple(cursor.fetchone())
+
+
+def version_etag(version, path, args):
+    """由版本元组、请求路径和查询参数 [(k, v)] 生成 ETag（不依赖 Flask，异步版本共用）"""
+    args = sorted((k, v) for k, v in args if k not in IGNORED_ARGS)
+    return hashlib.sha1(repr((path, args, version)).encode("utf-8")).hexdigest()[:32]
+
+
+def version_validators(version):
+    """由版本元组生成 (etag, last_modified)；列表不发 Last-Modified，见模块说明"""
+    return version_etag(version, request.path, request.args.items(multi=True)), None
+
+
+def etag_matches(req, etag):
+    """If-None-Match 是否命中（Flask / Quart 的 request 都可以）"""
+    return bool(req.if_none_match) and req.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag, last_modified=None):
+    """客户端缓存仍有效（If-None-Match 命中）时返回 304 响应，否则返回 None"""
+    if etag_matches(request, etag):
+        return with_validators(make_response("", 304), etag, last_modified)
+    return None
+
+
+def with_validators(resp, etag, last_modified=None):
+    # 列表内容按“语义相同”判断，用弱 ETag；no-cache 表示每次都要带条件请求回源校验
+    resp.set_etag(etag, weak=True)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.cache_control.no_cache = True
+    resp.cache_control.private = True
+    return resp
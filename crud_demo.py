@@ -3,9 +3,22 @@
 针对 meddata_hub 数据库的 8 张表（7 张主表 + 1 张多模态表）实现：
 - 每张表：增 / 删 / 查 三种功能
 - 通过 main 里的注释控制当前要演示的表和操作
+- add_xxx_bulk：批量新增，参数为 dict 列表（键名与 add_xxx 的参数名一致），
+  返回每行的 (success, message)，坏行不会影响其余行
 """
 
 from db_utils import get_connection
+from bulk import insert_many
+
+
+def _bulk_insert(sql, rows, fields, defaults=None):
+    defaults = defaults or {}
+    params = [tuple(r.get(f, defaults.get(f)) for f in fields) for r in rows]
+    conn = get_connection()
+    try:
+        return insert_many(conn, sql, params)
+    finally:
+        conn.close()
 
 
 # =========================
@@ -13,31 +26,33 @@ from db_utils import get_connection
 # =========================
 
 def add_department(id, name, location=None):
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = "INSERT INTO departments (id, name, location) VALUES (%s, %s, %s)"
+        cur.execute(sql, (id, name, location))
+        conn.commit()
+        cur.close()
+
+
+def add_departments_bulk(rows):
     sql = "INSERT INTO departments (id, name, location) VALUES (%s, %s, %s)"
-    cur.execute(sql, (id, name, location))
-    conn.commit()
-    cur.close()
-    conn.close()
+    return _bulk_insert(sql, rows, ("id", "name", "location"))
 
 
 def delete_department(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM departments WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM departments WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_departments():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM departments")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM departments")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -47,34 +62,41 @@ def get_departments():
 
 def add_doctor(id, name, password="123456", department_id=None,
                title=None, specialty=None, phone=None):
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO doctors (id, name, password, department_id, title, specialty, phone)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        cur.execute(sql, (id, name, password, department_id, title, specialty, phone))
+        conn.commit()
+        cur.close()
+
+
+def add_doctors_bulk(rows):
     sql = """
         INSERT INTO doctors (id, name, password, department_id, title, specialty, phone)
         VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
-    cur.execute(sql, (id, name, password, department_id, title, specialty, phone))
-    conn.commit()
-    cur.close()
-    conn.close()
+    return _bulk_insert(sql, rows,
+                        ("id", "name", "password", "department_id", "title", "specialty", "phone"),
+                        {"password": "123456"})
 
 
 def delete_doctor(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM doctors WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM doctors WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_doctors():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM doctors")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM doctors")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -83,34 +105,39 @@ def get_doctors():
 # =========================
 
 def add_medicine(id, name, price, stock, specification=None):
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO medicines (id, name, price, stock, specification)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        cur.execute(sql, (id, name, price, stock, specification))
+        conn.commit()
+        cur.close()
+
+
+def add_medicines_bulk(rows):
     sql = """
         INSERT INTO medicines (id, name, price, stock, specification)
         VALUES (%s, %s, %s, %s, %s)
     """
-    cur.execute(sql, (id, name, price, stock, specification))
-    conn.commit()
-    cur.close()
-    conn.close()
+    return _bulk_insert(sql, rows, ("id", "name", "price", "stock", "specification"))
 
 
 def delete_medicine(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM medicines WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM medicines WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_medicines():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM medicines")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM medicines")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -120,34 +147,41 @@ def get_medicines():
 
 def add_patient(id, name, password="123456",
                 gender=None, age=None, phone=None, address=None):
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO patients (id, name, password, gender, age, phone, address, create_time)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, CURDATE())
+        """
+        cur.execute(sql, (id, name, password, gender, age, phone, address))
+        conn.commit()
+        cur.close()
+
+
+def add_patients_bulk(rows):
     sql = """
         INSERT INTO patients (id, name, password, gender, age, phone, address, create_time)
         VALUES (%s, %s, %s, %s, %s, %s, %s, CURDATE())
     """
-    cur.execute(sql, (id, name, password, gender, age, phone, address))
-    conn.commit()
-    cur.close()
-    conn.close()
+    return _bulk_insert(sql, rows,
+                        ("id", "name", "password", "gender", "age", "phone", "address"),
+                        {"password": "123456"})
 
 
 def delete_patient(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM patients WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM patients WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_patients():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM patients")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM patients")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -160,35 +194,42 @@ def add_medical_record(id, patient_id, doctor_id,
     
    
     
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO medical_records
+            (id, patient_id, doctor_id, diagnosis, treatment_plan, visit_date)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        cur.execute(sql, (id, patient_id, doctor_id, diagnosis, treatment_plan, visit_date))
+        conn.commit()
+        cur.close()
+
+
+def add_medical_records_bulk(rows):
     sql = """
         INSERT INTO medical_records
         (id, patient_id, doctor_id, diagnosis, treatment_plan, visit_date)
         VALUES (%s, %s, %s, %s, %s, %s)
     """
-    cur.execute(sql, (id, patient_id, doctor_id, diagnosis, treatment_plan, visit_date))
-    conn.commit()
-    cur.close()
-    conn.close()
+    return _bulk_insert(sql, rows,
+                        ("id", "patient_id", "doctor_id", "diagnosis", "treatment_plan", "visit_date"))
 
 
 def delete_medical_record(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM medical_records WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM medical_records WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_medical_records():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM medical_records")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM medical_records")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -198,35 +239,42 @@ def get_medical_records():
 
 def add_prescription_detail(id, record_id, medicine_id,
                             dosage=None, usage_info=None, days=None):
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO prescription_details
+            (id, record_id, medicine_id, dosage, usage_info, days)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        cur.execute(sql, (id, record_id, medicine_id, dosage, usage_info, days))
+        conn.commit()
+        cur.close()
+
+
+def add_prescription_details_bulk(rows):
     sql = """
         INSERT INTO prescription_details
         (id, record_id, medicine_id, dosage, usage_info, days)
         VALUES (%s, %s, %s, %s, %s, %s)
     """
-    cur.execute(sql, (id, record_id, medicine_id, dosage, usage_info, days))
-    conn.commit()
-    cur.close()
-    conn.close()
+    return _bulk_insert(sql, rows,
+                        ("id", "record_id", "medicine_id", "dosage", "usage_info", "days"))
 
 
 def delete_prescription_detail(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM prescription_details WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM prescription_details WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_prescription_details():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM prescription_details")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM prescription_details")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -238,51 +286,61 @@ def add_appointment(id, patient_name, patient_phone,
                     age=None, gender=None, department_id=None, doctor_id=None,
                     description=None, status=None, create_time=None):
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    if create_time is None:
-        # MySQL 端用 NOW() 生成字符串时间
-        sql = """
-            INSERT INTO appointments
-            (id, patient_name, patient_phone, age, gender,
-             department_id, doctor_id, description, status, create_time)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-        """
-        params = (id, patient_name, patient_phone, age, gender,
-                  department_id, doctor_id, description, status)
-    else:
-        sql = """
-            INSERT INTO appointments
-            (id, patient_name, patient_phone, age, gender,
-             department_id, doctor_id, description, status, create_time)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        params = (id, patient_name, patient_phone, age, gender,
-                  department_id, doctor_id, description, status, create_time)
-
-    cur.execute(sql, params)
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+
+        if create_time is None:
+            # MySQL 端用 NOW() 生成字符串时间
+            sql = """
+                INSERT INTO appointments
+                (id, patient_name, patient_phone, age, gender,
+                 department_id, doctor_id, description, status, create_time)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+            """
+            params = (id, patient_name, patient_phone, age, gender,
+                      department_id, doctor_id, description, status)
+        else:
+            sql = """
+                INSERT INTO appointments
+                (id, patient_name, patient_phone, age, gender,
+                 department_id, doctor_id, description, status, create_time)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            params = (id, patient_name, patient_phone, age, gender,
+                      department_id, doctor_id, description, status, create_time)
+
+        cur.execute(sql, params)
+        conn.commit()
+        cur.close()
+
+
+def add_appointments_bulk(rows):
+    # create_time 缺省时由 MySQL 端 NOW() 生成，与 add_appointment 一致
+    sql = """
+        INSERT INTO appointments
+        (id, patient_name, patient_phone, age, gender,
+         department_id, doctor_id, description, status, create_time)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, COALESCE(%s, NOW()))
+    """
+    return _bulk_insert(sql, rows,
+                        ("id", "patient_name", "patient_phone", "age", "gender",
+                         "department_id", "doctor_id", "description", "status", "create_time"))
 
 
 def delete_appointment(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM appointments WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM appointments WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_appointments():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM appointments")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM appointments")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -294,37 +352,46 @@ def add_multimodal(id, modality, source_table, source_pk,
                    file_path=None, file_format=None,
                    patient_id=None, record_id=None,
                    text_content=None, description=None):
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        sql = """
+            INSERT INTO multimodal_data
+            (id, patient_id, record_id, source_table, source_pk,
+             modality, text_content, file_path, file_format, description)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        cur.execute(sql, (id, patient_id, record_id, source_table, source_pk,
+                          modality, text_content, file_path, file_format, description))
+        conn.commit()
+        cur.close()
+
+
+def add_multimodal_bulk(rows):
     sql = """
         INSERT INTO multimodal_data
         (id, patient_id, record_id, source_table, source_pk,
          modality, text_content, file_path, file_format, description)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
     """
-    cur.execute(sql, (id, patient_id, record_id, source_table, source_pk,
-                      modality, text_content, file_path, file_format, description))
-    conn.commit()
-    cur.close()
-    conn.close()
+    return _bulk_insert(sql, rows,
+                        ("id", "patient_id", "record_id", "source_table", "source_pk",
+                         "modality", "text_content", "file_path", "file_format", "description"))
 
 
 def delete_multimodal(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM multimodal_data WHERE id = %s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM multimodal_data WHERE id = %s", (id,))
+        conn.commit()
+        cur.close()
 
 
 def get_multimodal():
-    conn = get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM multimodal_data")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SELECT * FROM multimodal_data")
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
@@ -361,6 +428,7 @@ if __name__ == "__main__":
     #             phone="13900000000", address="某某小区")
     #add_patient("p2", "王五", gender="女", age=30)
     #delete_patient("p2")
+    #print("批量新增：", add_patients_bulk([{"id": "p3", "name": "孙七"}, {"id": "p4", "name": "周八", "age": 28}]))
     #print("所有患者：", get_patients())
 
     # ---------- 5. medical_records ----------
@@ -0,0 +1,359 @@
+# datagen.py
+"""
+合成数据生成器：按数量为八张业务表生成外键一致的数据（可到百万行级），并在磁盘上生成多模态占位文件。
+
+    python datagen.py --database meddata_bench --truncate --patients 1000000 --medical-records 3000000 \\
+        --processes 8 [--method load-data] [--files 1000 --file-size 65536] [--rebuild-stats]
+
+- 可复现：每张表按 SHARD_ROWS 行切成分片，分片的随机数种子由 (--seed, 表名, 分片号) 决定，
+  与进程数无关；日期从固定的 --base-date（默认 DEFAULT_BASE_DATE）往前分布，不取当天日期，
+  同样的参数在任何一天运行都得到同样的数据
+- 并行：各表按依赖顺序依次生成，同一张表的分片分给 --processes 个进程，每个进程自己连数据库
+- 写入：默认 executemany（mysql-connector 会改写成多行 INSERT），每 BATCH_ROWS 行一次；
+  --method load-data 先写 TSV 临时文件再 LOAD DATA LOCAL INFILE（需要服务端 local_infile=ON），更快
+- 外键只引用编号范围内的 id（P0000001 ~ P{patients}），写入时关闭外键检查
+- 列按目标表实际存在的列写入（挂号表在不同版本中有 patient_id 或 patient_name 等列）
+- 只在空表上写入；表里已有数据时需要加 --truncate（会清空八张表）
+
+生成的数据不经过写接口，统计汇总表不会增量更新，需要看板数据时加 --rebuild-stats。
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+# 按外键依赖顺序
+TABLES = ("departments", "doctors", "patients", "medicines", "medical_records",
+          "prescription_details", "appointments", "multimodal_data")
+
+DEFAULT_VOLUMES = {
+    "departments": 20,
+    "doctors": 200,
+    "patients": 20000,
+    "medicines": 500,
+    "medical_records": 60000,
+    "prescription_details": 120000,
+    "appointments": 60000,
+    "multimodal_data": 10000,
+}
+DEFAULT_SEED = 20240601
+DEFAULT_BASE_DATE = "2024-06-01"   # 生成日期的基准日（最近的日期），固定以保证可复现
+SHARD_ROWS = 50000       # 每个分片的行数（决定随机数种子的划分，改动后数据会变）
+BATCH_ROWS = 5000        # executemany 每批行数
+DAYS_BACK = 3 * 365      # 日期分布在基准日之前的三年内
+
+FILE_DIR = os.path.join("uploaded_files", "bench")
+DEFAULT_FILES = 200
+DEFAULT_FILE_SIZE = 64 * 1024
+
+DEPARTMENT_NAMES = ["心内科", "呼吸内科", "消化内科", "神经内科", "内分泌科", "肾内科", "骨科", "普外科",
+                    "神经外科", "泌尿外科", "妇科", "产科", "儿科", "眼科", "耳鼻喉科", "口腔科",
+                    "皮肤科", "急诊科", "肿瘤科", "康复科"]
+DIAGNOSES = ["高血压", "2 型糖尿病", "冠心病", "社区获得性肺炎", "慢性胃炎", "腰椎间盘突出", "偏头痛",
+             "支气管哮喘", "甲状腺功能亢进", "慢性肾病", "上呼吸道感染", "骨折", "过敏性皮炎"]
+TITLES = ("主任医师", "副主任医师", "主治医师", "住院医师")
+DISTRICTS = ("朝阳", "海淀", "东城", "西城", "丰台")
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华"
+STATUSES = ("pending", "pending", "completed", "cancelled")
+MODALITIES = ("text", "image", "audio", "video", "pdf", "timeseries")
+FORMATS = {"text": "txt", "image": "jpg", "audio": "mp3", "video": "mp4", "pdf": "pdf", "timeseries": "csv"}
+
+
+# ---------- id 与取值 ----------
+
+def department_id(i):
+    return f"D{i:04d}"
+
+
+def doctor_id(i):
+    return f"DOC{i:05d}"
+
+
+def patient_id(i):
+    return f"P{i:07d}"
+
+
+def medicine_id(i):
+    return f"M{i:05d}"
+
+
+def record_id(i):
+    return f"R{i:08d}"
+
+
+def file_path(i, modality, files=DEFAULT_FILES):
+    """第 i 条多模态记录引用的占位文件（相对项目根目录），共 files 个编号循环使用"""
+    if not files:
+        return None
+    return f"{FILE_DIR}/bench_{i % files}.{FORMATS[modality]}"
+
+
+def _name(rng):
+    return rng.choice(SURNAMES) + "".join(rng.choice(GIVEN) for _ in range(rng.randint(1, 2)))
+
+
+def _phone(rng):
+    return f"1{rng.randint(3000000000, 9999999999)}"
+
+
+# ---------- 每张表的行 ----------
+# 列的全集；写入时只保留目标表实际存在的列
+
+COLUMNS = {
+    "departments": ("id", "name", "location"),
+    "doctors": ("id", "name", "password", "title", "specialty", "phone", "department_id"),
+    "patients": ("id", "name", "password", "gender", "age", "phone", "address", "create_time"),
+    "medicines": ("id", "name", "price", "stock", "specification"),
+    "medical_records": ("id", "patient_id", "doctor_id", "diagnosis", "treatment_plan", "visit_date"),
+    "prescription_details": ("id", "record_id", "medicine_id", "dosage", "usage_info", "days"),
+    "appointments": ("id", "patient_id", "patient_name", "patient_phone", "age", "gender",
+                     "department_id", "doctor_id", "description", "status", "create_time"),
+    "multimodal_data": ("id", "patient_id", "record_id", "source_table", "source_pk", "modality",
+                        "text_content", "file_path", "file_format", "description"),
+}
+
+
+def rows(table, lo, hi, volumes, rng, files=DEFAULT_FILES, base_date=DEFAULT_BASE_DATE):
+    """编号 [lo, hi) 的行（元组，顺序同 COLUMNS[table]）"""
+    v = volumes
+    base = datetime.date.fromisoformat(base_date).toordinal()
+
+    def day():
+        return datetime.date.fromordinal(base - rng.randint(0, DAYS_BACK)).isoformat()
+
+    for i in range(lo, hi):
+        if table == "departments":
+            name = DEPARTMENT_NAMES[(i - 1) % len(DEPARTMENT_NAMES)]
+            if i > len(DEPARTMENT_NAMES):           # name 列唯一
+                name += str((i - 1) // len(DEPARTMENT_NAMES) + 1)
+            yield department_id(i), name, f"门诊楼 {rng.randint(1, 8)} 楼"
+        elif table == "doctors":
+            yield (doctor_id(i), _name(rng), "123456", rng.choice(TITLES), rng.choice(DIAGNOSES),
+                   _phone(rng), department_id(rng.randint(1, v["departments"])))
+        elif table == "patients":
+            yield (patient_id(i), _name(rng), "123456", rng.choice(("男", "女")), rng.randint(1, 95),
+                   _phone(rng), f"{rng.choice(DISTRICTS)}区{rng.randint(1, 300)}号", day())
+        elif table == "medicines":
+            yield (medicine_id(i), f"药品{i}", round(rng.uniform(1, 500), 2), rng.randint(0, 10000),
+                   f"{rng.choice((5, 10, 20, 50))}mg*24片")
+        elif table == "medical_records":
+            diagnosis = rng.choice(DIAGNOSES)
+            yield (record_id(i), patient_id(rng.randint(1, v["patients"])),
+                   doctor_id(rng.randint(1, v["doctors"])), diagnosis,
+                   f"{diagnosis}：规律用药，{rng.randint(1, 8)} 周后复诊", day())
+        elif table == "prescription_details":
+            yield (f"RX{i:08d}", record_id(rng.randint(1, v["medical_records"])),
+                   medicine_id(rng.randint(1, v["medicines"])), f"{rng.choice((1, 2))} 片",
+                   rng.choice(("口服", "饭后口服", "睡前")), rng.randint(1, 30))
+        elif table == "appointments":
+            yield (f"A{i:08d}", patient_id(rng.randint(1, v["patients"])), _name(rng), _phone(rng),
+                   rng.randint(1, 95), rng.choice(("男", "女")),
+                   department_id(rng.randint(1, v["departments"])), doctor_id(rng.randint(1, v["doctors"])),
+                   rng.choice(DIAGNOSES) + "待查", rng.choice(STATUSES),
+                   f"{day()} {rng.randint(8, 17):02d}:{rng.randint(0, 59):02d}:00")
+        elif table == "multimodal_data":
+            modality = rng.choice(MODALITIES)
+            yield (f"MM{i:08d}", patient_id(rng.randint(1, v["patients"])),
+                   record_id(rng.randint(1, v["medical_records"])), "Bench", f"bench{i}", modality,
+                   None, file_path(i, modality, files), FORMATS[modality], f"合成数据 {modality} #{i}")
+
+
+# ---------- 写入 ----------
+
+def _connect(config, method):
+    import mysql.connector     # 只在写库时需要，生成逻辑本身不依赖驱动
+
+    if method == "load-data":
+        config = dict(config, allow_local_infile=True)
+    conn = mysql.connector.connect(**config)
+    cur = conn.cursor()
+    cur.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    cur.close()
+    return conn
+
+
+def _tsv(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _load_data(conn, table, fields, batch):
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".tsv", delete=False) as f:
+        for row in batch:
+            f.write("\t".join(_tsv(x) for x in row))
+            f.write("\n")
+        path = f.name
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({', '.join(fields)})",
+            (path,),
+        )
+        cur.close()
+    finally:
+        os.unlink(path)
+
+
+def _write_shard(task):
+    """子进程：生成并写入一个分片，返回行数"""
+    config, method, table, shard, lo, hi, volumes, files, seed, keep, base_date = task
+    rng = random.Random(f"{seed}:{table}:{shard}")
+    fields = [c for c, k in zip(COLUMNS[table], keep) if k]
+    sql = f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join(['%s'] * len(fields))})"
+    conn = _connect(config, method)
+    try:
+        cur = conn.cursor()
+
+        def flush(batch):
+            if method == "load-data":
+                _load_data(conn, table, fields, batch)
+            else:
+                cur.executemany(sql, batch)
+
+        batch = []
+        for row in rows(table, lo, hi, volumes, rng, files, base_date):
+            batch.append(tuple(x for x, k in zip(row, keep) if k))
+            if len(batch) >= BATCH_ROWS and method == "executemany":
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        cur.close()
+        conn.commit()
+    finally:
+        conn.close()
+    return hi - lo
+
+
+def _write_files(task):
+    """子进程：生成编号 [lo, hi) 的占位文件（每个编号每种扩展名一份）"""
+    root, lo, hi, size, seed = task
+    directory = os.path.join(root, FILE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(lo, hi):
+        rng = random.Random(f"{seed}:file:{i}")
+        for modality, ext in FORMATS.items():
+            path = os.path.join(directory, f"bench_{i}.{ext}")
+            if os.path.exists(path):
+                continue
+            if modality == "timeseries":
+                start = datetime.datetime(2024, 1, 1) + datetime.timedelta(days=i)
+                lines = ["timestamp,heart_rate,systolic,diastolic"]
+                n = max(size // 40, 2)
+                lines += [f"{(start + datetime.timedelta(seconds=k)).isoformat()},"
+                          f"{rng.randint(55, 110)},{rng.randint(100, 160)},{rng.randint(60, 100)}"
+                          for k in range(n)]
+                payload = ("\n".join(lines) + "\n").encode("utf-8")
+            elif modality == "text":
+                payload = ("合成文本数据。" * (size // 21 + 1)).encode("utf-8")[:size]
+            else:
+                payload = rng.randbytes(size)
+            with open(path, "wb") as f:
+                f.write(payload)
+    return hi - lo
+
+
+def table_columns(conn, table):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,))
+        return {row[0] for row in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def generate(config, volumes, seed=DEFAULT_SEED, processes=None, method="executemany",
+             truncate=False, files=DEFAULT_FILES, file_size=DEFAULT_FILE_SIZE, root=None, log=print,
+             base_date=DEFAULT_BASE_DATE):
+    """按 volumes 为八张表造数并生成占位文件；表非空且未指定 truncate 时抛 RuntimeError"""
+    processes = processes or os.cpu_count() or 1
+    root = root or os.path.dirname(os.path.abspath(__file__))
+
+    conn = _connect(config, "executemany")
+    try:
+        cur = conn.cursor()
+        if truncate:
+            for table in reversed(TABLES):
+                cur.execute(f"TRUNCATE TABLE {table}")
+        else:
+            for table in TABLES:
+                cur.execute(f"SELECT 1 FROM {table} LIMIT 1")
+                if cur.fetchone():
+                    raise RuntimeError(f"{table} is not empty, pass truncate=True (--truncate)")
+        cur.close()
+        keep = {}
+        for table in TABLES:
+            columns = table_columns(conn, table)
+            keep[table] = tuple(c in columns for c in COLUMNS[table])
+    finally:
+        conn.close()
+
+    ctx = multiprocessing.get_context("spawn")     # 子进程不继承父进程的连接
+    with ctx.Pool(processes) as pool:
+        for table in TABLES:
+            started = time.perf_counter()
+            tasks = [(config, method, table, shard, lo, min(lo + SHARD_ROWS, volumes[table] + 1),
+                      volumes, files, seed, keep[table], base_date)
+                     for shard, lo in enumerate(range(1, volumes[table] + 1, SHARD_ROWS))]
+            total = sum(pool.imap_unordered(_write_shard, tasks))
+            elapsed = time.perf_counter() - started
+            log(f"{table}: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+        step = max(files // processes, 1)
+        written = sum(pool.imap_unordered(
+            _write_files, [(root, lo, min(lo + step, files), file_size, seed) for lo in range(0, files, step)]))
+        log(f"files: {written:,} x {len(FORMATS)} formats in {os.path.join(root, FILE_DIR)}")
+
+
+def main():
+    from db_utils import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Generate synthetic data for the eight business tables")
+    parser.add_argument("--database", default=DB_CONFIG["database"])
+    parser.add_argument("--truncate", action="store_true", help="先清空八张表")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--base-date", default=DEFAULT_BASE_DATE, help="日期分布的基准日（YYYY-MM-DD）")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--method", choices=("executemany", "load-data"), default="executemany")
+    parser.add_argument("--files", type=int, default=DEFAULT_FILES, help="占位文件数（每种格式各一份）")
+    parser.add_argument("--file-size", type=int, default=DEFAULT_FILE_SIZE, help="占位文件字节数")
+    parser.add_argument("--rebuild-stats", action="store_true", help="造数后重建统计汇总表")
+    for table, count in DEFAULT_VOLUMES.items():
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, default=count, dest=table)
+    args = parser.parse_args()
+
+    config = dict(DB_CONFIG, database=args.database)
+    volumes = {table: getattr(args, table) for table in DEFAULT_VOLUMES}
+    try:
+        datetime.date.fromisoformat(args.base_date)
+    except ValueError:
+        parser.error(f"invalid --base-date: {args.base_date}")
+    try:
+        generate(config, volumes, args.seed, args.processes, args.method, args.truncate,
+                 args.files, args.file_size, base_date=args.base_date)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    if args.rebuild_stats:
+        import mysql.connector
+        import stats_aggregates
+
+        conn = mysql.connector.connect(**config)
+        try:
+            stats_aggregates.ensure_schema(conn)
+            stats_aggregates.rebuild(conn)
+        finally:
+            conn.close()
+        print("stats tables rebuilt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# db_pool.py
+"""
+通用数据库连接池。
+
+- 最小 / 最大连接数（min_size / max_size）
+- 借出超时（timeout，秒）：池满时最多等待多久
+- 借出时健康检查（ping），坏连接直接丢弃重建
+- 最大存活时间（max_lifetime，秒）：超时的连接在归还 / 借出时回收
+- 统计信息（使用中、空闲、等待次数、累计等待时间）供监控使用
+
+业务代码拿到的是 PooledConnection，用法和原生连接一致，
+conn.close() 不会真正断开，而是归还到池中。推荐 with pool.get_connection() as conn:
+保证异常时也归还；忘记 close 的连接在被回收时由 finalizer 断开并让出名额。
+"""
+
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# 游标包装 cursor_wrapper(原生游标, 原生连接)（如 metrics.InstrumentedCursor），为 None 时直接返回原生游标
+cursor_wrapper = None
+
+
+class PoolTimeoutError(Exception):
+    """在 timeout 内没有借到连接"""
+
+
+class PooledConnection:
+    """对原生连接的薄包装：close() 归还连接，其余属性透传"""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._closed = False
+        # 未 close 就被回收时断开原生连接并让出名额，避免名额泄漏把池耗尽
+        self._finalizer = weakref.finalize(self, pool._reclaim, raw)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        if self._closed:
+            raise AttributeError("connection already returned to pool")
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        if self._closed:
+            raise AttributeError("connection already returned to pool")
+        cur = self._raw.cursor(*args, **kwargs)
+        return cursor_wrapper(cur, self._raw) if cursor_wrapper is not None else cur
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._finalizer.detach()
+        self._pool._release(self._raw, self._created_at)
+
+    def discard(self):
+        """不归还而是直接断开（例如连接上还有大量未读结果时）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._finalizer.detach()
+        self._pool._drop(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, factory, min_size=1, max_size=10, timeout=10.0,
+                 max_lifetime=3600.0, ping_on_borrow=True):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("invalid pool size: min=%s max=%s" % (min_size, max_size))
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_on_borrow = ping_on_borrow
+
+        self._idle = deque()          # [(raw, created_at), ...]
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # 统计
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._broken = 0
+
+    # ---------- 内部工具 ----------
+
+    def _total(self):
+        return self._in_use + len(self._idle)
+
+    def _expired(self, created_at):
+        return self.max_lifetime and time.monotonic() - created_at > self.max_lifetime
+
+    def _new_raw(self):
+        raw = self._factory()
+        with self._cond:
+            self._created += 1
+        return raw, time.monotonic()
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _healthy(self, raw):
+        if not self.ping_on_borrow:
+            return True
+        try:
+            if hasattr(raw, "ping"):
+                raw.ping(reconnect=False)
+            elif hasattr(raw, "is_connected"):
+                return raw.is_connected()
+            return True
+        except Exception:
+            return False
+
+    # ---------- 对外接口 ----------
+
+    def warm_up(self):
+        """预先建立 min_size 个空闲连接"""
+        with self._cond:
+            while self._total() < self.min_size:
+                self._idle.append(self._new_raw())
+
+    def get_connection(self):
+        deadline = None
+        waited_from = None
+        while True:
+            raw = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeoutError("pool is closed")
+
+                    # 1. 优先复用空闲连接（先占住名额，检查放在锁外）
+                    if self._idle:
+                        raw, created_at = self._idle.pop()
+                        self._in_use += 1
+                        break
+
+                    # 2. 未达上限则新建（建连放在锁外，避免阻塞其他线程）
+                    if self._total() < self.max_size:
+                        self._in_use += 1
+                        break
+
+                    # 3. 池已满，等待归还
+                    now = time.monotonic()
+                    if deadline is None:
+                        deadline = now + self.timeout
+                        waited_from = now
+                        self._waits += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_time += now - waited_from
+                        raise PoolTimeoutError(
+                            "no connection available within %.1fs (max_size=%d)"
+                            % (self.timeout, self.max_size)
+                        )
+                    self._cond.wait(remaining)
+
+            if raw is None:
+                break
+
+            # 空闲连接：过期或 ping 不通则丢弃，让出名额后重新借
+            expired = self._expired(created_at)
+            if not expired and self._healthy(raw):
+                with self._cond:
+                    self._record_wait(waited_from)
+                return PooledConnection(self, raw, created_at)
+            self._discard(raw)
+            with self._cond:
+                self._in_use -= 1
+                if expired:
+                    self._recycled += 1
+                else:
+                    self._broken += 1
+                self._cond.notify()
+
+        try:
+            raw, created_at = self._new_raw()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._record_wait(waited_from)
+        return PooledConnection(self, raw, created_at)
+
+    def _record_wait(self, waited_from):
+        if waited_from is not None:
+            self._wait_time += time.monotonic() - waited_from
+
+    def _release(self, raw, created_at):
+        # 归还前回滚未提交的事务，避免脏状态带给下一个使用者
+        reusable = True
+        try:
+            raw.rollback()
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if not reusable:
+                self._broken += 1
+            keep = not (self._closed or not reusable or self._expired(created_at))
+            if keep:
+                self._idle.append((raw, created_at))
+            elif reusable and not self._closed:
+                self._recycled += 1
+            self._cond.notify()
+        if not keep:
+            self._discard(raw)
+
+    def _drop(self, raw):
+        self._discard(raw)
+        with self._cond:
+            self._in_use -= 1
+            self._broken += 1
+            self._cond.notify()
+
+    def _reclaim(self, raw):
+        # 泄漏的连接状态未知（可能有未读结果），不放回空闲队列
+        logger.warning("pooled connection garbage-collected without close(); dropping it")
+        self._drop(raw)
+
+    def close(self):
+        """关闭所有空闲连接；使用中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "minSize": self.min_size,
+                "maxSize": self.max_size,
+                "inUse": self._in_use,
+                "idle": len(self._idle),
+                "waits": self._waits,
+                "waitTimeSeconds": round(self._wait_time, 6),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "broken": self._broken,
+            }
@@ -1,15 +1,73 @@
 # db_utils.py
+import os
+import threading
+import time
+
 import mysql.connector
 
+from db_pool import ConnectionPool
+from metrics import record_pool_acquire
+
+DB_CONFIG = {
+    #"host": "127.0.0.1",
+    "host": "localhost",
+    #"port": 3306,
+    "user": "root",
+    "password": "111111",  # <- 一定要改成你登录 mysql 那个密码
+    "database": "meddata_hub",
+    "charset": "utf8mb4",
+    "use_pure": True,            # 避免 C 扩展的一些奇怪兼容问题
+}
+
+# 连接池参数（可用环境变量覆盖）
+POOL_MIN_SIZE = int(os.environ.get("MEDHUB_POOL_MIN", "2"))
+POOL_MAX_SIZE = int(os.environ.get("MEDHUB_POOL_MAX", "32"))
+POOL_TIMEOUT = float(os.environ.get("MEDHUB_POOL_TIMEOUT", "10"))          # 借出等待秒数
+POOL_MAX_LIFETIME = float(os.environ.get("MEDHUB_POOL_LIFETIME", "1800"))  # 连接最长存活秒数
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connect():
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+def get_pool():
+    """进程内单例连接池，第一次使用时创建"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool(
+                    _connect,
+                    min_size=POOL_MIN_SIZE,
+                    max_size=POOL_MAX_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    max_lifetime=POOL_MAX_LIFETIME,
+                )
+                pool.warm_up()
+                _pool = pool
+    return _pool
+
+
 def get_connection():
-    conn = mysql.connector.connect(
-        #host="127.0.0.1",
-        host="localhost",        
-        #port=3306,
-        user="root",
-        password="111111",  # <- 一定要改成你登录 mysql 那个密码
-        database="meddata_hub",
-        charset="utf8mb4",
-        use_pure=True            # 避免 C 扩展的一些奇怪兼容问题
-    )
+    # 从连接池借出；调用方照旧 conn.close()，连接会归还到池中
+    started = time.perf_counter()
+    conn = get_pool().get_connection()
+    record_pool_acquire(time.perf_counter() - started)
     return conn
+
+
+def get_pool_stats():
+    if _pool is None:
+        return None
+    return _pool.stats()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
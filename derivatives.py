@@ -0,0 +1,194 @@
+# derivatives.py
+"""
+多模态文件的派生图（缩略图 / 预览图）。
+
+- image：按比例缩放（Pillow）
+- pdf  ：第一页栅格化（pdftoppm，没有时用 PyMuPDF）
+- video：封面帧（ffmpeg，取第 1 秒，视频太短时取第一帧）
+
+结果缓存在 <root>/<key[0:2]>/<key>_<variant>_<像素>.jpg，key 为源文件 sha256
+（blob 存储的文件名本身就是 sha256；旧路径的文件用 路径 + 大小 + 修改时间 的哈希）。
+尺寸变了文件名也会变，不会拿到旧尺寸的缓存。
+生成在后台线程池中进行：ffmpeg / pdftoppm 是子进程，Pillow 解码与缩放时会释放 GIL。
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:          # 未安装 Pillow 时图片派生图不可用
+    Image = None
+
+try:
+    import fitz              # PyMuPDF，可选
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+# 变体名 -> 最长边像素
+VARIANTS = {"thumb": 256, "preview": 1024}
+SUPPORTED_MODALITIES = {"image", "pdf", "video"}
+
+DERIVATIVE_WORKERS = int(os.environ.get("MEDHUB_DERIVATIVE_WORKERS", "2"))
+JPEG_QUALITY = 82
+TOOL_TIMEOUT = 60            # 单次 ffmpeg / pdftoppm 的超时（秒）
+
+_SHA256_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DerivativeError(Exception):
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.status = status
+
+
+def source_key(abs_path):
+    stem = os.path.splitext(os.path.basename(abs_path))[0]
+    if _SHA256_NAME.match(stem):
+        return stem
+    st = os.stat(abs_path)
+    raw = f"{os.path.normpath(abs_path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ---------- 各模态的生成函数：(源文件, 输出文件, 最长边像素) ----------
+
+def _render_image(src, dest, px):
+    if Image is None:
+        raise DerivativeError("Pillow is not installed", 501)
+    with Image.open(src) as img:
+        img.draft("RGB", (px, px))            # JPEG 直接按比例解码，大图快很多
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((px, px), Image.LANCZOS)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.save(dest, "JPEG", quality=JPEG_QUALITY, optimize=True)
+
+
+def _render_pdf(src, dest, px):
+    if shutil.which("pdftoppm"):
+        base = dest[:-len(".jpg")]
+        subprocess.run(
+            ["pdftoppm", "-jpeg", "-f", "1", "-l", "1", "-singlefile",
+             "-scale-to", str(px), src, base],
+            check=True, capture_output=True, timeout=TOOL_TIMEOUT,
+        )
+        return
+    if fitz is not None:
+        with fitz.open(src) as doc:
+            page = doc[0]
+            zoom = px / max(page.rect.width, page.rect.height)
+            page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).save(dest, jpg_quality=JPEG_QUALITY)
+        return
+    raise DerivativeError("neither pdftoppm nor PyMuPDF is available", 501)
+
+
+def _render_video(src, dest, px):
+    if not shutil.which("ffmpeg"):
+        raise DerivativeError("ffmpeg is not available", 501)
+    scale = f"scale='min({px},iw)':'min({px},ih)':force_original_aspect_ratio=decrease"
+    message = "no video frame could be decoded"
+    # 先取第 1 秒的帧（避开片头黑屏）；不足 1 秒的视频在那里取不到帧，ffmpeg 可能报错退出，
+    # 也可能正常退出但不写文件，两种情况都再从开头取一次
+    for seek in ("1", "0"):
+        proc = subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-ss", seek, "-i", src,
+             "-frames:v", "1", "-vf", scale, "-q:v", "4", dest],
+            capture_output=True, timeout=TOOL_TIMEOUT,
+        )
+        if proc.returncode == 0 and os.path.exists(dest) and os.path.getsize(dest) > 0:
+            return
+        message = proc.stderr.decode("utf-8", "replace").strip() or message
+    raise DerivativeError(message)
+
+
+RENDERERS = {"image": _render_image, "pdf": _render_pdf, "video": _render_video}
+
+
+class DerivativeStore:
+    def __init__(self, root, max_workers=DERIVATIVE_WORKERS):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="derivative")
+        self._pending = {}            # 输出路径 -> Future，同一个派生图只生成一次
+        self._lock = threading.Lock()
+
+    def path_for(self, abs_path, variant):
+        key = source_key(abs_path)
+        return os.path.join(self.root, key[:2], f"{key}_{variant}_{VARIANTS[variant]}.jpg")
+
+    def _generate(self, abs_path, modality, variant, dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest[:-len('.jpg')]}.{uuid.uuid4().hex}.tmp.jpg"
+        try:
+            RENDERERS[modality](abs_path, tmp, VARIANTS[variant])
+            os.replace(tmp, dest)
+        except subprocess.CalledProcessError as e:
+            raise DerivativeError(e.stderr.decode("utf-8", "replace").strip() or str(e))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return dest
+
+    def _done(self, dest, future):
+        with self._lock:
+            self._pending.pop(dest, None)
+        if future.exception() is not None:
+            logger.warning("Derivative %s failed: %s", dest, future.exception())
+
+    def submit(self, abs_path, modality, variant):
+        """生成（或复用正在生成的）派生图，返回 Future；已存在时返回 None"""
+        if modality not in SUPPORTED_MODALITIES:
+            raise DerivativeError(f"no preview for modality {modality}", 415)
+        dest = self.path_for(abs_path, variant)
+        if os.path.exists(dest):
+            return None
+        with self._lock:
+            future = self._pending.get(dest)
+            if future is None:
+                future = self._executor.submit(self._generate, abs_path, modality, variant, dest)
+                self._pending[dest] = future
+                future.add_done_callback(lambda f, d=dest: self._done(d, f))
+        return future
+
+    def schedule(self, abs_path, modality):
+        """上传完成后预生成全部变体（不支持的模态直接忽略）"""
+        if modality not in SUPPORTED_MODALITIES:
+            return
+        for variant in VARIANTS:
+            self.submit(abs_path, modality, variant)
+
+    def get(self, abs_path, modality, variant, wait=2.0):
+        """返回派生图路径；wait 秒内没生成好返回 None（调用方回 202）"""
+        future = self.submit(abs_path, modality, variant)
+        if future is not None:
+            try:
+                future.result(timeout=wait)
+            except FutureTimeout:
+                return None
+        return self.path_for(abs_path, variant)
+
+    def purge(self, abs_path):
+        """源文件删除后清理它的全部派生图"""
+        purge_derivatives(self.root, abs_path)
+
+
+def purge_derivatives(root, abs_path):
+    """清理 root 下 abs_path 的全部派生图；只删文件，不需要 DerivativeStore（不会创建线程池）"""
+    key = source_key(abs_path)
+    for path in glob.glob(os.path.join(root, key[:2], f"{key}_*.jpg")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,110 @@
+# downsample.py
+"""
+长时间序列的降采样（输出点数不超过 max_points，保留曲线形状与极值）。
+
+- minmax：按点数等分成桶，每桶保留最小值和最大值两个点；整体用 reshape + argmin/argmax 向量化完成
+- lttb  ：Largest-Triangle-Three-Buckets。先用 minmax 预选约 4 倍目标点数的候选点（MinMaxLTTB），
+          再在候选点上做 LTTB；LTTB 每个桶依赖上一个桶选出的点，桶之间只能顺序处理，桶内为向量运算
+- 金字塔：超长序列导入时预先按 PYRAMID_BUCKETS 做多级 minmax，只保存被选中的原始下标；
+          查询大窗口时先在合适的层级上取候选点，不必扫描全部原始数据
+
+多通道时每个通道分别选点（各分 max_points / 通道数 个名额），再取下标并集，共用一条时间轴；
+每个通道至少要 3 个名额，max_points 小于 3 × 通道数时抛 ValueError（接口返回 400）。
+"""
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+LTTB_PRESELECT = 4                  # MinMaxLTTB 预选倍数
+PYRAMID_MIN_POINTS = 200_000        # 超过该点数的序列才建金字塔
+PYRAMID_BUCKETS = (16, 128, 1024)   # 各层每桶的原始点数
+
+
+def _bucket_matrix(y, n_buckets):
+    """把 y 末尾补 NaN 后变成 (n_buckets, m) 矩阵，返回 (矩阵, m)"""
+    m = -(-len(y) // n_buckets)
+    padded = np.full(n_buckets * m, np.nan)
+    padded[:len(y)] = y
+    return padded.reshape(n_buckets, m), m
+
+
+def minmax_indices(y, n_out):
+    """每桶最小值 / 最大值所在的下标（升序、去重），输出不超过 n_out 个"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.flatnonzero(~np.isnan(y))
+    mat, m = _bucket_matrix(y, n_buckets)
+    valid = ~np.isnan(mat)
+    has_data = valid.any(axis=1)
+    lo = np.argmin(np.where(valid, mat, np.inf), axis=1)
+    hi = np.argmax(np.where(valid, mat, -np.inf), axis=1)
+    base = np.arange(n_buckets) * m
+    idx = np.concatenate([(base + lo)[has_data], (base + hi)[has_data]])
+    return np.unique(idx)
+
+
+def lttb_indices(x, y, n_out):
+    """LTTB 选出的下标（升序），首尾两点总是保留"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.flatnonzero(~np.isnan(y))
+    if len(keep) <= max(n_out, 2):
+        return keep
+    if n_out < 3:
+        return keep[[0, -1]]
+
+    # MinMax 预选候选点，LTTB 只在候选点上运行
+    if len(keep) > n_out * LTTB_PRESELECT:
+        pre = minmax_indices(y[keep], n_out * LTTB_PRESELECT)
+        pre = np.union1d(pre, [0, len(keep) - 1])
+        keep = keep[pre]
+    xs, ys = x[keep], y[keep]
+    n = len(xs)
+
+    # 中间 n_out - 2 个桶的边界（首尾各单独成桶）
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        # 下一个桶的平均点（最后一个桶的下一个是终点）
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], max(edges[i + 2], edges[i + 1] + 1))
+            cx, cy = xs[nxt].mean(), ys[nxt].mean()
+        else:
+            cx, cy = xs[-1], ys[-1]
+        bx, by = xs[start:stop], ys[start:stop]
+        # 三角形面积（省略 1/2）
+        area = np.abs((xs[a] - cx) * (by - ys[a]) - (xs[a] - bx) * (cy - ys[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return keep[np.unique(out)]
+
+
+def select_indices(t, values, max_points, method="lttb"):
+    """多通道选点：返回所有通道选中下标的并集（升序）"""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    if max_points < 3 * len(values):
+        raise ValueError(f"maxPoints must be at least 3 per channel ({3 * len(values)})")
+    # 各通道名额之和不超过 max_points，并集也就不会超过
+    per_channel = max_points // max(len(values), 1)
+    picked = []
+    for v in values.values():
+        if method == "lttb":
+            picked.append(lttb_indices(t, v, per_channel))
+        else:
+            picked.append(minmax_indices(v, per_channel))
+    if not picked:
+        return np.arange(0)
+    return np.unique(np.concatenate(picked))
+
+
+def build_pyramid(values, bucket):
+    """一层金字塔：每 bucket 个原始点中各通道的最小 / 最大值下标（并集，升序）"""
+    n = len(next(iter(values.values())))
+    n_out = 2 * -(-n // bucket)
+    return np.unique(np.concatenate([minmax_indices(v, n_out) for v in values.values()]))
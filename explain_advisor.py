@@ -0,0 +1,202 @@
+# explain_advisor.py
+"""
+索引顾问：对应用实际发出的每条查询执行 EXPLAIN，标出全表扫描 / 全索引扫描 / filesort。
+
+做法：用 Flask 测试客户端依次请求 REQUESTS 中的 GET 接口（占位符用库里的真实数据填充），
+记录期间经过连接池的所有 SELECT，再加上写路径中的几条查询（EXTRA_QUERIES），逐条 EXPLAIN。
+需要连着有数据的库运行（行数估计来自 InnoDB 统计信息）：
+
+    python explain_advisor.py [--min-rows 1000] [--json]
+
+扫描行数不少于 --min-rows 的全表 / 全索引扫描记为问题，有问题时退出码为 1，可放进 CI。
+加索引见 migrations/（python -m migrations）。
+"""
+
+import argparse
+import datetime
+import json
+import sys
+from urllib.parse import quote
+
+import db_pool
+
+# 请求模板中的占位符 -> 取样 SQL
+SAMPLES = {
+    "department_id": "SELECT department_id FROM doctors LIMIT 1",
+    "patient_id": "SELECT patient_id FROM medical_records LIMIT 1",
+    "doctor_id": "SELECT doctor_id FROM medical_records LIMIT 1",
+    "record_id": "SELECT record_id FROM prescription_details LIMIT 1",
+    "status": "SELECT status FROM appointments LIMIT 1",
+    "patient_name": "SELECT name FROM patients WHERE CHAR_LENGTH(name) >= 2 LIMIT 1",
+    "mm_patient_id": "SELECT patient_id FROM multimodal_data WHERE patient_id IS NOT NULL LIMIT 1",
+    "file_path": "SELECT file_path FROM multimodal_data WHERE file_path IS NOT NULL LIMIT 1",
+}
+
+REQUESTS = [
+    "/api/departments",
+    "/api/doctors?departmentId={department_id}",
+    "/api/medicines",
+    "/api/patients",
+    "/api/patients?name={patient_name}",
+    "/api/medical-records?patientId={patient_id}",
+    "/api/medical-records?doctorId={doctor_id}",
+    "/api/medical-records?format=ndjson&patientId={patient_id}",
+    "/api/prescriptions?recordId={record_id}",
+    "/api/appointments?status={status}",
+    "/api/appointments/statistics?date={year}",
+    "/api/appointments/statistics?date={year}&granularity=day&by=department",
+    "/api/multimodal?modality=image",
+    "/api/multimodal?patientId={mm_patient_id}",
+    "/api/multimodal?modality=image&patientId={mm_patient_id}",
+    "/api/jobs?status=failed",
+    "/api/search?q={patient_name}",
+    "/api/stats/sankey",
+    "/api/statistics/monthly",
+]
+
+# 不经过 GET 接口的热点查询：(说明, SQL, 参数模板)
+EXTRA_QUERIES = [
+    ("blob_store.reference_count",
+     "SELECT COUNT(*) FROM multimodal_data WHERE file_path = %s", ("{file_path}",)),
+    ("stats_aggregates.refresh (appointments)",
+     "SELECT DATE(create_time), COUNT(*) FROM appointments "
+     "WHERE create_time >= %s AND create_time < %s GROUP BY DATE(create_time)",
+     ("{year}-01-01", "{next_year}-01-01")),
+    ("stats_aggregates.refresh (visits)",
+     "SELECT visit_date, COUNT(*) FROM medical_records "
+     "WHERE visit_date >= %s AND visit_date < %s GROUP BY visit_date",
+     ("{year}-01-01", "{next_year}-01-01")),
+]
+
+
+class _RecordingCursor:
+    def __init__(self, cursor, log, source):
+        self._cursor = cursor
+        self._log = log
+        self._source = source
+
+    def execute(self, sql, params=()):
+        # 全文检索是 (SELECT ...) UNION ALL (SELECT ...)
+        if sql.lstrip("( \n").upper().startswith("SELECT") and "information_schema" not in sql:
+            self._log.append((self._source[0], sql, tuple(params or ())))
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+def capture(requests, log):
+    """依次请求接口，返回 [(接口, SQL, 参数)]"""
+    from app import app
+
+    source = [None]
+    original = db_pool.cursor_wrapper
+
+    def wrapper(cur, conn):
+        return _RecordingCursor(original(cur, conn) if original else cur, log, source)
+
+    db_pool.cursor_wrapper = wrapper
+    try:
+        client = app.test_client()
+        for url in requests:
+            source[0] = url
+            resp = client.get(url)
+            resp.get_data()          # 流式接口要读完响应才会执行查询
+            if resp.status_code >= 400:
+                print(f"warning: {url} -> {resp.status_code}", file=sys.stderr)
+    finally:
+        db_pool.cursor_wrapper = original
+    return log
+
+
+def explain(conn, sql, params):
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("EXPLAIN " + sql, params)
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+def findings(plan_rows, min_rows):
+    """[(严重程度, 表, 说明)]；severity 为 problem / note"""
+    found = []
+    for row in plan_rows:
+        rows = int(row.get("rows") or 0)
+        extra = row.get("Extra") or ""
+        table = row.get("table")
+        if row.get("type") in ("ALL", "index"):
+            what = "full table scan" if row["type"] == "ALL" else "full index scan"
+            found.append(("problem" if rows >= min_rows else "note", table, f"{what} (~{rows} rows)"))
+        for flag in ("Using filesort", "Using temporary"):
+            if flag in extra:
+                found.append(("note", table, f"{flag.lower()} (~{rows} rows)"))
+    return found
+
+
+def main():
+    from db_utils import get_connection
+
+    parser = argparse.ArgumentParser(description="EXPLAIN every query the app issues")
+    parser.add_argument("--min-rows", type=int, default=1000, help="扫描行数达到该值才算问题")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        values = {"year": datetime.date.today().year, "next_year": datetime.date.today().year + 1}
+        cur = conn.cursor()
+        try:
+            for name, sql in SAMPLES.items():
+                cur.execute(sql)
+                row = cur.fetchone()
+                values[name] = "" if row is None or row[0] is None else row[0]
+        finally:
+            cur.close()
+    finally:
+        conn.close()
+
+    quoted = {k: quote(str(v)) for k, v in values.items()}
+    queries = capture([url.format(**quoted) for url in REQUESTS], [])
+    for label, sql, params in EXTRA_QUERIES:
+        queries.append((label, sql, tuple(p.format(**values) for p in params)))
+
+    report, seen = [], set()
+    conn = get_connection()
+    try:
+        for source, sql, params in queries:
+            key = " ".join(sql.split())
+            if key in seen:
+                continue
+            seen.add(key)
+            plan_rows = explain(conn, sql, params)
+            report.append({
+                "source": source,
+                "sql": key,
+                "plan": [{k: row.get(k) for k in ("table", "type", "key", "rows", "Extra")}
+                         for row in plan_rows],
+                "findings": findings(plan_rows, args.min_rows),
+            })
+    finally:
+        conn.close()
+
+    problems = sum(1 for r in report for f in r["findings"] if f[0] == "problem")
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    else:
+        for r in report:
+            mark = "!!" if any(f[0] == "problem" for f in r["findings"]) else "ok"
+            print(f"[{mark}] {r['source']}\n     {r['sql'][:160]}")
+            for p in r["plan"]:
+                print(f"     {p['table']}: type={p['type']} key={p['key']} rows={p['rows']}")
+            for severity, table, text in r["findings"]:
+                print(f"     {severity}: {table}: {text}")
+        print(f"{len(report)} queries, {problems} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
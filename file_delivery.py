@@ -0,0 +1,187 @@
+# file_delivery.py
+"""
+多模态文件下发：条件请求、断点续传（Range / If-Range）与 Web 服务器转交。
+
+- 单个 Range  -> 206 + Content-Range
+- 多个 Range  -> 206 multipart/byteranges（重叠 / 相邻区间先合并，超过 MAX_RANGES 个时按整文件返回）
+- 无法满足的 Range -> 416
+- If-Range 与当前 ETag / Last-Modified 不一致时忽略 Range，返回整个文件
+- MEDHUB_FILE_OFFLOAD=nginx  返回 X-Accel-Redirect，由 nginx 读文件（需配置 internal location）
+  MEDHUB_FILE_OFFLOAD=apache 返回 X-Sendfile（mod_xsendfile）
+  转交时 Range 由 Web 服务器自己处理，Python worker 不再拷贝文件内容
+"""
+
+import mimetypes
+import os
+import secrets
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+FILE_OFFLOAD = os.environ.get("MEDHUB_FILE_OFFLOAD", "").lower()
+# nginx 中映射到项目根目录的 internal location，例如：
+#   location /protected/ { internal; alias /srv/medhub/; }
+ACCEL_PREFIX = os.environ.get("MEDHUB_ACCEL_PREFIX", "/protected/")
+
+MAX_RANGES = 16
+READ_CHUNK = 64 * 1024
+
+
+# ---------- 与框架无关的部分：req 为 Flask / Quart 的 request，异步版本（multimodal_async.py）共用 ----------
+
+def file_etag(st):
+    """强 ETag：文件大小 + 修改时间（纳秒）"""
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def file_info(abs_path, st):
+    """返回 (etag, last_modified, content_type)"""
+    last_modified = datetime.fromtimestamp(int(st.st_mtime), tz=timezone.utc)
+    content_type = mimetypes.guess_type(abs_path)[0] or "application/octet-stream"
+    return file_etag(st), last_modified, content_type
+
+
+def set_validators(resp, etag, last_modified, max_age):
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.cache_control.max_age = max_age
+    resp.cache_control.private = True
+    resp.accept_ranges = "bytes"
+    return resp
+
+
+def not_modified(req, etag, last_modified):
+    if req.if_none_match:
+        return req.if_none_match.contains_weak(etag)
+    if req.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= req.if_modified_since
+    return False
+
+
+def if_range_matches(req, etag, last_modified):
+    if_range = req.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return last_modified.replace(microsecond=0) == if_range.date
+    return True   # 没有 If-Range 头
+
+
+def offload_headers(abs_path, rel_path):
+    """交给 Web 服务器发送文件时的响应头；未配置转交时返回 None"""
+    if FILE_OFFLOAD == "nginx":
+        return {"X-Accel-Redirect": ACCEL_PREFIX + quote(rel_path.lstrip("/"))}
+    if FILE_OFFLOAD == "apache":
+        return {"X-Sendfile": abs_path}
+    return None
+
+
+def satisfiable_ranges(rng, length):
+    """把 werkzeug 解析出的区间换算成 [start, stop)，丢弃无法满足的区间并合并重叠区间"""
+    spans = []
+    for begin, end in rng.ranges:
+        if begin < 0:                       # bytes=-500：最后 500 字节
+            start, stop = max(0, length + begin), length
+        else:
+            start, stop = begin, length if end is None else min(end, length)
+        if start < stop:
+            spans.append((start, stop))
+    spans.sort()
+    merged = []
+    for start, stop in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def requested_spans(req, etag, last_modified, length):
+    """
+    本次请求要返回的区间：None 表示返回整个文件（没有 Range、If-Range 不一致或区间过多），
+    [] 表示 416，否则为 1..MAX_RANGES 个 [start, stop)
+    """
+    rng = req.range
+    if rng is None or rng.units != "bytes" or not if_range_matches(req, etag, last_modified):
+        return None
+    spans = satisfiable_ranges(rng, length)
+    return spans if len(spans) <= MAX_RANGES else None
+
+
+def part_header(start, stop, length, content_type, boundary):
+    return (
+        f"\r\n--{boundary}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n"
+    ).encode("ascii")
+
+
+def multipart_end(boundary):
+    return f"\r\n--{boundary}--\r\n".encode("ascii")
+
+
+# ---------- Flask 版本 ----------
+
+def _read_span(path, start, stop):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            data = f.read(min(READ_CHUNK, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _multipart(path, spans, length, content_type, boundary):
+    for start, stop in spans:
+        yield part_header(start, stop, length, content_type, boundary)
+        yield from _read_span(path, start, stop)
+    yield multipart_end(boundary)
+
+
+def serve_file(abs_path, rel_path, max_age=3600):
+    """
+    abs_path: 文件绝对路径
+    rel_path: 相对项目根目录的路径（用于 X-Accel-Redirect）
+    """
+    from flask import Response, request, send_file
+
+    st = os.stat(abs_path)
+    length = st.st_size
+    etag, last_modified, content_type = file_info(abs_path, st)
+
+    if not_modified(request, etag, last_modified):
+        return set_validators(Response(status=304), etag, last_modified, max_age)
+
+    # 交给 Web 服务器发送文件（它会自己处理 Range）
+    headers = offload_headers(abs_path, rel_path)
+    if headers:
+        resp = Response(status=200, content_type=content_type, headers=headers)
+        return set_validators(resp, etag, last_modified, max_age)
+
+    spans = requested_spans(request, etag, last_modified, length)
+    if spans is not None:
+        if not spans:
+            resp = Response(status=416)
+            resp.headers["Content-Range"] = f"bytes */{length}"
+            return set_validators(resp, etag, last_modified, max_age)
+
+        if len(spans) == 1:
+            start, stop = spans[0]
+            resp = Response(_read_span(abs_path, start, stop), status=206,
+                            content_type=content_type, direct_passthrough=True)
+            resp.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{length}"
+            resp.content_length = stop - start
+            return set_validators(resp, etag, last_modified, max_age)
+
+        boundary = secrets.token_hex(16)
+        resp = Response(_multipart(abs_path, spans, length, content_type, boundary),
+                        status=206, direct_passthrough=True,
+                        content_type=f"multipart/byteranges; boundary={boundary}")
+        return set_validators(resp, etag, last_modified, max_age)
+
+    # 整个文件：send_file 会使用 wsgi.file_wrapper（服务器支持时走 sendfile）
+    resp = send_file(abs_path, mimetype=content_type, conditional=False,
+                     etag=etag, last_modified=last_modified, max_age=max_age)
+    return set_validators(resp, etag, last_modified, max_age)
@@ -0,0 +1,61 @@
+# gunicorn.conf.py
+"""
+gunicorn 配置（gunicorn -c gunicorn.conf.py wsgi:app），各项可用环境变量覆盖。
+
+- 多进程 + 线程（gthread）：每个进程 MEDHUB_THREADS 个线程并发处理请求，
+  进程内的连接池上限默认跟线程数走（线程数 + 2，留给流式导出等占用连接较久的请求），
+  数据库总连接数约为 workers × 连接池上限，要小于 MySQL 的 max_connections
+- 回收：每个进程处理 max_requests（加随机抖动，避免同时重启）个请求后重启，限制内存缓慢增长
+- 优雅退出：收到 SIGTERM 后停止接收新连接，在 graceful_timeout 内处理完手上的请求，
+  进程退出时关闭连接池（close_pool）
+- keep-alive：前面有 nginx 等反向代理时保持几秒即可，直接面向客户端时可适当调大
+
+进程数 / 线程数的取值用 benchmarks/load_test.py --url 实测确定，见 BACKEND_ARCHITECTURE.md 第 6 节；
+下面的默认值尚未实测，实测结果记录在 benchmarks/results/README.md。
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("MEDHUB_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("MEDHUB_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("MEDHUB_THREADS", "4"))
+worker_connections = int(os.environ.get("MEDHUB_WORKER_CONNECTIONS", "1000"))  # 每进程最多保持的连接数
+
+max_requests = int(os.environ.get("MEDHUB_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("MEDHUB_MAX_REQUESTS_JITTER", "200"))
+
+timeout = int(os.environ.get("MEDHUB_TIMEOUT", "120"))               # 大文件上传 / 导出留足时间
+graceful_timeout = int(os.environ.get("MEDHUB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("MEDHUB_KEEPALIVE", "5"))
+
+# 应用在各进程中分别加载：连接池、缓存、指标都是进程内的，不与 master 共享
+preload_app = False
+
+accesslog = os.environ.get("MEDHUB_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("MEDHUB_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # 多进程指标（MEDHUB_METRICS_DIR）：清掉上一次运行留下的各进程数据
+    import metrics
+    metrics.reset_dir()
+
+
+def post_fork(server, worker):
+    # 连接池在第一次请求时创建；未显式设置 MEDHUB_POOL_MAX 时按线程数确定上限
+    if "MEDHUB_POOL_MAX" not in os.environ:
+        import db_utils
+        db_utils.POOL_MAX_SIZE = threads + 2
+        db_utils.POOL_MIN_SIZE = min(db_utils.POOL_MIN_SIZE, db_utils.POOL_MAX_SIZE)
+
+
+def worker_exit(server, worker):
+    # 在途请求已处理完（或超过 graceful_timeout），关闭空闲连接，使用中的连接归还时关闭
+    from db_utils import close_pool
+    close_pool()
+    import metrics
+    metrics.archive()
+    server.log.info("Worker %s closed its connection pool.", worker.pid)
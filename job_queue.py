@@ -0,0 +1,214 @@
+# job_queue.py
+"""
+后台任务队列（MySQL 表 background_jobs）。
+
+- enqueue 可以和业务数据写在同一个事务里（commit=False），记录写入成功任务才会出现
+- worker 用 SELECT ... FOR UPDATE SKIP LOCKED 领取任务，多进程 / 多机器同时消费互不阻塞
+- 失败按指数退避重试（run_after 推后），超过 max_attempts 次标记为 failed；
+  抛出 PermanentJobError 的任务不再重试
+- worker 进程崩溃后，running 超过 JOB_LEASE 秒的任务会被重新放回队列
+
+任务处理函数用 @handler("kind") 注册（见 tasks.py），worker 入口见 worker.py。
+"""
+
+import json
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_BASE = 5          # 第 n 次失败后约等待 BASE * 2^(n-1) 秒
+JOB_BACKOFF_MAX = 3600
+JOB_LEASE = int(os.environ.get("MEDHUB_JOB_LEASE", "900"))   # 单个任务最长运行时间（秒）
+
+JOBS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS background_jobs (
+        id           BIGINT AUTO_INCREMENT PRIMARY KEY,
+        kind         VARCHAR(64)  NOT NULL,
+        payload      JSON         NOT NULL,
+        status       ENUM('queued','running','done','failed') NOT NULL DEFAULT 'queued',
+        attempts     INT          NOT NULL DEFAULT 0,
+        max_attempts INT          NOT NULL DEFAULT 5,
+        run_after    DATETIME(3)  NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+        locked_by    VARCHAR(64)  NULL,
+        locked_at    DATETIME(3)  NULL,
+        last_error   TEXT         NULL,
+        result       JSON         NULL,
+        created_at   DATETIME(3)  NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+        updated_at   DATETIME(3)  NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+        INDEX idx_jobs_claim (status, run_after),
+        INDEX idx_jobs_kind (kind, status)
+    )
+"""
+
+HANDLERS = {}
+
+
+class PermanentJobError(Exception):
+    """重试也不会成功的错误（如缺少依赖、不支持的格式）"""
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def ensure_schema(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute(JOBS_TABLE_SQL)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def enqueue(conn, kind, payload, max_attempts=JOB_MAX_ATTEMPTS, delay=0, commit=True):
+    """写入一个任务，返回任务 id；commit=False 时由调用方与业务数据一起提交"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "INSERT INTO background_jobs (kind, payload, max_attempts, run_after) "
+            "VALUES (%s, %s, %s, NOW(3) + INTERVAL %s SECOND)",
+            (kind, json.dumps(payload, ensure_ascii=False), max_attempts, delay),
+        )
+        job_id = cur.lastrowid
+    finally:
+        cur.close()
+    if commit:
+        conn.commit()
+    return job_id
+
+
+def backoff_delay(attempts):
+    delay = min(JOB_BACKOFF_BASE * 2 ** (attempts - 1), JOB_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)     # 加抖动，避免同一批失败任务同时重试
+
+
+def claim(conn, worker_id, kinds=None):
+    """领取一个到期任务并标记为 running，没有可领取的任务时返回 None"""
+    kinds = list(kinds or HANDLERS)
+    if not kinds:
+        return None
+    cur = conn.cursor(dictionary=True)
+    try:
+        # autocommit 关闭，SELECT ... FOR UPDATE 开启事务，提交后释放行锁
+        cur.execute(
+            "SELECT id, kind, payload, attempts, max_attempts FROM background_jobs "
+            "WHERE status = 'queued' AND run_after <= NOW(3) "
+            f"AND kind IN ({', '.join(['%s'] * len(kinds))}) "
+            "ORDER BY run_after, id LIMIT 1 FOR UPDATE SKIP LOCKED",
+            tuple(kinds),
+        )
+        job = cur.fetchone()
+        if job is None:
+            conn.rollback()
+            return None
+        cur.execute(
+            "UPDATE background_jobs SET status = 'running', attempts = attempts + 1, "
+            "locked_by = %s, locked_at = NOW(3) WHERE id = %s",
+            (worker_id, job["id"]),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    job["attempts"] += 1
+    job["payload"] = json.loads(job["payload"])
+    return job
+
+
+def _finish(conn, job_id, worker_id, sql, params):
+    # locked_by 条件防止租约过期后被别的 worker 重新领取的任务被旧 worker 覆盖
+    cur = conn.cursor()
+    try:
+        cur.execute(sql + " WHERE id = %s AND locked_by = %s", params + (job_id, worker_id))
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def run_job(conn, job, worker_id):
+    func = HANDLERS.get(job["kind"])
+    started = time.monotonic()
+    try:
+        if func is None:
+            raise PermanentJobError(f"no handler registered for {job['kind']}")
+        result = func(job["payload"])
+    except Exception as e:
+        message = f"{type(e).__name__}: {e}"
+        if isinstance(e, PermanentJobError) or job["attempts"] >= job["max_attempts"]:
+            logger.error("Job %s (%s) failed permanently: %s", job["id"], job["kind"], message)
+            _finish(conn, job["id"], worker_id,
+                    "UPDATE background_jobs SET status = 'failed', last_error = %s, locked_by = NULL",
+                    (message,))
+        else:
+            delay = backoff_delay(job["attempts"])
+            logger.warning("Job %s (%s) attempt %d failed, retry in %.0fs: %s",
+                           job["id"], job["kind"], job["attempts"], delay, message)
+            _finish(conn, job["id"], worker_id,
+                    "UPDATE background_jobs SET status = 'queued', last_error = %s, locked_by = NULL, "
+                    "run_after = NOW(3) + INTERVAL %s SECOND",
+                    (message, delay))
+        return False
+
+    _finish(conn, job["id"], worker_id,
+            "UPDATE background_jobs SET status = 'done', result = %s, last_error = NULL, locked_by = NULL",
+            (json.dumps(result, ensure_ascii=False, default=str),))
+    logger.info("Job %s (%s) done in %.2fs.", job["id"], job["kind"], time.monotonic() - started)
+    return True
+
+
+def requeue_stale(conn, lease=JOB_LEASE):
+    """
+    把租约过期（worker 崩溃 / 被杀）的 running 任务放回队列，返回处理的数量；
+    已用完重试次数的（多半是每次都把 worker 拖死的任务）直接标记为 failed
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE background_jobs SET "
+            "status = IF(attempts >= max_attempts, 'failed', 'queued'), locked_by = NULL, "
+            "last_error = 'lease expired' "
+            "WHERE status = 'running' AND locked_at < NOW(3) - INTERVAL %s SECOND",
+            (lease,),
+        )
+        count = cur.rowcount
+        conn.commit()
+        return count
+    finally:
+        cur.close()
+
+
+def get_job(conn, job_id):
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute(
+            "SELECT id, kind, payload, status, attempts, max_attempts, run_after, "
+            "last_error, result, created_at, updated_at FROM background_jobs WHERE id = %s",
+            (job_id,),
+        )
+        return cur.fetchone()
+    finally:
+        cur.close()
+
+
+def retry_job(conn, job_id):
+    """把 failed 的任务重新放回队列，返回是否成功"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE background_jobs SET status = 'queued', attempts = 0, run_after = NOW(3) "
+            "WHERE id = %s AND status = 'failed'",
+            (job_id,),
+        )
+        conn.commit()
+        return cur.rowcount == 1
+    finally:
+        cur.close()
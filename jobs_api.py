@@ -0,0 +1,104 @@
+# jobs_api.py
+"""
+后台任务状态接口。
+
+    GET  /api/jobs/<id>          查询单个任务
+    GET  /api/jobs?status=&kind= 任务列表（按 id 翻页，同其他列表接口）
+    POST /api/jobs/<id>/retry    把 failed 的任务重新放回队列（运维操作，需要 admin_auth）
+"""
+
+import json
+import logging
+
+from flask import Blueprint, request, jsonify
+
+from admin_auth import require_admin
+from db_utils import get_connection
+from job_queue import get_job, retry_job
+from pagination import parse_page_args, apply_keyset, split_page
+
+jobs_bp = Blueprint('jobs', __name__)
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = {"queued", "running", "done", "failed"}
+
+
+def _job_json(row):
+    def iso(value):
+        return value.isoformat() if value is not None else None
+
+    def loads(value):
+        return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "maxAttempts": row["max_attempts"],
+        "payload": loads(row["payload"]),
+        "result": loads(row["result"]),
+        "lastError": row["last_error"],
+        "runAfter": iso(row["run_after"]),
+        "createdAt": iso(row["created_at"]),
+        "updatedAt": iso(row["updated_at"]),
+    }
+
+
+@jobs_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    conn = get_connection()
+    try:
+        row = get_job(conn, job_id)
+    finally:
+        conn.close()
+    if row is None:
+        return jsonify({"success": False, "message": "任务不存在"}), 404
+    return jsonify({"success": True, "data": _job_json(row)}), 200
+
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    sql = ("SELECT id, kind, payload, status, attempts, max_attempts, run_after, "
+           "last_error, result, created_at, updated_at FROM background_jobs WHERE 1=1")
+    params = []
+    status = request.args.get("status")
+    if status:
+        if status not in JOB_STATUSES:
+            return jsonify({"success": False, "message": "status 取值无效"}), 400
+        sql += " AND status = %s"
+        params.append(status)
+    kind = request.args.get("kind")
+    if kind:
+        sql += " AND kind = %s"
+        params.append(kind)
+    sql, params = apply_keyset(sql, params, after, limit)
+
+    with get_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, tuple(params))
+            rows, next_cursor = split_page(cur.fetchall(), limit)
+        finally:
+            cur.close()
+    return jsonify({"success": True, "data": [_job_json(r) for r in rows],
+                    "nextCursor": next_cursor}), 200
+
+
+@jobs_bp.route('/api/jobs/<int:job_id>/retry', methods=['POST'])
+@require_admin
+def retry_failed_job(job_id):
+    conn = get_connection()
+    try:
+        retried = retry_job(conn, job_id)
+    finally:
+        conn.close()
+    if not retried:
+        return jsonify({"success": False, "message": "任务不存在或不是 failed 状态"}), 409
+    logger.info("Job %s requeued by API.", job_id)
+    return jsonify({"success": True, "message": "任务已重新排队"}), 200
@@ -0,0 +1,387 @@
+# metrics.py
+"""
+请求级耗时统计，以 Prometheus 文本格式在 /metrics 输出。
+
+每个请求记录（按路由模板分组，如 /api/patients/<pid>，不会因为参数值产生大量标签）：
+- medhub_http_request_duration_seconds   ：总耗时（另带 method / status）
+- medhub_http_request_db_seconds         ：其中花在数据库上的时间（execute + fetch）
+- medhub_http_request_serialize_seconds  ：其中 JSON 序列化的时间
+- medhub_http_request_pool_wait_seconds  ：其中从连接池借连接的时间（含等待、健康检查、新建连接）
+- medhub_http_response_rows / _bytes     ：返回的数据库行数、响应体字节数
+另有全局的 medhub_db_query_duration_seconds 和连接池状态（使用中 / 空闲 / 等待次数 / 超时次数）。
+
+开销：每次查询两次 perf_counter 和一次线程局部变量累加，每个请求结束时一次加锁写直方图。
+流式导出接口的查询在响应发送过程中执行，计入全局查询直方图，不计入请求级的 db 时间。
+
+多进程部署（gunicorn）：设置 MEDHUB_METRICS_DIR 为各进程共享的目录，每个进程每隔
+MEDHUB_METRICS_FLUSH 秒（默认 5）把自己的直方图写到 <目录>/<pid>.json，/metrics 由收到请求的进程
+合并全部文件后输出；进程退出时（gunicorn worker_exit）把数据并入 _archive.json，计数不会因为进程回收而回退。
+被 SIGKILL 的进程来不及归档，进程不存在后它的 <pid>.json 不再计入（这部分计数会丢失）。
+未设置时指标只在进程内，每个进程各自一份。
+
+启用：metrics.init_app(app)；/metrics 的访问控制见 admin_auth.py
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import db_pool
+from admin_auth import require_admin
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_DIR = os.environ.get("MEDHUB_METRICS_DIR", "")
+FLUSH_INTERVAL = float(os.environ.get("MEDHUB_METRICS_FLUSH", "5"))
+ARCHIVE_FILE = "_archive.json"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}              # 标签值 -> [各桶计数..., +Inf 计数, 总和]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        """[[标签值..., 序列]]，可写入 JSON"""
+        with self._lock:
+            return [[*k, list(v)] for k, v in self._series.items()]
+
+    def render(self, extra=()):
+        """extra 为其他进程的 snapshot，与本进程的数据相加后输出"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            merged = {k: list(v) for k, v in self._series.items()}
+        for snapshot in extra:
+            _merge_into(merged, snapshot)
+        items = sorted(merged.items())
+        for label_values, series in items:
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}" if base
+                         else f"{self.name}_sum {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}" if base
+                         else f"{self.name}_count {cumulative}")
+        return lines
+
+
+def _merge_into(merged, snapshot):
+    for *label_values, series in snapshot:
+        key = tuple(label_values)
+        current = merged.get(key)
+        if current is None:
+            merged[key] = list(series)
+        else:
+            merged[key] = [a + b for a, b in zip(current, series)]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram("medhub_http_request_duration_seconds", "Request latency",
+                             ("method", "route", "status"))
+REQUEST_DB = Histogram("medhub_http_request_db_seconds", "Time spent in the database per request",
+                       ("route",))
+REQUEST_SERIALIZE = Histogram("medhub_http_request_serialize_seconds",
+                              "Time spent serializing JSON per request", ("route",))
+REQUEST_POOL_WAIT = Histogram("medhub_http_request_pool_wait_seconds",
+                              "Time spent acquiring pooled connections per request", ("route",))
+RESPONSE_ROWS = Histogram("medhub_http_response_rows", "Database rows fetched per request",
+                          ("route",), ROW_BUCKETS)
+RESPONSE_BYTES = Histogram("medhub_http_response_bytes", "Response body size",
+                           ("route",), BYTE_BUCKETS)
+QUERY_DURATION = Histogram("medhub_db_query_duration_seconds", "Database execute + fetch time")
+POOL_ACQUIRE = Histogram("medhub_db_pool_acquire_seconds", "Time to acquire a pooled connection")
+
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_DB, REQUEST_SERIALIZE, REQUEST_POOL_WAIT,
+              RESPONSE_ROWS, RESPONSE_BYTES, QUERY_DURATION, POOL_ACQUIRE]
+
+# 连接池统计字段 -> (指标名, 类型)
+POOL_GAUGES = {
+    "inUse": ("medhub_db_pool_in_use", "gauge"),
+    "idle": ("medhub_db_pool_idle", "gauge"),
+    "waits": ("medhub_db_pool_waits_total", "counter"),
+    "waitTimeSeconds": ("medhub_db_pool_wait_seconds_total", "counter"),
+    "timeouts": ("medhub_db_pool_timeouts_total", "counter"),
+}
+
+
+# ---------- 请求内累计 ----------
+
+class _RequestStats(threading.local):
+    active = False
+    db = 0.0
+    serialize = 0.0
+    pool_wait = 0.0
+    rows = 0
+
+
+_current = _RequestStats()
+
+
+def _record_query(seconds, rows):
+    QUERY_DURATION.observe(seconds)
+    if _current.active:
+        _current.db += seconds
+        _current.rows += rows
+
+
+def record_pool_acquire(seconds):
+    POOL_ACQUIRE.observe(seconds)
+    if _current.active:
+        _current.pool_wait += seconds
+
+
+class InstrumentedCursor:
+    """给 execute / fetch 计时的游标包装，其余属性透传"""
+
+    def __init__(self, cursor, conn=None):
+        self._cursor = cursor
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        rows = fn(*args)
+        _record_query(time.perf_counter() - started, len(rows))
+        return rows
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        finally:
+            _record_query(time.perf_counter() - started, 0)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(*args, **kwargs)
+        finally:
+            _record_query(time.perf_counter() - started, 0)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        _record_query(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args):
+        return self._timed(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# ---------- Flask 集成 ----------
+
+def _snapshot():
+    from db_utils import get_pool_stats
+    return {"histograms": {h.name: h.snapshot() for h in HISTOGRAMS}, "pool": get_pool_stats() or {}}
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None      # 进程刚退出、文件正被替换
+
+
+def flush():
+    """把本进程的指标写到共享目录（MEDHUB_METRICS_DIR 未设置时不做任何事）"""
+    if METRICS_DIR:
+        _write_json(os.path.join(METRICS_DIR, f"{os.getpid()}.json"), _snapshot())
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def archive():
+    """进程退出时把本进程的直方图并入 _archive.json（连接池状态不保留）并删除 <pid>.json"""
+    if not METRICS_DIR:
+        return
+    try:
+        import fcntl
+    except ImportError:       # Windows：不合并，保留 <pid>.json
+        flush()
+        return
+    with open(os.path.join(METRICS_DIR, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        path = os.path.join(METRICS_DIR, ARCHIVE_FILE)
+        archived = (_read_json(path) or {}).get("histograms", {})
+        for h in HISTOGRAMS:
+            merged = {tuple(item[:-1]): item[-1] for item in archived.get(h.name, [])}
+            _merge_into(merged, h.snapshot())
+            archived[h.name] = [[*k, v] for k, v in merged.items()]
+        _write_json(path, {"histograms": archived, "pool": {}})
+    try:
+        os.remove(os.path.join(METRICS_DIR, f"{os.getpid()}.json"))
+    except FileNotFoundError:
+        pass
+
+
+def reset_dir():
+    """部署启动时（gunicorn on_starting）清空共享目录中上一次运行留下的文件"""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        os.remove(path)
+
+
+def _process_alive(pid):
+    if os.name != "posix":
+        return True           # Windows 上 os.kill 会结束进程；退出进程的 <pid>.json 本来就保留
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _other_processes():
+    """
+    共享目录中其他进程（含已退出进程的归档）的数据。
+    被 SIGKILL 的 worker 不会执行 archive，它留下的 <pid>.json 按进程已不存在跳过，不再计入
+    """
+    if not METRICS_DIR:
+        return []
+    own = f"{os.getpid()}.json"
+    others = []
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        name = os.path.basename(path)
+        if name == own:
+            continue
+        stem = name[:-len(".json")]
+        if stem.isdigit() and not _process_alive(int(stem)):
+            continue
+        data = _read_json(path)
+        if data is not None:
+            others.append(data)
+    return others
+
+
+def render():
+    others = _other_processes()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render([o["histograms"].get(histogram.name, []) for o in others]))
+    from db_utils import get_pool_stats
+    stats = get_pool_stats()
+    if stats:
+        for key, (name, kind) in POOL_GAUGES.items():
+            # 各存活进程的连接池相加
+            value = stats[key] + sum(o["pool"].get(key, 0) for o in others)
+            lines += [f"# TYPE {name} {kind}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """注册请求钩子、计时的 JSON provider 和 /metrics"""
+    from flask import Response, request
+    from flask.json.provider import DefaultJSONProvider
+
+    base_provider = type(app.json) if isinstance(app.json, DefaultJSONProvider) else DefaultJSONProvider
+
+    class TimedJSONProvider(base_provider):
+        def dumps(self, obj, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().dumps(obj, **kwargs)
+            finally:
+                if _current.active:
+                    _current.serialize += time.perf_counter() - started
+
+    app.json_provider_class = TimedJSONProvider
+    app.json = TimedJSONProvider(app)
+    db_pool.cursor_wrapper = InstrumentedCursor
+
+    @app.before_request
+    def _start_timer():
+        _current.active = True
+        _current.db = _current.serialize = _current.pool_wait = 0.0
+        _current.rows = 0
+        _current.started = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        if not _current.active:
+            return response
+        _current.active = False
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        if route == "/metrics":
+            return response
+        REQUEST_DURATION.observe(time.perf_counter() - _current.started,
+                                 request.method, route, str(response.status_code))
+        REQUEST_DB.observe(_current.db, route)
+        REQUEST_SERIALIZE.observe(_current.serialize, route)
+        REQUEST_POOL_WAIT.observe(_current.pool_wait, route)
+        RESPONSE_ROWS.observe(_current.rows, route)
+        if response.content_length is not None:       # 流式响应长度未知，不统计
+            RESPONSE_BYTES.observe(response.content_length, route)
+        return response
+
+    @app.teardown_request
+    def _reset(exc):
+        _current.active = False
+
+    @app.get("/metrics")
+    @require_admin
+    def metrics_view():
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+    return app
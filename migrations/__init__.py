@@ -0,0 +1,157 @@
+# migrations/__init__.py
+"""
+版本化的数据库迁移。
+
+每个迁移是本目录下一个 vNNN_说明.py 模块，包含：
+- VERSION      ：整数版本号，按从小到大执行
+- DESCRIPTION  ：一句话说明
+- COLUMNS      ：[(表, 列, 列定义)]，列已存在时跳过
+- INDEXES      ：[(表, 索引名, (列, ...))]，已有同名索引或已有以这些列开头的索引时跳过
+- FULLTEXT_INDEXES：同上，建为 FULLTEXT ... WITH PARSER ngram（只按索引名判断）
+- STATEMENTS   ：其他 SQL，需要自身可重复执行（CREATE TABLE IF NOT EXISTS 等）
+
+已执行的版本记录在 schema_migrations 表；执行期间持有 MySQL 命名锁，多个实例同时启动也只会执行一次。
+
+    python -m migrations              # 执行未执行的迁移
+    python -m migrations --status     # 查看各版本状态
+    python -m migrations --dry-run    # 只打印将要执行的 SQL
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version     INT          NOT NULL PRIMARY KEY,
+        description VARCHAR(200) NOT NULL,
+        applied_at  DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+MIGRATION_LOCK = "medhub_migrations"
+LOCK_TIMEOUT = 60
+
+
+class MigrationError(Exception):
+    pass
+
+
+def load_migrations():
+    """按版本号排序的迁移模块列表"""
+    modules = []
+    for info in pkgutil.iter_modules(__path__):
+        if re.match(r"^v\d+_", info.name):
+            modules.append(importlib.import_module(f"{__name__}.{info.name}"))
+    modules.sort(key=lambda m: m.VERSION)
+    versions = [m.VERSION for m in modules]
+    if len(set(versions)) != len(versions):
+        raise MigrationError(f"duplicate migration versions: {versions}")
+    return modules
+
+
+def applied_versions(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute(MIGRATIONS_TABLE_SQL)
+        cur.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def existing_indexes(conn, table):
+    """{索引名: (列, ...)}（按 SEQ_IN_INDEX 排序）"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+            (table,),
+        )
+        indexes = {}
+        for name, column in cur.fetchall():
+            indexes.setdefault(name, []).append(column)
+        return {name: tuple(columns) for name, columns in indexes.items()}
+    finally:
+        cur.close()
+
+
+def existing_columns(conn, table):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
+        )
+        return {row[0] for row in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def index_covered(indexes, name, columns):
+    """同名索引已存在，或已有索引以这些列开头（例如外键自动建的索引）
+
+    InnoDB 二级索引末尾隐含主键，(patient_id) 的索引同样满足 (patient_id, id)。
+    """
+    if name in indexes:
+        return True
+    columns = tuple(columns)
+    return any((existing + ("id",))[:len(columns)] == columns for existing in indexes.values())
+
+
+def plan(conn, migration):
+    """一个迁移实际需要执行的 SQL 列表"""
+    statements = []
+    for table, column, definition in getattr(migration, "COLUMNS", ()):
+        if column not in existing_columns(conn, table):
+            statements.append(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    for table, name, columns in getattr(migration, "INDEXES", ()):
+        if not index_covered(existing_indexes(conn, table), name, columns):
+            statements.append(f"ALTER TABLE {table} ADD INDEX {name} ({', '.join(columns)})")
+    for table, name, columns in getattr(migration, "FULLTEXT_INDEXES", ()):
+        if name not in existing_indexes(conn, table):
+            statements.append(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} "
+                              f"({', '.join(columns)}) WITH PARSER ngram")
+    statements.extend(getattr(migration, "STATEMENTS", ()))
+    return statements
+
+
+def migrate(conn, dry_run=False, log=print):
+    """执行全部未执行的迁移，返回执行的版本号列表"""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, LOCK_TIMEOUT))
+        if cur.fetchone()[0] != 1:
+            raise MigrationError("another migration is running")
+        try:
+            done = applied_versions(conn)
+            ran = []
+            for migration in load_migrations():
+                if migration.VERSION in done:
+                    continue
+                log(f"v{migration.VERSION:03d} {migration.DESCRIPTION}")
+                for sql in plan(conn, migration):
+                    log("  " + " ".join(sql.split()))
+                    if not dry_run:
+                        cur.execute(sql)     # DDL 隐式提交，每条语句单独生效
+                if not dry_run:
+                    cur.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                                (migration.VERSION, migration.DESCRIPTION))
+                    conn.commit()
+                ran.append(migration.VERSION)
+            return ran
+        finally:
+            cur.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cur.fetchall()
+    finally:
+        cur.close()
+
+
+def status(conn):
+    """[(版本号, 说明, 是否已执行)]"""
+    done = applied_versions(conn)
+    return [(m.VERSION, m.DESCRIPTION, m.VERSION in done) for m in load_migrations()]
@@ -0,0 +1,22 @@
+# migrations/__main__.py
+import argparse
+
+from db_utils import get_connection
+from migrations import migrate, status
+
+parser = argparse.ArgumentParser(prog="python -m migrations", description="Apply database migrations")
+parser.add_argument("--status", action="store_true", help="查看各版本状态")
+parser.add_argument("--dry-run", action="store_true", help="只打印将要执行的 SQL")
+args = parser.parse_args()
+
+conn = get_connection()
+try:
+    if args.status:
+        for version, description, applied in status(conn):
+            print(f"v{version:03d} {'applied' if applied else 'pending':<8} {description}")
+    else:
+        ran = migrate(conn, dry_run=args.dry_run)
+        print(("would apply: " if args.dry_run else "applied: ")
+              + (", ".join(f"v{v:03d}" for v in ran) if ran else "(none)"))
+finally:
+    conn.close()
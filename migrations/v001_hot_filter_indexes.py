@@ -0,0 +1,26 @@
+# migrations/v001_hot_filter_indexes.py
+"""列表接口过滤 / 统计时间窗口用到的列加索引"""
+
+VERSION = 1
+DESCRIPTION = "indexes for list filters and time windows"
+
+INDEXES = [
+    # /api/doctors?departmentId=（有外键 fk_doctor_dept 时已自带索引，会跳过）
+    ("doctors", "idx_doctors_department", ("department_id",)),
+    # /api/medical-records?patientId= / ?doctorId=，以及按就诊日期的统计
+    ("medical_records", "idx_records_patient_visit", ("patient_id", "visit_date")),
+    ("medical_records", "idx_records_doctor_visit", ("doctor_id", "visit_date")),
+    ("medical_records", "idx_records_visit_date", ("visit_date",)),
+    # /api/prescriptions?recordId=
+    ("prescription_details", "idx_prescriptions_record", ("record_id",)),
+    # /api/appointments?status=，挂号统计的时间窗口
+    ("appointments", "idx_appointments_status_time", ("status", "create_time")),
+    ("appointments", "idx_appointments_create_time", ("create_time",)),
+    # 新增患者统计
+    ("patients", "idx_patients_create_time", ("create_time",)),
+    # /api/multimodal?modality=&patientId=
+    ("multimodal_data", "idx_multimodal_modality_patient", ("modality", "patient_id", "created_at")),
+    ("multimodal_data", "idx_multimodal_patient_created", ("patient_id", "created_at")),
+    # 去重存储的引用计数（blob_store.reference_count）
+    ("multimodal_data", "idx_multimodal_file_path", ("file_path",)),
+]
@@ -0,0 +1,14 @@
+# migrations/v002_sidecar_tables.py
+"""后台任务、文本抽取、统计汇总用到的表和全文索引（各模块的 ensure_* 仍可单独使用）"""
+
+from job_queue import JOBS_TABLE_SQL
+from search import SEARCH_INDEXES
+from stats_aggregates import STATS_TABLES_SQL
+from text_extract import TEXT_TABLE_SQL
+
+VERSION = 2
+DESCRIPTION = "background_jobs, multimodal_text, stats tables and fulltext indexes"
+
+FULLTEXT_INDEXES = SEARCH_INDEXES
+
+STATEMENTS = [JOBS_TABLE_SQL, TEXT_TABLE_SQL, *STATS_TABLES_SQL]
@@ -0,0 +1,18 @@
+# migrations/v003_keyset_indexes.py
+"""游标分页按 id 排序：带过滤条件的列表需要 (过滤列, id) 的索引，v001 的 (过滤列, 时间) 索引用不上"""
+
+VERSION = 3
+DESCRIPTION = "(filter, id) indexes for keyset pagination"
+
+INDEXES = [
+    # /api/appointments?status=（v001 的 (status, create_time) 只能过滤，排序仍要 filesort）
+    ("appointments", "idx_appointments_status_id", ("status", "id")),
+    # /api/medical-records?patientId= / ?doctorId=（外键自带的单列索引已满足时跳过）
+    ("medical_records", "idx_records_patient_id", ("patient_id", "id")),
+    ("medical_records", "idx_records_doctor_id", ("doctor_id", "id")),
+    # /api/multimodal?modality=&patientId=
+    ("multimodal_data", "idx_multimodal_modality_id", ("modality", "id")),
+    ("multimodal_data", "idx_multimodal_patient_id", ("patient_id", "id")),
+    ("multimodal_data", "idx_multimodal_modality_patient_id", ("modality", "patient_id", "id")),
+    # /api/doctors?departmentId=、/api/prescriptions?recordId= 由 v001 的单列索引满足（隐含主键）
+]
@@ -0,0 +1,16 @@
+# migrations/v004_row_versions.py
+"""会被原地更新的表加 updated_at（ON UPDATE 自动维护），条件请求的版本号取 MAX(updated_at)，不再对整表算校验和"""
+
+VERSION = 4
+DESCRIPTION = "appointments.updated_at for conditional list requests"
+
+COLUMNS = [
+    ("appointments", "updated_at",
+     "DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3)"),
+]
+
+INDEXES = [
+    # /api/appointments?status= 的版本查询 COUNT(*) / MAX(id) / MAX(updated_at) 只读这个索引
+    ("appointments", "idx_appointments_status_updated", ("status", "updated_at")),
+    ("appointments", "idx_appointments_updated", ("updated_at",)),
+]
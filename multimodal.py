@@ -1,9 +1,28 @@
 # --- START OF FILE app/api/multimodal.py ---
 import os
+import sys
 import logging
-from flask import Blueprint, request, jsonify, send_file
-from werkzeug.utils import secure_filename
-from app.utils.db import get_db_connection
+from contextlib import nullcontext
+from flask import Blueprint, request, jsonify
+if hasattr(sys.modules.get("app"), "__path__"):
+    from app.utils.db import get_db_connection
+else:
+    # 扁平结构（app.py 是模块而不是包）下注册本蓝图时用同一个连接池；
+    # 不能先试 import app.utils.db，python app.py 启动时那样会把 app.py 再执行一遍
+    from db_utils import get_connection as get_db_connection
+from pagination import parse_page_args, apply_keyset, split_page
+from streaming import stream_format, stream_rows
+from schema import MULTIMODAL_ITEMS, INSERT_MULTIMODAL_SQL, multimodal_values
+from conditional import table_version, version_validators, not_modified, with_validators
+from file_delivery import serve_file
+from upload_sessions import UploadSessionStore, UploadError
+from blob_store import (BlobStore, blob_lock, reference_count, modality_dir_for, file_format_of,
+                        relative_path, absolute_path)
+from derivatives import DerivativeStore, DerivativeError, VARIANTS
+from tasks import enqueue_postprocess
+from timeseries import (SeriesStore, SeriesError, parse_interval, parse_time_arg,
+                        resample_mean, to_json, SERIES_MAX_POINTS, SERIES_MAX_POINTS_LIMIT)
+from downsample import METHODS, select_indices
 
 multimodal_bp = Blueprint('multimodal', __name__)
 logger = logging.getLogger(__name__)
@@ -13,9 +32,80 @@ logger = logging.getLogger(__name__)
 UPLOAD_ROOT = os.path.join(os.getcwd(), "uploaded_files")
 os.makedirs(UPLOAD_ROOT, exist_ok=True)
 
+# 文件接口的浏览器缓存时间（秒），过期后用 ETag / Last-Modified 做条件请求
+FILE_MAX_AGE = 3600
+
+# 分片上传的临时目录，与正式目录在同一文件系统，完成后可原子移动
+upload_store = UploadSessionStore(os.path.join(UPLOAD_ROOT, ".uploads"))
+
+# 按内容寻址的文件存储：uploaded_files/<modality>/blobs/ab/cd/<sha256>.<ext>
+blob_store = BlobStore(UPLOAD_ROOT)
+
+# 缩略图 / 预览图缓存：uploaded_files/.derivatives/，上传后由后台任务（worker.py）生成，
+# 请求时还没有生成好的在本进程线程池中补生成
+derivative_store = DerivativeStore(os.path.join(UPLOAD_ROOT, ".derivatives"))
+# ?variant= 请求等待生成的最长时间（秒），超时返回 202，客户端稍后重试
+DERIVATIVE_WAIT = 2.0
+
+# timeseries CSV 的列式存储：uploaded_files/.series/，上传后由后台任务导入，未导入的在首次查询时导入
+series_store = SeriesStore(os.path.join(UPLOAD_ROOT, ".series"))
+
+
+def _insert_blob_record(conn, tmp_path, sha256, filename, get_field):
+    """
+    把已计算好 sha256 的临时文件放入 blob 存储并写入记录，两步在同一把命名锁内完成，
+    避免与删除最后一个引用的请求交错。get_field 取记录字段（见 schema.multimodal_values）。
+    上传后处理（派生图等）作为后台任务与记录在同一事务中写入，返回 (file_path, file_format, job_ids)
+
+    先写记录（主键重复等错误在移动文件前就失败），再移动文件、提交；提交失败时把新移入的文件移回
+    tmp_path。tmp_path 由调用方在成功后删除，失败时仍在原处（分片上传可以重新 complete）。
+    """
+    data_id = get_field("id")
+    modality = get_field("modality")
+    file_format = file_format_of(filename)
+    modality_dir = modality_dir_for(modality)
+    file_path = relative_path(blob_store.blob_path(modality_dir, sha256, file_format))
+
+    with blob_lock(conn, file_path):
+        cursor = conn.cursor()
+        created = False
+        try:
+            cursor.execute(INSERT_MULTIMODAL_SQL, multimodal_values(get_field, file_path, file_format))
+            job_ids = enqueue_postprocess(conn, data_id, file_path, modality)
+            abs_path, created = blob_store.ingest_file(tmp_path, sha256, modality_dir, file_format)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            if created:
+                blob_store.restore(abs_path, tmp_path)
+            raise
+        finally:
+            cursor.close()
+    if not created:
+        logger.info("Deduplicated upload %s -> existing blob %s.", filename, file_path)
+    return file_path, file_format, job_ids
+
+
+def _created_response(_id, file_path, file_format, job_ids=()):
+    return jsonify(
+        {
+            "success": True,
+            "message": "多模态数据创建成功",
+            "data": {
+                "id": _id,
+                "filePath": file_path,
+                "fileFormat": file_format,
+                "fileUrl": f"/api/multimodal/file/{_id}",
+                # 后台处理任务，可用 GET /api/jobs/<id> 查询进度
+                "jobIds": list(job_ids),
+            },
+        }
+    ), 201
+
 
 # 1. 获取多模态数据列表
 #    GET /api/multimodal?modality=image&patientId=P001
+#    GET /api/multimodal?format=ndjson   流式导出全部（可叠加过滤条件）
 @multimodal_bp.route('/api/multimodal', methods=['GET'])
 def get_multimodal_list():
     conn = None
@@ -29,48 +119,57 @@ def get_multimodal_list():
             modality, patient_id
         )
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        where = " WHERE 1=1"
+        params = []
+
+        if modality:
+            where += " AND modality = %s"
+            params.append(modality)
+        if patient_id:
+            where += " AND patient_id = %s"
+            params.append(patient_id)
 
         sql = """
             SELECT id, patient_id, record_id, source_table, source_pk,
                    modality, text_content, file_path, file_format,
                    description, created_at
             FROM multimodal_data
-            WHERE 1=1
-        """
-        params = []
+        """ + where
 
-        if modality:
-            sql += " AND modality = %s"
-            params.append(modality)
-        if patient_id:
-            sql += " AND patient_id = %s"
-            params.append(patient_id)
+        fmt = stream_format(request.args)
+        if fmt:
+            # 连接由流式生成器自己获取和归还
+            return stream_rows(get_db_connection, sql + " ORDER BY id", params,
+                               MULTIMODAL_ITEMS, fmt)
+
+        try:
+            after, limit = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # 条件请求：数据没变化时直接返回 304
+        version = table_version(cursor, "multimodal_data", where, params, ts_column="created_at")
+        etag, last_modified = version_validators(version)
+        not_modified_resp = not_modified(etag, last_modified)
+        if not_modified_resp is not None:
+            logger.debug("Multimodal list not modified (etag=%s).", etag)
+            return not_modified_resp
+
+        sql, params = apply_keyset(sql, params, after, limit)
         cursor.execute(sql, tuple(params))
-        rows = cursor.fetchall()
-
-        data = []
-        for row in rows:
-            data.append({
-                "id": row["id"],
-                "patientId": row["patient_id"],
-                "recordId": row["record_id"],
-                "sourceTable": row["source_table"],
-                "sourcePk": row["source_pk"],
-                "modality": row["modality"],
-                "textContent": row["text_content"],
-                "filePath": row["file_path"],      # 相对路径：uploaded_files/...
-                "fileFormat": row["file_format"],
-                "description": row["description"],
-                "createdAt": row["created_at"].isoformat() if row["created_at"] else None,
-                # 给前端一个现成可用的文件 URL
-                "fileUrl": f"/api/multimodal/file/{row['id']}",
-            })
-
-        logger.info("Fetched %d multimodal records.", len(data))
-        return jsonify(data)
+        # filePath 为相对路径：uploaded_files/...；fileUrl 为现成可用的文件 URL
+        data, next_cursor = split_page(MULTIMODAL_ITEMS.fetch_all(cursor), limit)
+
+        logger.debug("Fetched %d multimodal records.", len(data))
+        # 响应体保持数组格式，下一页游标放在响应头里
+        resp = jsonify(data)
+        if next_cursor is not None:
+            resp.headers["X-Next-Cursor"] = next_cursor
+            resp.headers["Access-Control-Expose-Headers"] = "X-Next-Cursor"
+        return with_validators(resp, etag, last_modified)
 
     except Exception as e:
         logger.error("Error occurred while fetching multimodal data: %s", str(e))
@@ -81,7 +180,7 @@ def get_multimodal_list():
             cursor.close()
         if conn:
             conn.close()
-        logger.info("Database connection closed for multimodal list.")
+        logger.debug("Database connection closed for multimodal list.")
 
 
 # 2. 创建多模态数据（支持 multipart/form-data 上传文件，也支持纯 JSON）
@@ -105,95 +204,37 @@ def create_multimodal():
 
         _id = get_field("id")
         modality = get_field("modality")
-        patient_id = get_field("patientId")
-        record_id = get_field("recordId")
-        source_table = get_field("sourceTable")
-        source_pk = get_field("sourcePk")
-        text_content = get_field("textContent")
-        description = get_field("description")
-
         logger.info("Request to create multimodal: id=%s, modality=%s", _id, modality)
 
-        # 必填校验
+        # 必填校验；sourceTable / sourcePk 的默认值见 schema.multimodal_values
         if not _id or not modality:
             return jsonify({"success": False, "message": "id 和 modality 为必填字段"}), 400
 
-        # 默认值，避免 NOT NULL 报错
-        if not source_table:
-            source_table = "Upload"
-        if not source_pk:
-            source_pk = _id
-
-        # 处理文件
-        file_path = None       # 存到数据库的相对路径
-        file_format = None
-
         if uploaded_file and uploaded_file.filename:
-            filename = secure_filename(uploaded_file.filename)
-            _, ext = os.path.splitext(filename)
-            file_format = ext.lstrip(".").lower() if ext else None
-
-            # 按模态分子目录，如：uploaded_files/image
-            sub_dir = (
-                modality
-                if modality in ["text", "image", "audio", "video", "pdf", "timeseries", "other"]
-                else "other"
-            )
-            save_dir = os.path.join(UPLOAD_ROOT, sub_dir)
-            os.makedirs(save_dir, exist_ok=True)
-
-            save_path = os.path.join(save_dir, filename)
-            uploaded_file.save(save_path)
-
-            # 存数据库用相对路径，相对于项目根目录
-            # 例如：uploaded_files/image/test.jpg
-            rel_path = os.path.relpath(save_path, os.getcwd()).replace("\\", "/")
-            file_path = rel_path
+            # 先落临时文件并计算 sha256（此时还不占用数据库连接），再按内容放入 blob 存储
+            tmp_path, sha256 = blob_store.spool(uploaded_file.stream)
+            try:
+                conn = get_db_connection()
+                file_path, file_format, job_ids = _insert_blob_record(
+                    conn, tmp_path, sha256, uploaded_file.filename, get_field
+                )
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
         else:
             # 若无文件，允许直接传已有路径
             file_path = get_field("filePath")
             file_format = get_field("fileFormat")
+            job_ids = []
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        sql = """
-            INSERT INTO multimodal_data
-            (id, patient_id, record_id, source_table, source_pk,
-             modality, text_content, file_path, file_format, description)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """
-        cursor.execute(
-            sql,
-            (
-                _id,
-                patient_id,
-                record_id,
-                source_table,
-                source_pk,
-                modality,
-                text_content,
-                file_path,
-                file_format,
-                description,
-            ),
-        )
-        conn.commit()
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(INSERT_MULTIMODAL_SQL, multimodal_values(get_field, file_path, file_format))
+            conn.commit()
 
         logger.info("Multimodal record %s created successfully.", _id)
 
-        return jsonify(
-            {
-                "success": True,
-                "message": "多模态数据创建成功",
-                "data": {
-                    "id": _id,
-                    "filePath": file_path,
-                    "fileFormat": file_format,
-                    "fileUrl": f"/api/multimodal/file/{_id}",
-                },
-            }
-        ), 201
+        return _created_response(_id, file_path, file_format, job_ids)
 
     except Exception as e:
         if conn:
@@ -206,7 +247,108 @@ def create_multimodal():
             cursor.close()
         if conn:
             conn.close()
-        logger.info("Database connection closed for multimodal create.")
+        logger.debug("Database connection closed for multimodal create.")
+
+
+# 2.1 分片上传（大文件，可断点续传）
+#    POST   /api/multimodal/uploads                       初始化，返回 uploadId
+#    PUT    /api/multimodal/uploads/<uploadId>?offset=N    请求体为原始字节，从 offset 处写入
+#    GET    /api/multimodal/uploads/<uploadId>             查询已接收字节数（断线后据此续传）
+#    POST   /api/multimodal/uploads/<uploadId>/complete    校验 sha256、落盘、写数据库
+#    DELETE /api/multimodal/uploads/<uploadId>             放弃上传
+@multimodal_bp.route('/api/multimodal/uploads', methods=['POST'])
+def init_upload():
+    try:
+        body = request.get_json(silent=True) or {}
+        # 文件名只用于取扩展名和日志，落盘路径由内容哈希决定
+        filename = os.path.basename((body.get("filename") or "").replace("\\", "/"))
+        modality = body.get("modality")
+        if not filename or not modality:
+            return jsonify({"success": False, "message": "filename 和 modality 为必填字段"}), 400
+
+        total_size = body.get("totalSize")
+        meta = upload_store.create(
+            filename,
+            modality,
+            total_size=int(total_size) if total_size is not None else None,
+            sha256=body.get("sha256"),
+        )
+        logger.info("Upload session %s created for %s.", meta["uploadId"], filename)
+        return jsonify({"success": True, "data": {"uploadId": meta["uploadId"], "offset": 0}}), 201
+
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "totalSize 必须为整数"}), 400
+
+
+@multimodal_bp.route('/api/multimodal/uploads/<string:upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    try:
+        offset = int(request.args.get("offset", "0"))
+        # 直接从请求流写入临时文件，不在内存里缓存整个分片
+        received = upload_store.write_chunk(upload_id, offset, request.stream)
+        return jsonify({"success": True, "data": {"uploadId": upload_id, "offset": received}})
+
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+    except ValueError:
+        return jsonify({"success": False, "message": "offset 必须为整数"}), 400
+
+
+@multimodal_bp.route('/api/multimodal/uploads/<string:upload_id>', methods=['GET'])
+def get_upload_status(upload_id):
+    try:
+        return jsonify({"success": True, "data": upload_store.status(upload_id)})
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+
+@multimodal_bp.route('/api/multimodal/uploads/<string:upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    try:
+        upload_store.discard(upload_id)
+        logger.info("Upload session %s aborted.", upload_id)
+        return jsonify({"success": True, "message": "上传已取消"})
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+
+@multimodal_bp.route('/api/multimodal/uploads/<string:upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    conn = None
+    try:
+        body = request.get_json(silent=True) or {}
+        _id = body.get("id")
+        if not _id:
+            return jsonify({"success": False, "message": "id 为必填字段"}), 400
+
+        f, part_path, sha256, size, meta = upload_store.open_verified(upload_id, body.get("sha256"))
+        fields = dict(body, modality=meta["modality"])   # 模态以初始化会话时的为准
+
+        # 校验通过后写数据库并原子移动到 blob 存储；提交成功后才删除分片，失败时可重试 complete。
+        # 分片锁一直持有到移动完成，校验过的内容不会被并发的 PUT 改掉
+        with f:
+            conn = get_db_connection()
+            file_path, file_format, job_ids = _insert_blob_record(
+                conn, part_path, sha256, meta["filename"], fields.get
+            )
+        upload_store.discard(upload_id)
+
+        logger.info("Chunked upload %s stored as %s (%d bytes, sha256=%s).",
+                    upload_id, file_path, size, sha256)
+        return _created_response(_id, file_path, file_format, job_ids)
+
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    except Exception as e:
+        logger.error("Error completing upload %s: %s", upload_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), 500
+
+    finally:
+        if conn:
+            conn.close()
 
 
 # 3. 删除多模态数据（同时尝试删除物理文件）
@@ -231,30 +373,36 @@ def delete_multimodal(data_id):
 
         file_path = row["file_path"]
 
-        # 删记录
-        cursor.execute("DELETE FROM multimodal_data WHERE id = %s", (data_id,))
-        if cursor.rowcount == 0:
-            conn.rollback()
-            logger.warning("Multimodal record %s not found when deleting.", data_id)
-            return jsonify({"success": False, "message": "记录不存在或已被删除"}), 404
-
-        conn.commit()
-        logger.info("Multimodal record %s deleted from DB.", data_id)
-
-        # 尝试删文件（失败也不影响记录已删）
-        if file_path:
-            if os.path.isabs(file_path):
-                abs_path = file_path
-            else:
-                abs_path = os.path.join(os.getcwd(), file_path)
-            abs_path = os.path.normpath(abs_path)
-
-            if os.path.exists(abs_path):
-                try:
-                    os.remove(abs_path)
-                    logger.info("File %s deleted successfully.", abs_path)
-                except Exception as fe:
-                    logger.warning("Failed to delete file %s: %s", abs_path, str(fe))
+        # 与新增引用互斥：删记录、查剩余引用、删文件在同一把锁内完成
+        with blob_lock(conn, file_path) if file_path else nullcontext():
+            # 删记录
+            cursor.execute("DELETE FROM multimodal_data WHERE id = %s", (data_id,))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                logger.warning("Multimodal record %s not found when deleting.", data_id)
+                return jsonify({"success": False, "message": "记录不存在或已被删除"}), 404
+
+            remaining = reference_count(conn, file_path) if file_path else 0
+            conn.commit()
+            logger.info("Multimodal record %s deleted from DB.", data_id)
+
+            # 去重后同一文件可能被多条记录引用，最后一个引用删除时才删文件（失败也不影响记录已删）
+            if file_path and remaining:
+                logger.info("File %s still referenced by %d records, kept.", file_path, remaining)
+            elif file_path:
+                abs_path = absolute_path(file_path)
+
+                if os.path.exists(abs_path):
+                    try:
+                        derivative_store.purge(abs_path)
+                        series_store.purge(abs_path)
+                    except Exception as fe:
+                        logger.warning("Failed to purge derived data of %s: %s", abs_path, str(fe))
+                    try:
+                        os.remove(abs_path)
+                        logger.info("File %s deleted successfully.", abs_path)
+                    except Exception as fe:
+                        logger.warning("Failed to delete file %s: %s", abs_path, str(fe))
 
         return jsonify({"success": True, "message": "多模态记录及文件删除成功"}), 200
 
@@ -269,22 +417,27 @@ def delete_multimodal(data_id):
             cursor.close()
         if conn:
             conn.close()
-        logger.info("Database connection closed for multimodal delete.")
+        logger.debug("Database connection closed for multimodal delete.")
 
 
 # 4. 按 id 获取具体文件内容
 #    GET /api/multimodal/file/<id>
+#    GET /api/multimodal/file/<id>?variant=thumb|preview   缩略图 / 预览图（image / pdf / video）
 @multimodal_bp.route('/api/multimodal/file/<string:data_id>', methods=['GET'])
 def get_multimodal_file(data_id):
     conn = None
     cursor = None
     try:
-        logger.info("Request to get file for multimodal record: %s", data_id)
+        logger.debug("Request to get file for multimodal record: %s", data_id)
 
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("SELECT file_path FROM multimodal_data WHERE id = %s", (data_id,))
+        variant = request.args.get("variant")
+        if variant is not None and variant not in VARIANTS:
+            return jsonify({"success": False, "message": f"variant 只能是 {', '.join(VARIANTS)}"}), 400
+
+        cursor.execute("SELECT file_path, modality FROM multimodal_data WHERE id = %s", (data_id,))
         row = cursor.fetchone()
 
         if not row:
@@ -297,20 +450,33 @@ def get_multimodal_file(data_id):
             return jsonify({"success": False, "message": "该记录没有关联文件"}), 404
 
         # 相对路径 -> 绝对路径
-        if os.path.isabs(file_path):
-            abs_path = file_path
-        else:
-            abs_path = os.path.join(os.getcwd(), file_path)
-        abs_path = os.path.normpath(abs_path)
+        abs_path = absolute_path(file_path)
 
-        logger.info("Resolved file absolute path: %s", abs_path)
+        logger.debug("Resolved file absolute path: %s", abs_path)
 
         if not os.path.exists(abs_path):
             logger.warning("File %s not found on disk.", abs_path)
             return jsonify({"success": False, "message": "文件不存在"}), 404
 
-        # 直接根据绝对路径返回文件
-        return send_file(abs_path, as_attachment=False)
+        if variant:
+            # 不等待生成时先把连接还给连接池
+            cursor.close()
+            conn.close()
+            cursor = conn = None
+            derived = derivative_store.get(abs_path, row["modality"], variant, wait=DERIVATIVE_WAIT)
+            if derived is None:
+                resp = jsonify({"success": True, "message": "预览图生成中，请稍后重试"})
+                resp.headers["Retry-After"] = "1"
+                return resp, 202
+            return serve_file(derived, relative_path(derived), max_age=FILE_MAX_AGE)
+
+        # 强 ETag + Last-Modified，支持 Range / If-Range 断点续传，
+        # 可配置为交给 nginx / apache 发送（见 file_delivery.py）
+        return serve_file(abs_path, file_path, max_age=FILE_MAX_AGE)
+
+    except DerivativeError as e:
+        logger.warning("No %s for multimodal %s: %s", request.args.get("variant"), data_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), e.status
 
     except Exception as e:
         logger.error("Error fetching file for multimodal %s: %s", data_id, str(e))
@@ -321,6 +487,108 @@ def get_multimodal_file(data_id):
             cursor.close()
         if conn:
             conn.close()
-        logger.info("Database connection closed for multimodal file fetch.")
+        logger.debug("Database connection closed for multimodal file fetch.")
+
+
+# 5. 时间序列窗口查询（timeseries 模态）
+#    GET /api/multimodal/<id>/series?from=2024-01-01&to=2024-01-31&maxPoints=2000&method=lttb
+#    from / to 为 ISO 时间或毫秒时间戳；resample 为桶宽（30s / 5min / 1h / 1d），桶内取均值；
+#    点数超过 maxPoints（缺省 SERIES_MAX_POINTS）时按 method（lttb / minmax）降采样
+@multimodal_bp.route('/api/multimodal/<string:data_id>/series', methods=['GET'])
+def get_multimodal_series(data_id):
+    conn = None
+    cursor = None
+    try:
+        start = parse_time_arg(request.args.get("from"))
+        end = parse_time_arg(request.args.get("to"))
+        step = parse_interval(request.args["resample"]) if request.args.get("resample") else None
+        method = request.args.get("method") or "lttb"
+        if method not in METHODS:
+            return jsonify({"success": False, "message": f"method 只能是 {', '.join(METHODS)}"}), 400
+        try:
+            max_points = int(request.args.get("maxPoints") or SERIES_MAX_POINTS)
+        except ValueError:
+            return jsonify({"success": False, "message": "maxPoints 必须是整数"}), 400
+        if max_points < 3:
+            return jsonify({"success": False, "message": "maxPoints 不能小于 3"}), 400
+        max_points = min(max_points, SERIES_MAX_POINTS_LIMIT)
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT file_path, modality FROM multimodal_data WHERE id = %s", (data_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        cursor = conn = None
+
+        if not row:
+            return jsonify({"success": False, "message": "记录不存在"}), 404
+        if row["modality"] != "timeseries" or not row["file_path"]:
+            return jsonify({"success": False, "message": "该记录不是时间序列数据"}), 415
+
+        file_path = row["file_path"]
+        abs_path = absolute_path(file_path)
+        if not os.path.exists(abs_path):
+            # 示例数据的 file_path 没有 uploaded_files/ 前缀
+            abs_path = os.path.normpath(os.path.join(UPLOAD_ROOT, file_path))
+        if not os.path.exists(abs_path):
+            return jsonify({"success": False, "message": "文件不存在"}), 404
+
+        series = series_store.load(abs_path)
+
+        # 导入结果不可变，ETag 由源文件（路径、修改时间、点数）和解析后的窗口 / 重采样 / maxPoints / method 决定；
+        # version_validators 另外还会哈希原始查询参数（columns 等）。用解析后的值，缺省值或上限调整后不会误命中
+        etag, _ = version_validators((series.meta["count"], series.meta["end"], abs_path,
+                                      os.path.getmtime(abs_path), start, end, step, max_points, method))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        names = None
+        wanted = request.args.get("columns")
+        if wanted:
+            names = [c for c in wanted.split(",") if c]
+            unknown = [c for c in names if c not in series.columns]
+            if unknown:
+                return jsonify({"success": False, "message": f"未知的列：{', '.join(unknown)}"}), 400
+        n_channels = len(names or series.columns)
+        if max_points < 3 * n_channels:
+            return jsonify({"success": False,
+                            "message": f"maxPoints 不能小于 3 × 列数（{3 * n_channels}）"}), 400
+
+        if step is not None:
+            t, values = series.window(start, end, columns=names)
+            count = int(len(t))
+            t, values = resample_mean(t, values, step)
+            if len(t) > max_points:
+                picked = select_indices(t, values, max_points, method)
+                t, values = t[picked], {k: v[picked] for k, v in values.items()}
+        else:
+            # 超长序列优先使用导入时建好的金字塔
+            t, values, count = series.downsample(start, end, max_points, method, columns=names)
+
+        data = {
+            "id": data_id,
+            "columns": list(values),
+            "count": count,          # 窗口内原始点数
+            "points": int(len(t)),   # 返回的点数
+            "resample": step,        # 桶宽（毫秒），未重采样为 null
+        }
+        data.update(to_json(t, values))
+        return with_validators(jsonify({"success": True, "data": data}), etag)
+
+    except SeriesError as e:
+        logger.warning("Series query for multimodal %s failed: %s", data_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    except Exception as e:
+        logger.error("Error fetching series for multimodal %s: %s", data_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), 500
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
 
 # --- END OF FILE app/api/multimodal.py ---
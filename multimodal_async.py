@@ -0,0 +1,573 @@
+# multimodal_async.py
+"""
+多模态接口的异步版本（Quart + aiomysql + aiofiles），由 asgi.py 在 ASGI 服务器下运行。
+
+替代 wsgi:app 上对应的路由，路径、参数和返回格式与之一致：
+- 列表 / 新增 / 删除（GET、POST /api/multimodal，DELETE /api/multimodal/<id>）同 app.py，返回 {code, message, data}
+- 分片上传、文件下载同 multimodal.py（多模态蓝图），返回 {success, message, data}
+- 时间序列窗口查询（/series）计算量大，仍由 WSGI 应用（app.py 注册的多模态蓝图）处理
+
+- 数据库查询走 aiomysql 连接池，等待 MySQL 时不占用线程
+- 文件下载用 aiofiles 分块读取（READ_CHUNK），304、Range / If-Range 与 nginx / apache 转交的判断用 file_delivery 中的函数
+- 上传：分片 PUT 直接从请求体写入临时文件（加锁、offset 校验用 upload_store.open_chunk，与同步版本共用一把文件锁）；
+  普通 multipart 上传的哈希计算、分片上传 complete 时的校验、缩略图生成等 CPU / 整文件操作放到线程中执行，不阻塞事件循环
+- 路径、SQL、条件请求等与同步版本共用 blob_store / schema / conditional 中的实现
+
+依赖：pip install quart aiomysql aiofiles
+启用：app.register_blueprint(multimodal_async_bp); init_app(app)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+from contextlib import asynccontextmanager
+
+import aiofiles
+import aiofiles.os
+import aiomysql
+from quart import Blueprint, Response, current_app, jsonify, request
+
+from blob_store import (BlobStore, LOCK_TIMEOUT, modality_dir_for, file_format_of, relative_path,
+                        absolute_path, lock_name)
+from conditional import version_sql, version_etag, etag_matches, with_validators
+from db_utils import DB_CONFIG
+from derivatives import DerivativeStore, DerivativeError, VARIANTS
+from file_delivery import (READ_CHUNK, file_info, set_validators, not_modified, offload_headers,
+                           requested_spans, part_header, multipart_end)
+from job_queue import JOB_MAX_ATTEMPTS
+from pagination import parse_page_args, apply_keyset, split_page
+from schema import MULTIMODAL_DATA, INSERT_MULTIMODAL_SQL, multimodal_values
+from streaming import STREAM_BATCH_SIZE, STREAM_FORMATS, stream_format
+from tasks import POSTPROCESS_TASKS, purge_derived
+from upload_sessions import UploadSessionStore, UploadError
+
+multimodal_async_bp = Blueprint('multimodal_async', __name__)
+logger = logging.getLogger(__name__)
+
+# 连接池大小（可用环境变量覆盖）；一个进程内的全部请求共用
+POOL_MIN_SIZE = int(os.environ.get("MEDHUB_ASYNC_POOL_MIN", "2"))
+POOL_MAX_SIZE = int(os.environ.get("MEDHUB_ASYNC_POOL_MAX", "32"))
+
+UPLOAD_ROOT = os.path.join(os.getcwd(), "uploaded_files")
+os.makedirs(UPLOAD_ROOT, exist_ok=True)
+
+FILE_MAX_AGE = 3600
+DERIVATIVE_WAIT = 2.0
+
+# 与 multimodal.py 使用同一批目录，两个版本可以同时运行
+upload_store = UploadSessionStore(os.path.join(UPLOAD_ROOT, ".uploads"))
+blob_store = BlobStore(UPLOAD_ROOT)
+derivative_store = DerivativeStore(os.path.join(UPLOAD_ROOT, ".derivatives"))
+_pool = None
+
+
+# ---------- 连接池 ----------
+
+def init_app(app):
+    """服务启动时建连接池，停止时等在用连接归还后关闭"""
+
+    @app.before_serving
+    async def _open_pool():
+        global _pool
+        _pool = await aiomysql.create_pool(
+            host=DB_CONFIG["host"],
+            port=DB_CONFIG.get("port", 3306),
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            db=DB_CONFIG["database"],
+            charset=DB_CONFIG["charset"],
+            minsize=POOL_MIN_SIZE,
+            maxsize=POOL_MAX_SIZE,
+            autocommit=True,         # 只读查询不留事务；写操作显式 begin / commit
+            pool_recycle=1800,
+        )
+
+    @app.after_serving
+    async def _close_pool():
+        global _pool
+        if _pool is not None:
+            _pool.close()
+            await _pool.wait_closed()
+            _pool = None
+
+    return app
+
+
+@asynccontextmanager
+async def _connection():
+    async with _pool.acquire() as conn:
+        yield conn
+
+
+async def _fetchone(sql, params=()):
+    async with _connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(sql, params)
+            return await cur.fetchone()
+
+
+@asynccontextmanager
+async def _blob_lock(conn, key):
+    """与 blob_store.blob_lock 使用同名的 MySQL 命名锁，同步和异步版本之间也互斥"""
+    name = lock_name(key)
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT GET_LOCK(%s, %s)", (name, LOCK_TIMEOUT))
+        if (await cur.fetchone())[0] != 1:
+            raise TimeoutError(f"could not acquire blob lock for {key}")
+        try:
+            yield
+        finally:
+            await cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            await cur.fetchone()
+
+
+async def _reference_count(conn, file_path):
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT COUNT(*) FROM multimodal_data WHERE file_path = %s", (file_path,))
+        return (await cur.fetchone())[0]
+
+
+_jobs_table_ready = False
+
+
+async def _enqueue_postprocess(cur, data_id, file_path, modality):
+    """与 tasks.enqueue_postprocess 相同的任务（不提交），返回任务 id 列表；background_jobs 表不存在时跳过"""
+    global _jobs_table_ready
+    kinds = POSTPROCESS_TASKS.get(modality, [])
+    if kinds and not _jobs_table_ready:
+        await cur.execute("SELECT COUNT(*) FROM information_schema.TABLES "
+                          "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'background_jobs'")
+        _jobs_table_ready = (await cur.fetchone())[0] > 0
+        if not _jobs_table_ready:
+            logger.warning("background_jobs table missing (run python -m migrations); "
+                           "post-processing for %s skipped.", data_id)
+            return []
+    payload = json.dumps({"id": data_id, "filePath": file_path, "modality": modality}, ensure_ascii=False)
+    job_ids = []
+    for kind in kinds:
+        await cur.execute(
+            "INSERT INTO background_jobs (kind, payload, max_attempts, run_after) "
+            "VALUES (%s, %s, %s, NOW(3))",
+            (kind, payload, JOB_MAX_ATTEMPTS),
+        )
+        job_ids.append(cur.lastrowid)
+    return job_ids
+
+
+# ---------- 工具 ----------
+
+async def _insert_blob_record(tmp_path, sha256, filename, get_field, source_defaults=True):
+    """
+    同 multimodal._insert_blob_record：命名锁内先写记录和后处理任务，再放入 blob 存储、提交。
+    get_field / source_defaults 见 schema.multimodal_values；返回 (file_path, file_format, job_ids)
+    """
+    data_id = get_field("id")
+    modality = get_field("modality")
+    file_format = file_format_of(filename)
+    modality_dir = modality_dir_for(modality)
+    file_path = relative_path(blob_store.blob_path(modality_dir, sha256, file_format))
+
+    async with _connection() as conn:
+        async with _blob_lock(conn, file_path):
+            created = False
+            await conn.begin()
+            try:
+                async with conn.cursor() as cur:
+                    await cur.execute(INSERT_MULTIMODAL_SQL, multimodal_values(
+                        get_field, file_path, file_format, source_defaults))
+                    job_ids = await _enqueue_postprocess(cur, data_id, file_path, modality)
+                abs_path, created = await asyncio.to_thread(
+                    blob_store.ingest_file, tmp_path, sha256, modality_dir, file_format)
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                if created:
+                    await asyncio.to_thread(blob_store.restore, abs_path, tmp_path)
+                raise
+    if not created:
+        logger.info("Deduplicated upload %s -> existing blob %s.", filename, file_path)
+    return file_path, file_format, job_ids
+
+
+def _created_response(_id, file_path, file_format, job_ids=()):
+    return jsonify(
+        {
+            "success": True,
+            "message": "多模态数据创建成功",
+            "data": {
+                "id": _id,
+                "filePath": file_path,
+                "fileFormat": file_format,
+                "fileUrl": f"/api/multimodal/file/{_id}",
+                "jobIds": list(job_ids),
+            },
+        }
+    ), 201
+
+
+# 列表 / 新增 / 删除替代的是 app.py 中的同名路由（wsgi:app 上它们先于蓝图注册），
+# 返回与 app.py 的 ok / error 相同的 {code, message, data}
+def ok(data=None, message="ok", **extra):
+    body = {"code": 0, "message": message, "data": data}
+    body.update(extra)
+    return jsonify(body)
+
+
+def error(message="error", code=1):
+    return jsonify({"code": code, "message": message, "data": None})
+
+
+# 1. 获取多模态数据列表（同 app.list_multimodal）
+#    GET /api/multimodal?modality=image&patientId=P001
+#    GET /api/multimodal?format=ndjson   流式导出全部（可叠加过滤条件）
+@multimodal_async_bp.route('/api/multimodal', methods=['GET'])
+async def get_multimodal_list():
+    modality = request.args.get("modality")
+    patient_id = request.args.get("patientId")
+    where = " WHERE 1=1"
+    params = []
+    if modality:
+        where += " AND modality=%s"
+        params.append(modality)
+    if patient_id:
+        where += " AND patient_id=%s"
+        params.append(patient_id)
+    sql = "SELECT * FROM multimodal_data" + where
+
+    fmt = stream_format(request.args)
+    if fmt:
+        return _stream_rows(sql + " ORDER BY id", params, fmt)
+
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return error(str(e), code=400)
+
+    async with _connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(version_sql("multimodal_data", where, ts_column="created_at"), tuple(params))
+            # 与 app.py 相同的版本元组和 ETag，两个入口之间切换时客户端缓存仍然有效
+            etag = version_etag(tuple(await cur.fetchone()), request.path, request.args.items(multi=True))
+            if etag_matches(request, etag):
+                return with_validators(Response("", status=304), etag)
+
+            sql, params = apply_keyset(sql, params, after, limit)
+            await cur.execute(sql, tuple(params))
+            rows = await cur.fetchall()
+            columns = [d[0] for d in cur.description]
+
+    rows, next_cursor = split_page(MULTIMODAL_DATA.map_rows(columns, rows), limit)
+    return with_validators(ok(rows, nextCursor=next_cursor), etag)
+
+
+def _stream_rows(sql, params, fmt):
+    """同 streaming.stream_rows：非缓冲游标逐批读取，连接随生成器结束归还"""
+    dumps = current_app.json.dumps
+
+    async def generate():
+        conn = await _pool.acquire()
+        cur = None
+        count = 0
+        finished = False
+        try:
+            cur = await conn.cursor(aiomysql.SSCursor)
+            await cur.execute(sql, tuple(params))
+            columns = [d[0] for d in cur.description]
+            if fmt == "json":
+                yield "["
+            while True:
+                rows = await cur.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                chunk = []
+                for r in MULTIMODAL_DATA.map_rows(columns, rows):
+                    item = dumps(r)
+                    if fmt == "json":
+                        chunk.append(item if count == 0 else "," + item)
+                    else:
+                        chunk.append(item + "\n")
+                    count += 1
+                yield "".join(chunk)
+            if fmt == "json":
+                yield "]"
+            finished = True
+        finally:
+            if finished:
+                await cur.close()
+            else:
+                # 客户端中途断开：关闭 SSCursor 会把剩余结果集全部读完，直接断开连接，
+                # 连接池收回已关闭的连接时不会再放回空闲队列
+                conn.close()
+            _pool.release(conn)
+            logger.info("Streamed %d rows (complete=%s).", count, finished)
+
+    return Response(generate(), content_type=STREAM_FORMATS[fmt])
+
+
+# 2. 创建多模态数据（同 app.create_multimodal：multipart/form-data 上传文件）
+#    POST /api/multimodal
+@multimodal_async_bp.route('/api/multimodal', methods=['POST'])
+async def create_multimodal():
+    form = await request.form
+    upload_file = (await request.files).get("file")
+
+    file_path = None
+    file_format = None
+    job_ids = []
+
+    if upload_file and upload_file.filename:
+        # 表单解析时文件已落到临时文件；拷贝并计算 sha256 在线程中进行
+        tmp_path, sha256 = await asyncio.to_thread(blob_store.spool, upload_file.stream)
+        try:
+            file_path, file_format, job_ids = await _insert_blob_record(
+                tmp_path, sha256, upload_file.filename, form.get, source_defaults=False)
+        finally:
+            if await aiofiles.os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+    else:
+        async with _connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(INSERT_MULTIMODAL_SQL, multimodal_values(
+                    form.get, file_path, file_format, source_defaults=False))
+
+    return ok(message="created", data={"filePath": file_path, "jobIds": job_ids})
+
+
+# 2.1 分片上传（与 multimodal.py 相同的流程和会话目录）
+@multimodal_async_bp.route('/api/multimodal/uploads', methods=['POST'])
+async def init_upload():
+    try:
+        body = await request.get_json(silent=True) or {}
+        filename = os.path.basename((body.get("filename") or "").replace("\\", "/"))
+        modality = body.get("modality")
+        if not filename or not modality:
+            return jsonify({"success": False, "message": "filename 和 modality 为必填字段"}), 400
+
+        total_size = body.get("totalSize")
+        meta = await asyncio.to_thread(
+            upload_store.create, filename, modality,
+            int(total_size) if total_size is not None else None, body.get("sha256"))
+        logger.info("Upload session %s created for %s.", meta["uploadId"], filename)
+        return jsonify({"success": True, "data": {"uploadId": meta["uploadId"], "offset": 0}}), 201
+
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "totalSize 必须为整数"}), 400
+
+
+@multimodal_async_bp.route('/api/multimodal/uploads/<string:upload_id>', methods=['PUT'])
+async def put_upload_chunk(upload_id):
+    try:
+        offset = int(request.args.get("offset", "0"))
+        # 加锁、校验 offset 与 upload_store.write_chunk 相同；之后边接收边写，不在内存里缓存整个分片
+        f, limit = await asyncio.to_thread(upload_store.open_chunk, upload_id, offset)
+        try:
+            written = offset
+            async for data in request.body:
+                written += len(data)
+                if written > limit:
+                    raise UploadError("upload exceeds declared size", 413)
+                await asyncio.to_thread(f.write, data)
+        finally:
+            await asyncio.to_thread(f.close)
+        return jsonify({"success": True, "data": {"uploadId": upload_id, "offset": written}})
+
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+    except ValueError:
+        return jsonify({"success": False, "message": "offset 必须为整数"}), 400
+
+
+@multimodal_async_bp.route('/api/multimodal/uploads/<string:upload_id>', methods=['GET'])
+async def get_upload_status(upload_id):
+    try:
+        return jsonify({"success": True, "data": await asyncio.to_thread(upload_store.status, upload_id)})
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+
+@multimodal_async_bp.route('/api/multimodal/uploads/<string:upload_id>', methods=['DELETE'])
+async def abort_upload(upload_id):
+    try:
+        await asyncio.to_thread(upload_store.discard, upload_id)
+        logger.info("Upload session %s aborted.", upload_id)
+        return jsonify({"success": True, "message": "上传已取消"})
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+
+@multimodal_async_bp.route('/api/multimodal/uploads/<string:upload_id>/complete', methods=['POST'])
+async def complete_upload(upload_id):
+    try:
+        body = await request.get_json(silent=True) or {}
+        _id = body.get("id")
+        if not _id:
+            return jsonify({"success": False, "message": "id 为必填字段"}), 400
+
+        # 整个文件算一遍 sha256，放到线程里；分片锁一直持有到移入 blob 存储
+        f, part_path, sha256, size, meta = await asyncio.to_thread(
+            upload_store.open_verified, upload_id, body.get("sha256"))
+        fields = dict(body, modality=meta["modality"])   # 模态以初始化会话时的为准
+
+        with f:
+            file_path, file_format, job_ids = await _insert_blob_record(
+                part_path, sha256, meta["filename"], fields.get)
+        await asyncio.to_thread(upload_store.discard, upload_id)
+
+        logger.info("Chunked upload %s stored as %s (%d bytes, sha256=%s).",
+                    upload_id, file_path, size, sha256)
+        return _created_response(_id, file_path, file_format, job_ids)
+
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    except Exception as e:
+        logger.error("Error completing upload %s: %s", upload_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# 3. 删除多模态数据（同 app.delete_multimodal：最后一个引用删除时同时删除物理文件）
+#    DELETE /api/multimodal/<id>
+@multimodal_async_bp.route('/api/multimodal/<string:data_id>', methods=['DELETE'])
+async def delete_multimodal(data_id):
+    async with _connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT file_path FROM multimodal_data WHERE id=%s", (data_id,))
+            row = await cur.fetchone()
+            if row is None:
+                return error("record not found", code=404)
+            file_path = row[0]
+
+            async with _blob_lock(conn, file_path) if file_path else _no_lock():
+                await conn.begin()
+                await cur.execute("DELETE FROM multimodal_data WHERE id=%s", (data_id,))
+                remaining = await _reference_count(conn, file_path) if file_path else 0
+                await conn.commit()
+
+    if file_path and not remaining:
+        await asyncio.to_thread(_remove_file, absolute_path(file_path))
+    return ok(message="deleted file and record")
+
+
+@asynccontextmanager
+async def _no_lock():
+    yield
+
+
+def _remove_file(abs_path):
+    # 连同派生图和时间序列导入结果；删文件失败不影响记录已删除
+    if not os.path.exists(abs_path):
+        return
+    try:
+        purge_derived(abs_path)
+    except Exception as fe:
+        logger.warning("Failed to purge derived data of %s: %s", abs_path, str(fe))
+    try:
+        os.remove(abs_path)
+    except Exception as fe:
+        logger.warning("Failed to delete file %s: %s", abs_path, str(fe))
+
+
+# 4. 按 id 获取具体文件内容
+#    GET /api/multimodal/file/<id>
+#    GET /api/multimodal/file/<id>?variant=thumb|preview
+@multimodal_async_bp.route('/api/multimodal/file/<string:data_id>', methods=['GET'])
+async def get_multimodal_file(data_id):
+    try:
+        variant = request.args.get("variant")
+        if variant is not None and variant not in VARIANTS:
+            return jsonify({"success": False, "message": f"variant 只能是 {', '.join(VARIANTS)}"}), 400
+
+        # 查完即归还连接，发送文件期间不占用
+        row = await _fetchone("SELECT file_path, modality FROM multimodal_data WHERE id = %s", (data_id,))
+        if not row:
+            return jsonify({"success": False, "message": "记录不存在"}), 404
+        file_path = row["file_path"]
+        if not file_path:
+            return jsonify({"success": False, "message": "该记录没有关联文件"}), 404
+
+        abs_path = absolute_path(file_path)
+        if not await aiofiles.os.path.exists(abs_path):
+            logger.warning("File %s not found on disk.", abs_path)
+            return jsonify({"success": False, "message": "文件不存在"}), 404
+
+        if variant:
+            derived = await asyncio.to_thread(
+                derivative_store.get, abs_path, row["modality"], variant, wait=DERIVATIVE_WAIT)
+            if derived is None:
+                resp = jsonify({"success": True, "message": "预览图生成中，请稍后重试"})
+                resp.headers["Retry-After"] = "1"
+                return resp, 202
+            return await serve_file_async(derived, relative_path(derived), max_age=FILE_MAX_AGE)
+
+        return await serve_file_async(abs_path, file_path, max_age=FILE_MAX_AGE)
+
+    except DerivativeError as e:
+        logger.warning("No %s for multimodal %s: %s", request.args.get("variant"), data_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    except Exception as e:
+        logger.error("Error fetching file for multimodal %s: %s", data_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+# ---------- 文件下发（file_delivery.serve_file 的异步版本，条件请求 / Range 的判断与它共用） ----------
+
+async def _read_span(path, start, stop):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            data = await f.read(min(READ_CHUNK, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+async def _multipart(path, spans, length, content_type, boundary):
+    for start, stop in spans:
+        yield part_header(start, stop, length, content_type, boundary)
+        async for data in _read_span(path, start, stop):
+            yield data
+    yield multipart_end(boundary)
+
+
+async def serve_file_async(abs_path, rel_path, max_age=3600):
+    st = await aiofiles.os.stat(abs_path)
+    length = st.st_size
+    etag, last_modified, content_type = file_info(abs_path, st)
+
+    if not_modified(request, etag, last_modified):
+        return set_validators(Response("", status=304), etag, last_modified, max_age)
+
+    headers = offload_headers(abs_path, rel_path)
+    if headers:
+        resp = Response("", status=200, content_type=content_type, headers=headers)
+        return set_validators(resp, etag, last_modified, max_age)
+
+    spans = requested_spans(request, etag, last_modified, length)
+    if spans is not None:
+        if not spans:
+            resp = Response("", status=416)
+            resp.headers["Content-Range"] = f"bytes */{length}"
+            return set_validators(resp, etag, last_modified, max_age)
+
+        if len(spans) == 1:
+            start, stop = spans[0]
+            resp = Response(_read_span(abs_path, start, stop), status=206, content_type=content_type)
+            resp.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{length}"
+            resp.content_length = stop - start
+            return set_validators(resp, etag, last_modified, max_age)
+
+        boundary = secrets.token_hex(16)
+        resp = Response(_multipart(abs_path, spans, length, content_type, boundary), status=206,
+                        content_type=f"multipart/byteranges; boundary={boundary}")
+        return set_validators(resp, etag, last_modified, max_age)
+
+    resp = Response(_read_span(abs_path, 0, length), status=200, content_type=content_type)
+    resp.content_length = length
+    return set_validators(resp, etag, last_modified, max_age)
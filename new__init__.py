@@ -44,10 +44,12 @@ def create_app():
     from app.api.patient import patient_bp
     from app.api.record import record_bp
     from app.api.appointment import appointment_bp
-    from app.api.stats import stats_bp
+    from stats_api import stats_bp      # 统计看板改为读汇总表（stats_aggregates.py）
 
     # ⭐ 新增：引入多模态模块
     from app.api.multimodal import multimodal_bp
+    from jobs_api import jobs_bp
+    from search_api import search_bp
 
     # 3. 注册所有蓝图
     app.register_blueprint(auth_bp)          # /api/login
@@ -60,6 +62,18 @@ def create_app():
 
     # ⭐ 注册多模态蓝图
     app.register_blueprint(multimodal_bp)    # /api/multimodal
+    app.register_blueprint(jobs_bp)          # /api/jobs（后台任务状态）
+    app.register_blueprint(search_bp)        # /api/search（全文检索）
+
+    # 4. 请求耗时 / 数据库时间等指标，/metrics 输出
+    import metrics
+    import profiler
+    metrics.init_app(app)
+    profiler.init_app(app)   # MEDHUB_PROFILE=1 时开启 SQL 分析与慢查询日志
+
+    # 5. 参考数据缓存：MEDHUB_CACHE_URL 设置时改用 Redis，多进程间失效同步
+    import cache
+    cache.init_from_env()
 
     @app.route('/')
     def index():
@@ -0,0 +1,50 @@
+# pagination.py
+"""
+列表接口的游标（keyset）分页。
+
+请求参数：
+- after: 上一页返回的 nextCursor（即上一页最后一条记录的主键）
+- limit: 每页条数，缺省 DEFAULT_LIMIT，超过 MAX_LIMIT 时按 MAX_LIMIT 处理
+
+按主键升序稳定排序，SQL 中多取一条用来判断是否还有下一页，
+任何请求最多只会从数据库取出 MAX_LIMIT + 1 行。
+带等值过滤的列表需要 (过滤列, id) 的索引才能按索引顺序取数，不必 filesort（migrations/v003）。
+"""
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+LIMIT_ERROR = "limit must be a positive integer"
+
+
+def parse_page_args(args):
+    """从 request.args 解析 (after, limit)，limit 非法时抛 ValueError"""
+    after = args.get("after") or None
+    raw_limit = args.get("limit")
+    if raw_limit in (None, ""):
+        limit = DEFAULT_LIMIT
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            raise ValueError(LIMIT_ERROR)
+    return after, min(limit, MAX_LIMIT)
+
+
+def apply_keyset(sql, params, after, limit, key="id"):
+    """在已有 WHERE 子句的 SQL 后追加游标条件、排序和 LIMIT"""
+    if after is not None:
+        sql += f" AND {key} > %s"
+        params.append(after)
+    sql += f" ORDER BY {key} LIMIT %s"
+    params.append(limit + 1)
+    return sql, params
+
+
+def split_page(rows, limit, key="id"):
+    """截掉多取的一行，返回 (本页数据, nextCursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, rows[-1][key]
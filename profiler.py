@@ -0,0 +1,305 @@
+# profiler.py
+"""
+SQL 性能分析（默认关闭，设置 MEDHUB_PROFILE=1 开启）。
+
+包装每个游标的 execute，按 (路由, 语句指纹) 汇总：次数、总耗时 / 最大耗时、返回行数、参数形态。
+- 指纹：去掉字面量和参数、把 IN (%s, %s, ...) 合并成 IN (...)，同一种过滤组合得到同一个指纹
+- 耗时：execute 与 fetch 调用本身的时间之和（与 metrics.InstrumentedCursor 相同），
+  不含取数之间应用自己的处理时间（序列化、流式发送等）；一条语句在游标 close 或下一次 execute 时记录
+- 参数只记录形态（类型序列，如 str,int,None），不记录取值，避免患者信息进入日志
+- 超过 MEDHUB_SLOW_QUERY_MS（默认 200）的语句写入慢查询日志（JSON 行，MEDHUB_SLOW_QUERY_LOG，
+  默认 slow_query.log），并从 performance_schema 补充 MySQL 实际扫描的行数（rows examined）
+
+    GET    /admin/profile?top=20&sort=total|max|avg|count   # 最耗时的语句
+    DELETE /admin/profile                                  # 清空统计
+
+启用：profiler.init_app(app)（MEDHUB_PROFILE 未开启时不做任何事）；访问控制见 admin_auth.py
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import db_pool
+
+PROFILE_ENABLED = os.environ.get("MEDHUB_PROFILE", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("MEDHUB_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("MEDHUB_SLOW_QUERY_LOG", "slow_query.log")
+MAX_FINGERPRINTS = 1000       # 最多跟踪的 (路由, 指纹) 组合数
+MAX_SHAPES = 8                # 每个指纹最多保留的参数形态数
+DEFAULT_TOP = 20
+SORT_KEYS = ("total", "max", "avg", "count")
+
+slow_logger = logging.getLogger("medhub.slow_query")
+
+# 没有 performance_schema 的权限 / 功能时的错误码，遇到后不再查询：
+# 1044 / 1142 无权限，1146 表不存在，1305 PS_CURRENT_THREAD_ID 不存在（MySQL < 8.0.16）
+ROWS_EXAMINED_UNAVAILABLE = {1044, 1142, 1146, 1305}
+
+ROWS_EXAMINED_SQL = (
+    "SELECT ROWS_EXAMINED FROM performance_schema.events_statements_history "
+    "WHERE THREAD_ID = PS_CURRENT_THREAD_ID() AND SQL_TEXT NOT LIKE %s "
+    "ORDER BY EVENT_ID DESC LIMIT 1"
+)
+
+
+def fingerprint(sql):
+    """规范化后的语句文本"""
+    text = re.sub(r"'(?:[^'\\]|\\.)*'", "?", sql)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text)
+    text = text.replace("%s", "?")
+    text = re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"\bIN \((?:\?,? ?)+\)", "IN (...)", text, flags=re.IGNORECASE)
+    return text
+
+
+def params_shape(params):
+    if not params:
+        return ""
+    if isinstance(params, dict):
+        return ",".join(f"{k}:{type(v).__name__}" for k, v in sorted(params.items()))
+    return ",".join("None" if p is None else type(p).__name__ for p in params)
+
+
+def _route():
+    try:
+        from flask import has_request_context, request
+    except ImportError:
+        return "<background>"
+    if not has_request_context():
+        return "<background>"
+    return request.url_rule.rule if request.url_rule is not None else request.path
+
+
+class Profile:
+    """(路由, 指纹) -> 汇总；线程安全"""
+
+    def __init__(self, max_entries=MAX_FINGERPRINTS):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, route, text, shape, seconds, rows):
+        key = (route, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    self._dropped += 1
+                    return
+                entry = self._entries[key] = {
+                    "count": 0, "total": 0.0, "max": 0.0, "rows": 0, "slow": 0, "shapes": set(),
+                }
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["rows"] += rows
+            if seconds * 1000 >= SLOW_QUERY_MS:
+                entry["slow"] += 1
+            if len(entry["shapes"]) < MAX_SHAPES:
+                entry["shapes"].add(shape)
+
+    def top(self, n=DEFAULT_TOP, sort="total"):
+        with self._lock:
+            items = [(k, dict(v, shapes=sorted(v["shapes"]))) for k, v in self._entries.items()]
+            dropped = self._dropped
+        for _, entry in items:
+            entry["avg"] = entry["total"] / entry["count"]
+        items.sort(key=lambda item: item[1][sort], reverse=True)
+        return {
+            "tracked": len(items),
+            "dropped": dropped,
+            "slowThresholdMs": SLOW_QUERY_MS,
+            "statements": [
+                {
+                    "route": route,
+                    "fingerprint": hashlib.sha1(text.encode("utf-8")).hexdigest()[:16],
+                    "sql": text,
+                    "count": e["count"],
+                    "totalMs": round(e["total"] * 1000, 3),
+                    "avgMs": round(e["avg"] * 1000, 3),
+                    "maxMs": round(e["max"] * 1000, 3),
+                    "rowsReturned": e["rows"],
+                    "slowCount": e["slow"],
+                    "paramShapes": e["shapes"],
+                }
+                for (route, text), e in items[:n]
+            ],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._dropped = 0
+
+
+profile = Profile()
+_rows_examined_available = True
+
+
+def _rows_examined(conn):
+    """刚结束的那条语句实际扫描的行数；performance_schema 不可用时返回 None"""
+    global _rows_examined_available
+    if not _rows_examined_available or conn is None:
+        return None
+    cur = conn.cursor()
+    try:
+        cur.execute(ROWS_EXAMINED_SQL, ("%performance_schema%",))
+        row = cur.fetchone()
+        return int(row[0]) if row else None
+    except Exception as e:
+        if getattr(e, "errno", None) in ROWS_EXAMINED_UNAVAILABLE:
+            _rows_examined_available = False     # 没有权限或版本过低，不再尝试
+        return None
+    finally:
+        cur.close()
+
+
+class ProfilingCursor:
+    def __init__(self, cursor, conn=None):
+        self._cursor = cursor
+        self._conn = conn
+        self._pending = None          # [sql, params, 累计耗时, 已取行数]
+
+    def _finish(self, examine=False):
+        if self._pending is None:
+            return
+        sql, params, seconds, rows = self._pending
+        self._pending = None
+        route = _route()
+        text = fingerprint(sql)
+        shape = params_shape(params)
+        profile.record(route, text, shape, seconds, rows)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            slow_logger.warning(json.dumps({
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "route": route,
+                "fingerprint": hashlib.sha1(text.encode("utf-8")).hexdigest()[:16],
+                "sql": text,
+                "paramsShape": shape,
+                "durationMs": round(seconds * 1000, 3),
+                "rowsReturned": rows,
+                # 只在游标关闭后查询（此时连接上没有未读结果）
+                "rowsExamined": _rows_examined(self._conn) if examine else None,
+            }, ensure_ascii=False))
+
+    def _count(self, seconds, rows):
+        if self._pending is not None:
+            self._pending[2] += seconds
+            self._pending[3] += rows
+
+    def execute(self, sql, params=(), *args, **kwargs):
+        self._finish()
+        self._pending = [sql, params, 0.0, 0]
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params, *args, **kwargs)
+        finally:
+            self._count(time.perf_counter() - started, 0)
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        self._finish()
+        seq_params = list(seq_params)
+        self._pending = [sql, seq_params[0] if seq_params else (), 0.0, 0]
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_params, *args, **kwargs)
+        finally:
+            self._count(time.perf_counter() - started, 0)
+            self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._count(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*args)
+        self._count(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._count(time.perf_counter() - started, len(rows))
+        return rows
+
+    def close(self):
+        try:
+            return self._cursor.close()
+        finally:
+            self._finish(examine=True)
+
+    def __iter__(self):
+        it = iter(self._cursor)
+        while True:
+            started = time.perf_counter()
+            try:
+                row = next(it)
+            except StopIteration:
+                self._count(time.perf_counter() - started, 0)
+                return
+            self._count(time.perf_counter() - started, 1)
+            yield row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _setup_slow_log():
+    if slow_logger.handlers:
+        return
+    handler = logging.FileHandler(SLOW_QUERY_LOG, mode="a", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_logger.addHandler(handler)
+    slow_logger.setLevel(logging.WARNING)
+    slow_logger.propagate = False
+
+
+def init_app(app, enabled=None):
+    """开启时包装游标并注册 /admin/profile"""
+    if not (PROFILE_ENABLED if enabled is None else enabled):
+        return app
+    from flask import jsonify, request
+    from admin_auth import require_admin
+
+    _setup_slow_log()
+    inner = db_pool.cursor_wrapper
+
+    def wrapper(cur, conn):
+        return ProfilingCursor(inner(cur, conn) if inner else cur, conn)
+
+    db_pool.cursor_wrapper = wrapper
+
+    @app.get("/admin/profile")
+    @require_admin
+    def admin_profile():
+        sort = request.args.get("sort", "total")
+        if sort not in SORT_KEYS:
+            return jsonify({"success": False, "message": f"sort 只能是 {', '.join(SORT_KEYS)}"}), 400
+        try:
+            top = int(request.args.get("top") or DEFAULT_TOP)
+        except ValueError:
+            return jsonify({"success": False, "message": "top 必须是整数"}), 400
+        return jsonify({"success": True, "data": profile.top(top, sort)}), 200
+
+    @app.delete("/admin/profile")
+    @require_admin
+    def admin_profile_reset():
+        profile.reset()
+        return jsonify({"success": True, "message": "reset"}), 200
+
+    return app
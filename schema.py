@@ -0,0 +1,142 @@
+# schema.py
+"""
+各表 数据库列名 -> 接口字段名 的映射，以及把游标结果转换成接口数据的公共方法。
+
+列表接口统一使用普通（元组）游标：每种列组合的字段名元组只计算一次并缓存，
+之后每行只需一次 dict(zip(keys, row))，取代原来“先建 dict 再逐个 pop 改名”的循环。
+映射表中没有列出的列原样保留列名，与原先的行为一致；omit 中的列（内部维护用的列）不返回。
+"""
+
+from operator import itemgetter
+
+
+class TableMapper:
+    def __init__(self, table, renames=None, post=None, omit=()):
+        self.table = table
+        self.renames = renames or {}
+        self.post = post                  # 可选：逐行追加/转换字段，接收并返回 dict
+        self.omit = frozenset(omit)       # 不出现在接口里的列（SELECT * 会带出来）
+        self._keys_cache = {}
+
+    def _layout(self, column_names):
+        """(字段名元组, 取值函数)；没有要去掉的列时取值函数为 None，整行直接 zip"""
+        column_names = tuple(column_names)
+        layout = self._keys_cache.get(column_names)
+        if layout is None:
+            kept = [i for i, c in enumerate(column_names) if c not in self.omit]
+            keys = tuple(self.renames.get(column_names[i], column_names[i]) for i in kept)
+            pick = None
+            if len(kept) < len(column_names):
+                pick = itemgetter(*kept) if len(kept) > 1 else (lambda r, kept=kept: tuple(r[i] for i in kept))
+            layout = (keys, pick)
+            self._keys_cache[column_names] = layout
+        return layout
+
+    def keys_for(self, column_names):
+        return self._layout(column_names)[0]
+
+    def map_rows(self, column_names, rows):
+        keys, pick = self._layout(column_names)
+        if pick is not None:
+            rows = map(pick, rows)
+        if self.post is None:
+            return [dict(zip(keys, r)) for r in rows]
+        post = self.post
+        return [post(dict(zip(keys, r))) for r in rows]
+
+    def map_row(self, column_names, row):
+        keys, pick = self._layout(column_names)
+        item = dict(zip(keys, pick(row) if pick is not None else row))
+        return self.post(item) if self.post else item
+
+    def fetch_all(self, cursor):
+        """cursor 必须是普通（非 dictionary）游标"""
+        return self.map_rows(cursor.column_names, cursor.fetchall())
+
+
+DEPARTMENTS = TableMapper("departments")
+DOCTORS = TableMapper("doctors")
+MEDICINES = TableMapper("medicines")
+
+PATIENTS = TableMapper("patients", {
+    "create_time": "createTime",
+})
+
+MEDICAL_RECORDS = TableMapper("medical_records", {
+    "patient_id": "patientId",
+    "doctor_id": "doctorId",
+    "treatment_plan": "treatmentPlan",
+    "visit_date": "visitDate",
+})
+
+PRESCRIPTION_DETAILS = TableMapper("prescription_details", {
+    "record_id": "recordId",
+    "medicine_id": "medicineId",
+    "usage_info": "usageInfo",
+})
+
+APPOINTMENTS = TableMapper("appointments", {
+    "patient_name": "patientName",
+    "patient_phone": "patientPhone",
+    "department_id": "departmentId",
+    "doctor_id": "doctorId",
+    "create_time": "createTime",
+}, omit=("updated_at",))   # updated_at 只用于条件请求的版本号（migrations/v004），不是接口字段
+
+MULTIMODAL_RENAMES = {
+    "patient_id": "patientId",
+    "record_id": "recordId",
+    "source_table": "sourceTable",
+    "source_pk": "sourcePk",
+    "text_content": "textContent",
+    "file_path": "filePath",
+    "file_format": "fileFormat",
+    "created_at": "createdAt",
+}
+
+MULTIMODAL_DATA = TableMapper("multimodal_data", MULTIMODAL_RENAMES)
+
+
+def _finish_multimodal_item(item):
+    # 多模态蓝图的返回格式：时间转 ISO 字符串，并附带可直接访问的文件 URL
+    created_at = item["createdAt"]
+    item["createdAt"] = created_at.isoformat() if created_at else None
+    item["fileUrl"] = f"/api/multimodal/file/{item['id']}"
+    return item
+
+
+MULTIMODAL_ITEMS = TableMapper("multimodal_data", MULTIMODAL_RENAMES, post=_finish_multimodal_item)
+
+
+# 新增多模态记录：app.py、multimodal.py、multimodal_async.py 共用
+INSERT_MULTIMODAL_SQL = """
+    INSERT INTO multimodal_data
+    (id, patient_id, record_id, source_table, source_pk,
+     modality, text_content, file_path, file_format, description)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+
+def multimodal_values(get_field, file_path, file_format, source_defaults=True):
+    """
+    按 INSERT_MULTIMODAL_SQL 的列顺序取参数，get_field 为表单 / JSON 的 get。
+    source_defaults：sourceTable / sourcePk 缺省时填 "Upload" / id，避免 NOT NULL 报错（多模态蓝图的行为）
+    """
+    data_id = get_field("id")
+    source_table = get_field("sourceTable")
+    source_pk = get_field("sourcePk")
+    if source_defaults:
+        source_table = source_table or "Upload"
+        source_pk = source_pk or data_id
+    return (
+        data_id,
+        get_field("patientId"),
+        get_field("recordId"),
+        source_table,
+        source_pk,
+        get_field("modality"),
+        get_field("textContent"),
+        file_path,       # 存到数据库的相对路径
+        file_format,
+        get_field("description"),
+    )
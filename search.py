@@ -0,0 +1,230 @@
+# search.py
+"""
+全文检索（MySQL 8 FULLTEXT + ngram 分词，支持中文）。
+
+索引由 InnoDB 在写入 / 删除提交时自动维护，不需要额外的同步任务：
+- patients(name)
+- medical_records(diagnosis, treatment_plan)
+- multimodal_data(text_content, description)
+- multimodal_text(content)：pdf / 文档中抽取出的文本（见 text_extract.py，建表时自带索引）
+
+首次部署时建索引（已存在的会跳过）：
+    python search.py --ensure-indexes
+
+ngram 默认按 2 个字切词（ngram_token_size=2），因此关键词至少 2 个字符。
+"""
+
+import argparse
+import re
+import threading
+import time
+
+MIN_QUERY_LENGTH = 2
+MISSING_RECHECK = 60          # 索引 / 表不存在的结果缓存多久（秒），之后再查 information_schema
+
+# InnoDB 默认停用词表（INNODB_FT_DEFAULT_STOPWORD）中不长于 ngram_token_size 的词。
+# ngram 分词丢弃包含停用词的词元（如 "a" 会让 "ab"、"ba" 都不进索引），关键词含这些字母组合时
+# MATCH 短语查询会漏掉 LIKE 能查到的行
+NGRAM_STOPWORDS = ("a", "i", "an", "as", "at", "be", "by", "de", "en", "in", "is", "it",
+                   "la", "of", "on", "or", "to")
+MAX_SEARCH_OFFSET = 1000      # 最多翻到第 1000 条，更深的结果请细化关键词
+SNIPPET_WIDTH = 60
+
+# (表, 索引名, 列)
+SEARCH_INDEXES = [
+    ("patients", "ft_patients_name", ("name",)),
+    ("medical_records", "ft_records_text", ("diagnosis", "treatment_plan")),
+    ("multimodal_data", "ft_multimodal_text", ("text_content", "description")),
+]
+
+# 各类结果的子查询，列依次为：type, id, title, body, patient_id, score
+SEARCH_SOURCES = {
+    "patient": """
+        SELECT 'patient' AS type, id, name AS title, CONCAT_WS(' / ', gender, age, phone) AS body,
+               id AS patient_id, MATCH(name) AGAINST (%s) AS score
+        FROM patients WHERE MATCH(name) AGAINST (%s)
+    """,
+    "record": """
+        SELECT 'record' AS type, id, diagnosis AS title, treatment_plan AS body,
+               patient_id, MATCH(diagnosis, treatment_plan) AGAINST (%s) AS score
+        FROM medical_records WHERE MATCH(diagnosis, treatment_plan) AGAINST (%s)
+    """,
+    "multimodal": """
+        SELECT 'multimodal' AS type, id, COALESCE(description, source_pk) AS title,
+               LEFT(text_content, 2000) AS body,
+               patient_id, MATCH(text_content, description) AGAINST (%s) AS score
+        FROM multimodal_data WHERE MATCH(text_content, description) AGAINST (%s)
+    """,
+    "document": """
+        SELECT 'document' AS type, m.id, COALESCE(m.description, m.source_pk) AS title,
+               LEFT(t.content, 2000) AS body,
+               m.patient_id, MATCH(t.content) AGAINST (%s) AS score
+        FROM multimodal_text t JOIN multimodal_data m ON m.id = t.data_id
+        WHERE MATCH(t.content) AGAINST (%s)
+    """,
+}
+# 各结果类型依赖的全文索引；document 的索引随 multimodal_text 建表自带，按表判断。
+# 索引 / 表还没建时该类型不参与检索（否则 MATCH 会报错）
+SOURCE_INDEXES = {
+    "patient": ("patients", "ft_patients_name"),
+    "record": ("medical_records", "ft_records_text"),
+    "multimodal": ("multimodal_data", "ft_multimodal_text"),
+}
+SOURCE_TABLES = {"document": "multimodal_text"}
+
+# “存在”一直缓存；“不存在”只缓存 MISSING_RECHECK 秒，进程启动后才建好索引 / 表
+# （python -m migrations）时无需重启，未建时也不会每个请求都查一次 information_schema
+_index_cache = set()
+_missing_until = {}
+_index_cache_lock = threading.Lock()
+
+
+def _exists(conn, key, sql, params):
+    if key in _index_cache:
+        return True
+    if _missing_until.get(key, 0) > time.monotonic():
+        return False
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        exists = cur.fetchone()[0] > 0
+    finally:
+        cur.close()
+    with _index_cache_lock:
+        if exists:
+            _index_cache.add(key)
+            _missing_until.pop(key, None)
+        else:
+            _missing_until[key] = time.monotonic() + MISSING_RECHECK
+    return exists
+
+
+def clear_exists_cache():
+    with _index_cache_lock:
+        _index_cache.clear()
+        _missing_until.clear()
+
+
+def has_index(conn, table, index_name):
+    """索引是否存在（存在后每个进程不再查 information_schema，不存在时每 MISSING_RECHECK 秒复查）"""
+    return _exists(
+        conn, (table, index_name),
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index_name),
+    )
+
+
+def has_table(conn, table):
+    return _exists(
+        conn, (table, None),
+        "SELECT COUNT(*) FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+
+
+def available_types(conn, types):
+    available = []
+    for t in types:
+        if t in SOURCE_INDEXES and not has_index(conn, *SOURCE_INDEXES[t]):
+            continue
+        if t in SOURCE_TABLES and not has_table(conn, SOURCE_TABLES[t]):
+            continue
+        available.append(t)
+    return available
+
+
+def ensure_search_indexes(conn):
+    """创建缺少的 FULLTEXT 索引，返回新建的索引名列表"""
+    created = []
+    cur = conn.cursor()
+    try:
+        for table, index_name, columns in SEARCH_INDEXES:
+            if has_index(conn, table, index_name):
+                continue
+            cur.execute(
+                f"ALTER TABLE {table} ADD FULLTEXT INDEX {index_name} "
+                f"({', '.join(columns)}) WITH PARSER ngram"
+            )
+            with _index_cache_lock:
+                _index_cache.add((table, index_name))
+                _missing_until.pop((table, index_name), None)
+            created.append(index_name)
+    finally:
+        cur.close()
+    return created
+
+
+def phrase_matchable(term):
+    """
+    ngram 索引上的短语 MATCH 与 LIKE '%term%' 结果是否相同：过短、含空白 / 标点（分词时被切开）
+    或含停用词的关键词不相同，调用方应改用 LIKE
+    """
+    if len(term) < MIN_QUERY_LENGTH or not term.isalnum():
+        return False
+    lowered = term.lower()
+    return not any(word in lowered for word in NGRAM_STOPWORDS)
+
+
+def snippet(text, query, width=SNIPPET_WIDTH):
+    """截取关键词附近的一段文字"""
+    if not text:
+        return text
+    text = re.sub(r"\s+", " ", str(text)).strip()
+    pos = text.find(query)
+    if pos < 0:
+        return text[:width * 2] + ("…" if len(text) > width * 2 else "")
+    start = max(pos - width, 0)
+    end = min(pos + len(query) + width, len(text))
+    return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+def search(conn, query, types, offset, limit):
+    """跨表检索，按相关度排序；返回 (结果列表, 是否还有下一页)"""
+    parts, params = [], []
+    for t in available_types(conn, types):
+        parts.append(SEARCH_SOURCES[t])
+        params += [query, query]
+    if not parts:
+        return [], False
+    sql = " UNION ALL ".join(f"({p})" for p in parts)
+    sql += " ORDER BY score DESC, type, id LIMIT %s OFFSET %s"
+    params += [limit + 1, offset]
+
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, tuple(params))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    results = [
+        {
+            "type": type_,
+            "id": id_,
+            "title": title,
+            "snippet": snippet(body, query),
+            "patientId": patient_id,
+            "score": round(float(score), 4),
+        }
+        for type_, id_, title, body, patient_id, score in rows[:limit]
+    ]
+    return results, len(rows) > limit
+
+
+if __name__ == "__main__":
+    from db_utils import get_connection
+
+    parser = argparse.ArgumentParser(description="MedData Hub full-text search")
+    parser.add_argument("--ensure-indexes", action="store_true", help="创建缺少的 FULLTEXT 索引")
+    args = parser.parse_args()
+    if not args.ensure_indexes:
+        parser.error("nothing to do")
+
+    conn = get_connection()
+    try:
+        created = ensure_search_indexes(conn)
+        print("created: " + (", ".join(created) if created else "(none)"))
+    finally:
+        conn.close()
@@ -0,0 +1,63 @@
+# search_api.py
+"""
+全文检索接口。
+
+    GET /api/search?q=胸闷&types=record,multimodal,document&limit=20&after=<nextCursor>
+"""
+
+import logging
+from urllib.parse import quote
+
+from flask import Blueprint, request, jsonify
+
+from db_utils import get_connection
+from pagination import DEFAULT_LIMIT, MAX_LIMIT
+from search import MAX_SEARCH_OFFSET, MIN_QUERY_LENGTH, SEARCH_SOURCES, search
+
+search_bp = Blueprint('search', __name__)
+logger = logging.getLogger(__name__)
+
+RESULT_URLS = {
+    "patient": "/api/patients?name={title}",
+    "record": "/api/medical-records?patientId={patientId}",
+    "multimodal": "/api/multimodal/file/{id}",
+    "document": "/api/multimodal/file/{id}",
+}
+
+
+@search_bp.route('/api/search', methods=['GET'])
+def search_all():
+    q = (request.args.get("q") or "").strip()
+    if len(q) < MIN_QUERY_LENGTH:
+        return jsonify({"success": False, "message": f"q 至少 {MIN_QUERY_LENGTH} 个字符"}), 400
+
+    types = [t for t in (request.args.get("types") or ",".join(SEARCH_SOURCES)).split(",") if t]
+    unknown = [t for t in types if t not in SEARCH_SOURCES]
+    if unknown or not types:
+        return jsonify({"success": False,
+                        "message": f"types 只能是 {', '.join(SEARCH_SOURCES)}"}), 400
+
+    try:
+        # 相关度排序的结果没有稳定主键，游标即偏移量
+        offset = int(request.args.get("after") or 0)
+        limit = min(int(request.args.get("limit") or DEFAULT_LIMIT), MAX_LIMIT)
+    except ValueError:
+        return jsonify({"success": False, "message": "after / limit 必须是整数"}), 400
+    if offset < 0 or limit <= 0:
+        return jsonify({"success": False, "message": "after / limit 取值无效"}), 400
+    if offset >= MAX_SEARCH_OFFSET:
+        return jsonify({"success": False, "message": "结果太多，请细化关键词"}), 400
+
+    conn = get_connection()
+    try:
+        results, has_more = search(conn, q, types, offset, limit)
+    except Exception as e:
+        logger.error("Search for %r failed: %s", q, str(e))
+        return jsonify({"success": False, "message": str(e)}), 500
+    finally:
+        conn.close()
+
+    for r in results:
+        r["url"] = RESULT_URLS[r["type"]].format(**{k: quote(str(v or "")) for k, v in r.items()})
+    next_cursor = str(offset + limit) if has_more and offset + limit < MAX_SEARCH_OFFSET else None
+    return jsonify({"success": True, "data": results, "nextCursor": next_cursor}), 200
@@ -0,0 +1,347 @@
+# stats_aggregates.py
+"""
+统计看板的汇总表（物化聚合），接口只读汇总表，耗时与历史数据量无关。
+
+- stats_daily   ：(日期, 指标) -> 数量
+- stats_monthly ：(月份, 指标) -> 数量，月度统计 / 环比直接读这里
+- stats_flow    ：(月份, 源节点, 目标节点) -> 数量，桑基图的边；month = 'all' 为全部时间的合计
+
+指标（METRICS）：patients 新增患者（patients.create_time）、appointments 挂号（appointments.create_time）、
+visits 就诊（medical_records.visit_date）。
+桑基图两段流向：挂号 -> 科室（appointments.department_id），科室 -> 诊断（病历医生所在科室）。
+
+维护方式：
+- 写入时增量更新：新增 / 删除挂号、病历、患者的接口用 collect(conn, metric, ids, ±1) 读出增量，
+  业务事务提交之后再用 apply_deltas 在单独的短事务里累加（按主键顺序），
+  热点计数行（当天 / 当月）的行锁不会跟着业务事务一直持有；累加失败由定时刷新修正
+- 定时刷新：按月从原始表重算最近几个月，修正批量导入、其他模块修改（改状态、改科室名等）带来的偏差
+    python stats_aggregates.py --refresh [--months 2]      # 建议 cron 每 10 分钟执行
+- 全量重建（首次部署 / 导入历史数据后）：
+    python stats_aggregates.py --rebuild
+"""
+
+import argparse
+import logging
+from datetime import date
+
+from search import has_table
+
+logger = logging.getLogger(__name__)
+
+ALL_TIME = "all"
+APPOINTMENT_NODE = "挂号"
+DIAGNOSIS_NODE_CHARS = 100     # 诊断作为节点名时截取的长度
+
+STATS_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day    DATE        NOT NULL,
+        metric VARCHAR(20) NOT NULL,
+        count  INT         NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, metric)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_monthly (
+        month  CHAR(7)     NOT NULL,
+        metric VARCHAR(20) NOT NULL,
+        count  INT         NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, metric)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_flow (
+        month  CHAR(7)      NOT NULL,
+        source VARCHAR(100) NOT NULL,
+        target VARCHAR(100) NOT NULL,
+        count  INT          NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, source, target)
+    )
+    """,
+]
+
+# 指标 -> (表, 时间列, 取日期的表达式)；appointments.create_time 是字符串
+METRICS = {
+    "patients": ("patients", "create_time", "create_time"),
+    "appointments": ("appointments", "create_time", "DATE(create_time)"),
+    "visits": ("medical_records", "visit_date", "visit_date"),
+}
+
+# 指标 -> 产生的桑基图边，列依次为 day, source, target（{where} 处拼接过滤条件）
+FLOWS = {
+    "appointments": f"""
+        SELECT DATE(a.create_time) AS day, '{APPOINTMENT_NODE}' AS source, d.name AS target
+        FROM appointments a JOIN departments d ON d.id = a.department_id
+        WHERE DATE(a.create_time) IS NOT NULL {{where}}
+    """,
+    "visits": f"""
+        SELECT r.visit_date AS day, d.name AS source,
+               LEFT(r.diagnosis, {DIAGNOSIS_NODE_CHARS}) AS target
+        FROM medical_records r
+        JOIN doctors doc ON doc.id = r.doctor_id
+        JOIN departments d ON d.id = doc.department_id
+        WHERE r.visit_date IS NOT NULL {{where}}
+    """,
+}
+FLOW_ALIASES = {"appointments": "a", "visits": "r"}
+
+
+def ensure_schema(conn):
+    cur = conn.cursor()
+    try:
+        for sql in STATS_TABLES_SQL:
+            cur.execute(sql)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def _month_start(month):
+    return f"{month}-01"
+
+
+def next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+# ---------- 写入时增量更新 ----------
+
+COUNTER_SQL = {
+    "stats_daily": "INSERT INTO stats_daily (day, metric, count) VALUES (%s, %s, %s) "
+                   "ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+    "stats_monthly": "INSERT INTO stats_monthly (month, metric, count) VALUES (%s, %s, %s) "
+                     "ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+    "stats_flow": "INSERT INTO stats_flow (month, source, target, count) VALUES (%s, %s, %s, %s) "
+                  "ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+}
+
+
+def collect(conn, metric, ids, sign=1):
+    """
+    按记录 id 读出要累加到汇总表的增量 {表: {主键: 数量}}（只读，不加锁）。
+    新增时在 INSERT 之后调用，删除时在 DELETE 之前调用（需要读到原记录）。
+    """
+    deltas = {table: {} for table in COUNTER_SQL}
+    ids = [i for i in ids if i is not None]
+    if not ids:
+        return deltas
+    table, _, day_expr = METRICS[metric]
+    marks = ", ".join(["%s"] * len(ids))
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"SELECT {day_expr}, COUNT(*) FROM {table} "
+            f"WHERE id IN ({marks}) AND {day_expr} IS NOT NULL GROUP BY {day_expr}",
+            tuple(ids),
+        )
+        for day, count in cur.fetchall():
+            key = (str(day), metric)
+            deltas["stats_daily"][key] = deltas["stats_daily"].get(key, 0) + sign * count
+            key = (str(day)[:7], metric)
+            deltas["stats_monthly"][key] = deltas["stats_monthly"].get(key, 0) + sign * count
+        flow = FLOWS.get(metric)
+        if flow:
+            edges = flow.format(where=f"AND {FLOW_ALIASES[metric]}.id IN ({marks})")
+            cur.execute(
+                f"SELECT LEFT(f.day, 7), f.source, f.target, COUNT(*) FROM ({edges}) f "
+                f"GROUP BY LEFT(f.day, 7), f.source, f.target",
+                tuple(ids),
+            )
+            # 按月的边和全部时间的合计各累加一次
+            for month, source, target, count in cur.fetchall():
+                for key in ((month, source, target), (ALL_TIME, source, target)):
+                    deltas["stats_flow"][key] = deltas["stats_flow"].get(key, 0) + sign * count
+    finally:
+        cur.close()
+    return deltas
+
+
+def apply_deltas(conn, deltas):
+    """
+    在单独的短事务里累加 collect 读出的增量并提交；各表按主键排序加锁，并发请求之间不会死锁。
+    业务写入此时已提交：汇总表未建或累加失败只记日志，不向调用方抛出，偏差由定时刷新修正。
+    """
+    if not any(deltas.get(table) for table in COUNTER_SQL):
+        return
+    missing = [table for table in COUNTER_SQL if not has_table(conn, table)]
+    if missing:
+        logger.warning("stats tables missing (%s; run python stats_aggregates.py --rebuild); "
+                       "aggregate update skipped.", ", ".join(missing))
+        return
+    cur = conn.cursor()
+    try:
+        for table, sql in COUNTER_SQL.items():
+            rows = [(*key, count) for key, count in sorted(deltas.get(table, {}).items()) if count]
+            if rows:
+                cur.executemany(sql, rows)
+        conn.commit()
+    except Exception:
+        logger.exception("stats aggregate update failed; the scheduled refresh will correct it")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+    finally:
+        cur.close()
+
+
+def apply(conn, metric, ids, sign=1):
+    """collect + apply_deltas：新增的记录已提交之后调用，失败同样只记日志"""
+    try:
+        deltas = collect(conn, metric, ids, sign)
+    except Exception:
+        logger.exception("collecting stats deltas for %s failed; the scheduled refresh will correct it",
+                         metric)
+        return
+    apply_deltas(conn, deltas)
+
+
+# ---------- 从原始表重算 ----------
+
+def _recompute(cur, start=None, end=None):
+    """重算 [start, end) 月份内的汇总行；start 为 None 时重算全部"""
+    for metric, (table, column, day_expr) in METRICS.items():
+        where, params = "", ()
+        if start:
+            where, params = f"AND {column} >= %s AND {column} < %s", (_month_start(start),
+                                                                       _month_start(end))
+        cur.execute(
+            f"INSERT INTO stats_daily (day, metric, count) "
+            f"SELECT {day_expr}, %s, COUNT(*) FROM {table} "
+            f"WHERE {day_expr} IS NOT NULL {where} GROUP BY {day_expr}",
+            (metric, *params),
+        )
+        flow = FLOWS.get(metric)
+        if flow:
+            alias = FLOW_ALIASES[metric]
+            edges = flow.format(where=where.replace(column, f"{alias}.{column}"))
+            cur.execute(
+                f"INSERT INTO stats_flow (month, source, target, count) "
+                f"SELECT LEFT(f.day, 7), f.source, f.target, COUNT(*) FROM ({edges}) f "
+                f"GROUP BY LEFT(f.day, 7), f.source, f.target",
+                params,
+            )
+    # 月度由日汇总得出
+    where, params = "", ()
+    if start:
+        where, params = "WHERE day >= %s AND day < %s", (_month_start(start), _month_start(end))
+    cur.execute(
+        f"INSERT INTO stats_monthly (month, metric, count) "
+        f"SELECT LEFT(day, 7), metric, SUM(count) FROM stats_daily {where} "
+        f"GROUP BY LEFT(day, 7), metric",
+        params,
+    )
+
+
+def _rebuild_all_time(cur):
+    cur.execute("DELETE FROM stats_flow WHERE month = %s", (ALL_TIME,))
+    cur.execute(
+        "INSERT INTO stats_flow (month, source, target, count) "
+        "SELECT %s, source, target, SUM(count) FROM stats_flow WHERE month <> %s "
+        "GROUP BY source, target",
+        (ALL_TIME, ALL_TIME),
+    )
+
+
+def refresh(conn, start, end):
+    """在一个事务里重算 [start, end) 月份（YYYY-MM）的汇总，并更新全部时间的合计"""
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM stats_daily WHERE day >= %s AND day < %s",
+                    (_month_start(start), _month_start(end)))
+        cur.execute("DELETE FROM stats_monthly WHERE month >= %s AND month < %s", (start, end))
+        cur.execute("DELETE FROM stats_flow WHERE month >= %s AND month < %s AND month <> %s",
+                    (start, end, ALL_TIME))
+        _recompute(cur, start, end)
+        _rebuild_all_time(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def refresh_recent(conn, months=2, today=None):
+    """重算包含今天在内的最近 months 个月"""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    start = f"{index // 12:04d}-{index % 12 + 1:02d}"
+    refresh(conn, start, next_month(today.strftime("%Y-%m")))
+    return start
+
+
+def rebuild(conn):
+    """清空后从原始表全量重建"""
+    cur = conn.cursor()
+    try:
+        for table in ("stats_daily", "stats_monthly", "stats_flow"):
+            cur.execute(f"DELETE FROM {table}")
+        _recompute(cur)
+        _rebuild_all_time(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# ---------- 读取 ----------
+
+def monthly_counts(conn, start, end):
+    """[start, end) 月份内各月各指标的数量：{month: {metric: count}}"""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT month, metric, count FROM stats_monthly "
+                    "WHERE month >= %s AND month < %s", (start, end))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    counts = {}
+    for month, metric, count in rows:
+        counts.setdefault(month, {})[metric] = int(count)
+    return counts
+
+
+def flow_edges(conn, start=None, end=None):
+    """桑基图的边 [(source, target, value)]；不给月份范围时读全部时间的合计"""
+    cur = conn.cursor()
+    try:
+        if start is None:
+            cur.execute("SELECT source, target, count FROM stats_flow "
+                        "WHERE month = %s AND count > 0 ORDER BY count DESC", (ALL_TIME,))
+        else:
+            cur.execute(
+                "SELECT source, target, SUM(count) AS value FROM stats_flow "
+                "WHERE month >= %s AND month < %s AND month <> %s "
+                "GROUP BY source, target HAVING value > 0 ORDER BY value DESC",
+                (start, end, ALL_TIME),
+            )
+        return [(source, target, int(value)) for source, target, value in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+if __name__ == "__main__":
+    from db_utils import get_connection
+
+    parser = argparse.ArgumentParser(description="Maintain dashboard summary tables")
+    parser.add_argument("--rebuild", action="store_true", help="从原始表全量重建")
+    parser.add_argument("--refresh", action="store_true", help="重算最近几个月")
+    parser.add_argument("--months", type=int, default=2, help="--refresh 重算的月数")
+    args = parser.parse_args()
+    if not (args.rebuild or args.refresh):
+        parser.error("nothing to do, use --rebuild or --refresh")
+
+    conn = get_connection()
+    try:
+        ensure_schema(conn)
+        if args.rebuild:
+            rebuild(conn)
+            print("rebuilt")
+        else:
+            print(f"refreshed from {refresh_recent(conn, args.months)}")
+    finally:
+        conn.close()
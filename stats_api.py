@@ -0,0 +1,99 @@
+# stats_api.py
+"""
+统计看板接口（读 stats_aggregates.py 维护的汇总表）。
+
+    GET /api/stats/sankey?startDate=2025-01-01&endDate=2025-06-30   # 不传日期为全部时间
+    GET /api/statistics/monthly?month=2025-06&range=6
+
+汇总表按月保存桑基图的边，startDate / endDate 按所在的整月统计。
+"""
+
+import logging
+import re
+from datetime import date, datetime
+
+from flask import Blueprint, request, jsonify
+
+from db_utils import get_connection
+from stats_aggregates import flow_edges, monthly_counts, next_month
+
+stats_bp = Blueprint('stats', __name__)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONTH_RANGE = 6
+MAX_MONTH_RANGE = 60
+
+
+def _mom(curr, prev):
+    return round((curr - prev) / prev, 4) if prev > 0 else None
+
+
+@stats_bp.route('/api/stats/sankey', methods=['GET'])
+def get_patient_flow_sankey():
+    start_date = request.args.get("startDate")
+    end_date = request.args.get("endDate")
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m") if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d").strftime("%Y-%m") if end_date else None
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid date format, expected YYYY-MM-DD"}), 400
+
+    conn = get_connection()
+    try:
+        if start or end:
+            edges = flow_edges(conn, start or "0000-01", next_month(end) if end else "9999-12")
+        else:
+            edges = flow_edges(conn)
+    except Exception as e:
+        logger.error("Error fetching sankey statistics: %s", str(e))
+        return jsonify({"success": False, "message": "Error fetching sankey statistics"}), 500
+    finally:
+        conn.close()
+
+    index = {}
+    links = []
+    for source, target, value in edges:
+        for name in (source, target):
+            index.setdefault(name, len(index))
+        links.append({"source": index[source], "target": index[target], "value": value})
+    nodes = [{"name": name} for name in index]
+    return jsonify({"success": True, "data": {"nodes": nodes, "links": links}}), 200
+
+
+@stats_bp.route('/api/statistics/monthly', methods=['GET'])
+def get_monthly_statistics():
+    month = request.args.get("month") or date.today().strftime("%Y-%m")
+    if not re.match(r'^\d{4}-(0[1-9]|1[0-2])$', month):
+        return jsonify({"success": False, "message": "Invalid month format, expected YYYY-MM"}), 400
+    try:
+        months = int(request.args.get("range") or DEFAULT_MONTH_RANGE)
+    except ValueError:
+        return jsonify({"success": False, "message": "range 必须是整数"}), 400
+    if not 1 <= months <= MAX_MONTH_RANGE:
+        return jsonify({"success": False, "message": f"range 取值 1-{MAX_MONTH_RANGE}"}), 400
+
+    # 多取一个月用于计算第一个月的环比
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 - months
+    labels = [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(index, index + months + 1)]
+
+    conn = get_connection()
+    try:
+        counts = monthly_counts(conn, labels[0], next_month(month))
+    except Exception as e:
+        logger.error("Error fetching monthly statistics: %s", str(e))
+        return jsonify({"success": False, "message": "Error fetching monthly statistics"}), 500
+    finally:
+        conn.close()
+
+    data = []
+    for prev, curr in zip(labels, labels[1:]):
+        p, c = counts.get(prev, {}), counts.get(curr, {})
+        data.append({
+            "month": curr,
+            "patientCount": c.get("patients", 0),
+            "visitCount": c.get("visits", 0),
+            "appointmentCount": c.get("appointments", 0),
+            "momPatientRate": _mom(c.get("patients", 0), p.get("patients", 0)),
+            "momVisitRate": _mom(c.get("visits", 0), p.get("visits", 0)),
+        })
+    return jsonify({"success": True, "data": data}), 200
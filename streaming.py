@@ -0,0 +1,75 @@
+# streaming.py
+"""
+大表导出的流式响应。
+
+?format=ndjson  每行一个 JSON 对象（application/x-ndjson）
+?format=json    分块输出的 JSON 数组（application/json）
+
+使用非缓冲游标 + fetchmany 逐批读取，边读边写给客户端，
+内存占用只和 STREAM_BATCH_SIZE 有关，与结果集大小无关。
+"""
+
+import logging
+
+from flask import Response, current_app, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+STREAM_BATCH_SIZE = 500
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def stream_format(args):
+    """返回请求的流式格式；未请求流式输出时返回 None"""
+    fmt = args.get("format")
+    return fmt if fmt in STREAM_FORMATS else None
+
+
+def stream_rows(get_conn, sql, params, mapper, fmt="ndjson",
+                batch_size=STREAM_BATCH_SIZE):
+    """
+    get_conn: 获取连接的函数（在生成器内部调用，连接随生成器结束而归还）
+    mapper: schema.TableMapper，与分页列表接口使用同一份字段映射
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        conn = get_conn()
+        cur = None
+        count = 0
+        finished = False
+        try:
+            cur = conn.cursor()   # 默认非缓冲：结果留在服务端按需读取
+            cur.execute(sql, tuple(params))
+            if fmt == "json":
+                yield "["
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                chunk = []
+                for r in mapper.map_rows(cur.column_names, rows):
+                    item = dumps(r)
+                    if fmt == "json":
+                        chunk.append(item if count == 0 else "," + item)
+                    else:
+                        chunk.append(item + "\n")
+                    count += 1
+                yield "".join(chunk)
+            if fmt == "json":
+                yield "]"
+            finished = True
+        finally:
+            if finished:
+                cur.close()
+                conn.close()
+            else:
+                # 客户端中途断开：游标上还有未读结果，直接断开连接，
+                # 避免归还时把剩余结果集全部读完
+                conn.discard()
+            logger.info("Streamed %d rows (complete=%s).", count, finished)
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt])
@@ -0,0 +1,161 @@
+# tasks.py
+"""
+后台任务处理函数（由 worker.py 加载）。
+
+上传完成后由 enqueue_postprocess 按模态写入任务，与 multimodal_data 记录在同一个事务中提交。
+部署前提：background_jobs 表由 python -m migrations（v002）创建；表不存在时上传照常成功，
+只是不写后处理任务（记录警告日志），派生图 / 时间序列在首次请求时按需生成。
+文件路径是相对项目根目录的路径，worker 需要在项目根目录下运行。
+
+为已有数据补做处理（例如导入示例数据中的 timeseries CSV）：
+    python tasks.py --backfill timeseries
+"""
+
+import argparse
+import logging
+import os
+
+from derivatives import DerivativeStore, DerivativeError, SUPPORTED_MODALITIES, VARIANTS, purge_derivatives
+from job_queue import enqueue, ensure_schema, handler, PermanentJobError
+from search import has_table
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ROOT = os.path.join(os.getcwd(), "uploaded_files")
+DERIVATIVE_ROOT = os.path.join(UPLOAD_ROOT, ".derivatives")
+
+# 模态 -> 上传后需要执行的任务
+POSTPROCESS_TASKS = {modality: ["multimodal.derivatives"] for modality in SUPPORTED_MODALITIES}
+POSTPROCESS_TASKS["timeseries"] = ["timeseries.ingest"]
+POSTPROCESS_TASKS["pdf"].append("text.extract")
+POSTPROCESS_TASKS["text"] = ["text.extract"]
+
+_derivative_store = None
+_series_store = None
+
+
+def _derivatives():
+    # worker 进程里才创建线程池
+    global _derivative_store
+    if _derivative_store is None:
+        _derivative_store = DerivativeStore(DERIVATIVE_ROOT)
+    return _derivative_store
+
+
+def _series():
+    global _series_store
+    if _series_store is None:
+        from timeseries import SeriesStore     # 依赖 numpy，只在处理 timeseries 时导入
+        _series_store = SeriesStore(os.path.join(UPLOAD_ROOT, ".series"))
+    return _series_store
+
+
+def purge_derived(abs_path):
+    """
+    源文件删除前清理它的派生图和时间序列导入结果（没有接入蓝图的入口删除文件时使用）。
+    Web 进程里调用，派生图直接按目录删除，不创建 DerivativeStore 的线程池
+    """
+    purge_derivatives(DERIVATIVE_ROOT, abs_path)
+    _series().purge(abs_path)
+
+
+def _source(payload):
+    abs_path = os.path.normpath(os.path.join(os.getcwd(), payload["filePath"]))
+    if not os.path.exists(abs_path):
+        # 示例数据的 file_path 没有 uploaded_files/ 前缀
+        abs_path = os.path.normpath(os.path.join(UPLOAD_ROOT, payload["filePath"]))
+    if not os.path.exists(abs_path):
+        # 记录和文件可能已被删除
+        raise PermanentJobError(f"file {payload['filePath']} no longer exists")
+    return abs_path
+
+
+def enqueue_postprocess(conn, data_id, file_path, modality):
+    """写入上传后处理任务（不提交），返回任务 id 列表"""
+    kinds = POSTPROCESS_TASKS.get(modality, [])
+    if not kinds:
+        return []
+    if not has_table(conn, "background_jobs"):
+        logger.warning("background_jobs table missing (run python -m migrations); "
+                       "post-processing for %s skipped.", data_id)
+        return []
+    payload = {"id": data_id, "filePath": file_path, "modality": modality}
+    return [enqueue(conn, kind, payload, commit=False) for kind in kinds]
+
+
+@handler("multimodal.derivatives")
+def generate_derivatives(payload):
+    abs_path = _source(payload)
+    store = _derivatives()
+    generated = {}
+    for variant in VARIANTS:
+        try:
+            path = store.get(abs_path, payload["modality"], variant, wait=None)
+        except DerivativeError as e:
+            if e.status in (415, 501):
+                raise PermanentJobError(str(e))
+            raise
+        generated[variant] = os.path.relpath(path, os.getcwd()).replace("\\", "/")
+    return generated
+
+
+@handler("timeseries.ingest")
+def ingest_timeseries(payload):
+    from timeseries import SeriesError
+    try:
+        return _series().ingest(_source(payload))
+    except SeriesError as e:
+        # CSV 格式问题，重试也不会成功
+        raise PermanentJobError(str(e))
+
+
+@handler("text.extract")
+def extract_text(payload):
+    from db_utils import get_connection
+    from text_extract import ExtractError, extract_record
+
+    abs_path = _source(payload)
+    conn = get_connection()
+    try:
+        return extract_record(conn, payload["id"], abs_path)
+    except ExtractError as e:
+        # 不支持的格式 / 缺少抽取工具
+        raise PermanentJobError(str(e))
+    finally:
+        conn.close()
+
+
+def enqueue_backfill(conn, modality):
+    """为某个模态的全部已有记录写入上传后处理任务，返回任务数"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT id, file_path FROM multimodal_data "
+            "WHERE modality = %s AND file_path IS NOT NULL ORDER BY id",
+            (modality,),
+        )
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    count = 0
+    for data_id, file_path in rows:
+        count += len(enqueue_postprocess(conn, data_id, file_path, modality))
+    conn.commit()
+    return count
+
+
+if __name__ == "__main__":
+    from db_utils import get_connection
+
+    parser = argparse.ArgumentParser(description="MedData Hub background tasks")
+    parser.add_argument("--backfill", metavar="MODALITY", required=True,
+                        choices=sorted(POSTPROCESS_TASKS),
+                        help="为该模态的已有记录补做上传后处理")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        ensure_schema(conn)
+        print(f"queued {enqueue_backfill(conn, args.backfill)} jobs")
+    finally:
+        conn.close()
@@ -0,0 +1,100 @@
+# test_blob_store.py
+import hashlib
+import io
+import os
+
+import pytest
+
+from blob_store import BlobStore, blob_lock, file_format_of, lock_name, modality_dir_for, reference_count
+from derivatives import purge_derivatives
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._row = None
+
+    def execute(self, sql, params):
+        self.conn.statements.append(sql.split("(")[0])
+        self._row = (self.conn.lock_result if "GET_LOCK" in sql else self.conn.count,)
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, lock_result=1, count=0):
+        self.lock_result = lock_result
+        self.count = count
+        self.statements = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path))
+
+
+def test_spool_and_ingest_dedupes_by_content(store):
+    data = b"same bytes"
+    sha256 = hashlib.sha256(data).hexdigest()
+    first, digest = store.spool(io.BytesIO(data))
+    assert digest == sha256
+    dest, created = store.ingest_file(first, sha256, "image", "png")
+    assert created and not os.path.exists(first)
+    assert dest.endswith(os.path.join("image", "blobs", sha256[:2], sha256[2:4], sha256 + ".png"))
+
+    # 相同内容再传一次：不移动，临时文件留给调用方提交后删除
+    second, _ = store.spool(io.BytesIO(data))
+    assert store.ingest_file(second, sha256, "image", "png") == (dest, False)
+    assert os.path.exists(second)
+
+
+def test_restore_moves_new_blob_back(store):
+    tmp, sha256 = store.spool(io.BytesIO(b"x"))
+    dest, _ = store.ingest_file(tmp, sha256, "other")
+    store.restore(dest, tmp)
+    assert os.path.exists(tmp) and not os.path.exists(dest)
+
+
+def test_path_helpers():
+    assert modality_dir_for("image") == "image"
+    assert modality_dir_for("hologram") == "other"
+    assert file_format_of("心理咨询录音.MP3") == "mp3"
+    assert file_format_of("noext") is None
+    assert file_format_of(None) is None
+    assert lock_name("a") == lock_name("a") != lock_name("b")
+
+
+def test_blob_lock_releases_after_block():
+    conn = _Conn()
+    with blob_lock(conn, "uploaded_files/image/x.png"):
+        assert conn.statements == ["SELECT GET_LOCK"]
+    assert conn.statements == ["SELECT GET_LOCK", "SELECT RELEASE_LOCK"]
+
+
+def test_blob_lock_timeout():
+    with pytest.raises(TimeoutError):
+        with blob_lock(_Conn(lock_result=0), "k"):
+            pass
+
+
+def test_reference_count():
+    assert reference_count(_Conn(count=2), "uploaded_files/image/x.png") == 2
+
+
+def test_purge_derivatives_only_removes_that_source(tmp_path):
+    key, other = "a" * 64, "b" * 64
+    for name in (f"{key}_thumb_256.jpg", f"{key}_preview_1024.jpg"):
+        (tmp_path / key[:2]).mkdir(exist_ok=True)
+        (tmp_path / key[:2] / name).write_bytes(b"jpg")
+    (tmp_path / other[:2]).mkdir()
+    (tmp_path / other[:2] / f"{other}_thumb_256.jpg").write_bytes(b"jpg")
+    purge_derivatives(str(tmp_path), f"/uploads/image/{key}.png")
+    assert list((tmp_path / key[:2]).iterdir()) == []
+    assert (tmp_path / other[:2] / f"{other}_thumb_256.jpg").exists()
@@ -0,0 +1,63 @@
+# test_bulk.py
+from bulk import insert_many, summarize
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, sql, rows):
+        self.conn.batches.append(list(rows))
+        if any(row[0] in self.conn.bad for row in rows):
+            raise ValueError("duplicate key")
+
+    def execute(self, sql, params=None):
+        if params is None:
+            self.conn.statements.append(sql)
+        elif params[0] in self.conn.bad:
+            raise ValueError(f"duplicate key {params[0]}")
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.batches = []
+        self.statements = []
+        self.commits = self.rollbacks = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_clean_rows_go_in_one_batch_per_chunk():
+    conn = _Conn()
+    results = insert_many(conn, "INSERT", [(i,) for i in range(5)], chunk_size=2)
+    assert results == [(True, None)] * 5
+    assert [len(b) for b in conn.batches] == [2, 2, 1]
+    assert conn.commits == 3 and conn.statements == []
+
+
+def test_bad_row_only_fails_itself():
+    conn = _Conn(bad={3})
+    results = insert_many(conn, "INSERT", [(i,) for i in range(5)], chunk_size=2)
+    assert [ok for ok, _ in results] == [True, True, True, False, True]
+    assert results[3][1] == "duplicate key 3"
+    assert conn.rollbacks == 1
+    # 只有出错的那一块逐行重试，每行一个 SAVEPOINT
+    assert conn.statements == ["SAVEPOINT bulk_row", "RELEASE SAVEPOINT bulk_row",
+                               "SAVEPOINT bulk_row", "ROLLBACK TO SAVEPOINT bulk_row"]
+
+
+def test_summarize():
+    summary = summarize([(True, None), (False, "boom")], ["a", "b"])
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (2, 1, 1)
+    assert summary["results"][1] == {"index": 1, "id": "b", "success": False, "message": "boom"}
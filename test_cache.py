@@ -0,0 +1,62 @@
+# test_cache.py
+import pickle
+
+from cache import LocalBackend, LocalStandInClient, ReadThroughCache, SharedBackend
+
+
+class _Loader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def _check_read_through(cache):
+    loader = _Loader(["内科"])
+    assert cache.get_or_load("departments", "all", loader) == ["内科"]
+    assert cache.get_or_load("departments", "all", loader) == ["内科"]
+    assert loader.calls == 1
+
+    cache.invalidate("departments")
+    loader.value = ["内科", "外科"]
+    assert cache.get_or_load("departments", "all", loader) == ["内科", "外科"]
+    assert loader.calls == 2
+    assert cache.stats()["departments"] == {"hits": 1, "misses": 2, "invalidations": 1}
+
+
+def test_read_through_local():
+    _check_read_through(ReadThroughCache(LocalBackend()))
+
+
+def test_read_through_shared():
+    _check_read_through(ReadThroughCache(SharedBackend(LocalStandInClient())))
+
+
+def test_shared_backend_invalidation_visible_to_other_process():
+    # 两个进程各自的 ReadThroughCache 共用同一个后端：一边失效，另一边立即读到新代号
+    client = LocalStandInClient()
+    a = ReadThroughCache(SharedBackend(client))
+    b = ReadThroughCache(SharedBackend(client))
+    a.get_or_load("doctors", "all", _Loader(1))
+    b.invalidate("doctors")
+    assert a.get_or_load("doctors", "all", _Loader(2)) == 2
+
+
+def test_local_backend_lru_eviction():
+    backend = LocalBackend(max_entries=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+    assert backend.get("b") != 2     # 最久未用的 b 被淘汰
+
+
+def test_shared_backend_stores_pickled_values():
+    client = LocalStandInClient()
+    SharedBackend(client, prefix="p:").set("k", {"x": 1}, ttl=60)
+    assert pickle.loads(client.get("p:k")) == {"x": 1}
@@ -0,0 +1,59 @@
+# test_conditional.py
+import pytest
+
+pytest.importorskip("flask")
+
+from conditional import etag_matches, table_version, version_etag, version_sql
+
+
+class _Cursor:
+    def __init__(self, row):
+        self.row = row
+        self.executed = None
+
+    def execute(self, sql, params):
+        self.executed = (sql, params)
+
+    def fetchone(self):
+        return self.row
+
+
+class _ETags:
+    def __init__(self, *tags):
+        self.tags = tags
+
+    def __bool__(self):
+        return bool(self.tags)
+
+    def contains_weak(self, etag):
+        return etag in self.tags
+
+
+class _Request:
+    def __init__(self, *tags):
+        self.if_none_match = _ETags(*tags)
+
+
+def test_version_sql_with_and_without_timestamp():
+    assert version_sql("t", " WHERE 1=1") == "SELECT COUNT(*), MAX(id) FROM t WHERE 1=1"
+    assert version_sql("t", "", "updated_at") == "SELECT COUNT(*), MAX(id), MAX(updated_at) FROM t"
+
+
+def test_table_version_returns_tuple():
+    cur = _Cursor([3, "A9"])
+    assert table_version(cur, "appointments", " WHERE status=%s", ["待就诊"]) == (3, "A9")
+    assert cur.executed[1] == ("待就诊",)
+
+
+def test_etag_ignores_arg_order_and_cache_buster():
+    etag = version_etag((3, "A9"), "/api/appointments", [("status", "x"), ("limit", "20")])
+    assert etag == version_etag((3, "A9"), "/api/appointments",
+                                [("limit", "20"), ("_t", "123"), ("status", "x")])
+    assert etag != version_etag((4, "A9"), "/api/appointments", [("status", "x"), ("limit", "20")])
+    assert etag != version_etag((3, "A9"), "/api/multimodal", [("status", "x"), ("limit", "20")])
+
+
+def test_etag_matches():
+    assert etag_matches(_Request("abc"), "abc")
+    assert not etag_matches(_Request("abc"), "def")
+    assert not etag_matches(_Request(), "abc")
@@ -0,0 +1,38 @@
+# test_datagen.py
+import random
+
+import datagen
+
+VOLUMES = dict(datagen.DEFAULT_VOLUMES)
+
+
+def _rows(table, lo, hi, seed=datagen.DEFAULT_SEED, shard=0, base_date=datagen.DEFAULT_BASE_DATE):
+    # 与 datagen._write_shard 相同的种子划分
+    rng = random.Random(f"{seed}:{table}:{shard}")
+    return list(datagen.rows(table, lo, hi, VOLUMES, rng, base_date=base_date))
+
+
+def test_rows_are_reproducible():
+    for table in datagen.TABLES:
+        assert _rows(table, 1, 50) == _rows(table, 1, 50)
+
+
+def test_rows_depend_on_seed_and_base_date():
+    assert _rows("patients", 1, 50) != _rows("patients", 1, 50, seed=1)
+    later = _rows("patients", 1, 50, base_date="2025-06-01")
+    assert [r[-1] for r in later] != [r[-1] for r in _rows("patients", 1, 50)]
+
+
+def test_rows_match_columns_and_date_window():
+    for table in datagen.TABLES:
+        for row in _rows(table, 1, 20):
+            assert len(row) == len(datagen.COLUMNS[table])
+    dates = [r[-1] for r in _rows("medical_records", 1, 500)]
+    assert max(dates) <= datagen.DEFAULT_BASE_DATE
+    assert min(dates) >= "2021-06-01"
+
+
+def test_foreign_keys_within_volumes():
+    valid_patients = {datagen.patient_id(i) for i in range(1, VOLUMES["patients"] + 1)}
+    for row in _rows("medical_records", 1, 200):
+        assert row[1] in valid_patients
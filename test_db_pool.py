@@ -0,0 +1,97 @@
+# test_db_pool.py
+import gc
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeoutError
+
+
+class _Raw:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if self.closed:
+            raise RuntimeError("closed")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def _pool(**kwargs):
+    kwargs.setdefault("min_size", 0)
+    kwargs.setdefault("max_size", 2)
+    kwargs.setdefault("timeout", 0.05)
+    return ConnectionPool(_Raw, **kwargs)
+
+
+def test_exhaustion_times_out():
+    pool = _pool()
+    a, b = pool.get_connection(), pool.get_connection()
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection()
+    stats = pool.stats()
+    assert stats["inUse"] == 2 and stats["timeouts"] == 1
+    a.close()
+    b.close()
+
+
+def test_close_returns_connection_for_reuse():
+    pool = _pool(max_size=1)
+    conn = pool.get_connection()
+    raw = conn._raw
+    conn.close()
+    conn.close()  # 重复 close 不会重复归还
+    stats = pool.stats()
+    assert stats["inUse"] == 0 and stats["idle"] == 1 and stats["created"] == 1
+    assert raw.rollbacks == 1
+    with pool.get_connection() as again:
+        assert again._raw is raw
+    assert pool.stats()["inUse"] == 0
+
+
+def test_with_block_releases_on_exception():
+    pool = _pool()
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            with pool.get_connection():
+                raise ValueError("handler failed")
+    assert pool.stats()["inUse"] == 0
+    pool.get_connection().close()
+
+
+def test_leaked_connection_is_reclaimed_by_finalizer():
+    pool = _pool(max_size=1)
+    conn = pool.get_connection()
+    raw = conn._raw
+    del conn
+    gc.collect()
+    stats = pool.stats()
+    assert stats["inUse"] == 0 and stats["idle"] == 0
+    assert raw.closed
+    pool.get_connection().close()
+
+
+def test_discard_drops_connection():
+    pool = _pool()
+    conn = pool.get_connection()
+    raw = conn._raw
+    conn.discard()
+    assert raw.closed
+    assert pool.stats()["inUse"] == 0 and pool.stats()["broken"] == 1
+
+
+def test_expired_idle_connection_is_recycled():
+    pool = _pool(max_lifetime=0.01)
+    conn = pool.get_connection()
+    first = conn._raw
+    conn.close()
+    time.sleep(0.02)
+    with pool.get_connection() as conn:
+        assert conn._raw is not first
+    assert first.closed and pool.stats()["recycled"] == 1
@@ -0,0 +1,59 @@
+# test_derivatives.py
+import subprocess
+
+import pytest
+
+import derivatives
+from derivatives import DerivativeError, source_key
+
+
+class _FakeFfmpeg:
+    """按 -ss 的值决定结果：fail_at 中的位置报错退出，其余写出一帧"""
+
+    def __init__(self, fail_at):
+        self.fail_at = fail_at
+        self.seeks = []
+
+    def __call__(self, args, **kwargs):
+        seek = args[args.index("-ss") + 1]
+        self.seeks.append(seek)
+        if seek in self.fail_at:
+            return subprocess.CompletedProcess(args, 1, b"", b"Output file is empty")
+        with open(args[-1], "wb") as f:
+            f.write(b"jpg")
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    monkeypatch.setattr(derivatives.shutil, "which", lambda name: "/usr/bin/" + name)
+
+    def install(fail_at):
+        fake = _FakeFfmpeg(fail_at)
+        monkeypatch.setattr(derivatives.subprocess, "run", fake)
+        return fake
+    return install
+
+
+def test_short_video_falls_back_to_first_frame(ffmpeg, tmp_path):
+    fake = ffmpeg(fail_at={"1"})
+    dest = tmp_path / "thumb.jpg"
+    derivatives._render_video("short.mp4", str(dest), 256)
+    assert fake.seeks == ["1", "0"] and dest.read_bytes() == b"jpg"
+
+
+def test_video_frame_at_one_second(ffmpeg, tmp_path):
+    fake = ffmpeg(fail_at=set())
+    derivatives._render_video("long.mp4", str(tmp_path / "thumb.jpg"), 256)
+    assert fake.seeks == ["1"]
+
+
+def test_undecodable_video_reports_ffmpeg_error(ffmpeg, tmp_path):
+    ffmpeg(fail_at={"1", "0"})
+    with pytest.raises(DerivativeError, match="Output file is empty"):
+        derivatives._render_video("broken.mp4", str(tmp_path / "thumb.jpg"), 256)
+
+
+def test_source_key_uses_sha256_file_name():
+    sha256 = "ab" * 32
+    assert source_key(f"/data/image/blobs/ab/ab/{sha256}.png") == sha256
@@ -0,0 +1,55 @@
+# test_downsample.py
+import numpy as np
+import pytest
+
+from downsample import build_pyramid, lttb_indices, minmax_indices, select_indices
+
+
+def test_minmax_keeps_extremes():
+    y = np.sin(np.linspace(0, 20, 10_000))
+    y[1234] = 5.0
+    y[8765] = -5.0
+    idx = minmax_indices(y, 100)
+    assert len(idx) <= 100
+    assert 1234 in idx and 8765 in idx
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_minmax_short_series_skips_nan():
+    y = np.array([1.0, np.nan, 3.0])
+    assert minmax_indices(y, 10).tolist() == [0, 2]
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = np.arange(50_000, dtype=np.float64)
+    y = np.random.default_rng(0).normal(size=len(x))
+    idx = lttb_indices(x, y, 500)
+    assert len(idx) <= 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_select_indices_multichannel_budget():
+    t = np.arange(20_000)
+    rng = np.random.default_rng(1)
+    values = {"a": rng.normal(size=len(t)), "b": rng.normal(size=len(t))}
+    for method in ("lttb", "minmax"):
+        idx = select_indices(t, values, 300, method)
+        assert len(idx) <= 300
+
+
+def test_select_indices_rejects_too_few_points():
+    values = {"a": np.zeros(10), "b": np.zeros(10)}
+    with pytest.raises(ValueError):
+        select_indices(np.arange(10), values, 5)
+    with pytest.raises(ValueError):
+        select_indices(np.arange(10), values, 100, method="mean")
+
+
+def test_build_pyramid_covers_every_bucket():
+    y = np.random.default_rng(2).normal(size=1000)
+    idx = build_pyramid({"a": y}, 16)
+    for start in range(0, 1000, 16):
+        chunk = y[start:start + 16]
+        assert start + int(np.argmax(chunk)) in idx
+        assert start + int(np.argmin(chunk)) in idx
@@ -0,0 +1,46 @@
+# test_file_delivery.py
+from types import SimpleNamespace
+
+from file_delivery import MAX_RANGES, part_header, requested_spans, satisfiable_ranges
+
+
+def _range(*ranges):
+    # werkzeug.datastructures.Range 的子集：ranges 为 [(begin, end)]，end 不含
+    return SimpleNamespace(units="bytes", ranges=list(ranges))
+
+
+def test_satisfiable_ranges_single_and_suffix():
+    assert satisfiable_ranges(_range((0, 100)), 1000) == [(0, 100)]
+    assert satisfiable_ranges(_range((-500, None)), 1000) == [(500, 1000)]
+    assert satisfiable_ranges(_range((-5000, None)), 1000) == [(0, 1000)]
+    assert satisfiable_ranges(_range((900, None)), 1000) == [(900, 1000)]
+
+
+def test_satisfiable_ranges_clamps_and_drops():
+    assert satisfiable_ranges(_range((990, 2000)), 1000) == [(990, 1000)]
+    assert satisfiable_ranges(_range((1000, 1100)), 1000) == []
+
+
+def test_satisfiable_ranges_merges_overlapping_and_adjacent():
+    spans = satisfiable_ranges(_range((50, 100), (0, 60), (100, 120), (500, 600)), 1000)
+    assert spans == [(0, 120), (500, 600)]
+
+
+def _request(rng, if_range_etag=None):
+    return SimpleNamespace(range=rng, if_range=SimpleNamespace(etag=if_range_etag, date=None))
+
+
+def test_requested_spans():
+    assert requested_spans(_request(None), "e", None, 1000) is None
+    assert requested_spans(_request(_range((0, 10))), "e", None, 1000) == [(0, 10)]
+    assert requested_spans(_request(_range((2000, 3000))), "e", None, 1000) == []
+    # If-Range 与当前 ETag 不一致：返回整个文件
+    assert requested_spans(_request(_range((0, 10)), if_range_etag="old"), "e", None, 1000) is None
+    # 区间过多：返回整个文件
+    many = _range(*[(i * 10, i * 10 + 5) for i in range(MAX_RANGES + 1)])
+    assert requested_spans(_request(many), "e", None, 1000) is None
+
+
+def test_part_header():
+    header = part_header(0, 10, 100, "image/png", "b0")
+    assert header == b"\r\n--b0\r\nContent-Type: image/png\r\nContent-Range: bytes 0-9/100\r\n\r\n"
@@ -0,0 +1,106 @@
+# test_job_queue.py
+import json
+
+import pytest
+
+import job_queue
+from job_queue import (JOB_BACKOFF_MAX, PermanentJobError, backoff_delay, claim, enqueue,
+                       retry_job, run_job)
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = 7
+        self.rowcount = conn.rowcount
+
+    def execute(self, sql, params=()):
+        self.conn.executed.append((" ".join(sql.split()), params))
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, rowcount=1):
+        self.rowcount = rowcount
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self, dictionary=False):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    monkeypatch.setattr(job_queue, "HANDLERS", {})
+    return job_queue.HANDLERS
+
+
+def _job(attempts=1, max_attempts=3, kind="demo"):
+    return {"id": 1, "kind": kind, "payload": {"x": 1}, "attempts": attempts, "max_attempts": max_attempts}
+
+
+def test_backoff_grows_and_is_capped():
+    for attempts in range(1, 20):
+        delay = backoff_delay(attempts)
+        full = min(job_queue.JOB_BACKOFF_BASE * 2 ** (attempts - 1), JOB_BACKOFF_MAX)
+        assert full / 2 <= delay <= full
+
+
+def test_enqueue_serializes_payload_and_commits():
+    conn = _Conn()
+    assert enqueue(conn, "demo", {"name": "心电"}) == 7
+    assert json.loads(conn.executed[0][1][1]) == {"name": "心电"}
+    assert conn.commits == 1
+    enqueue(conn, "demo", {}, commit=False)
+    assert conn.commits == 1
+
+
+def test_claim_without_handlers_does_nothing(handlers):
+    conn = _Conn()
+    assert claim(conn, "w1") is None
+    assert conn.executed == []
+
+
+def test_run_job_success(handlers):
+    handlers["demo"] = lambda payload: {"done": payload["x"]}
+    conn = _Conn()
+    assert run_job(conn, _job(), "w1")
+    sql, params = conn.executed[-1]
+    assert "status = 'done'" in sql and params == ('{"done": 1}', 1, "w1")
+
+
+def test_run_job_retries_with_backoff(handlers):
+    def flaky(payload):
+        raise RuntimeError("timeout")
+    handlers["demo"] = flaky
+    conn = _Conn()
+    assert not run_job(conn, _job(attempts=1), "w1")
+    sql, params = conn.executed[-1]
+    assert "status = 'queued'" in sql and params[0] == "RuntimeError: timeout"
+
+
+def _unsupported(payload):
+    raise PermanentJobError("bad format")
+
+
+@pytest.mark.parametrize("job, func", [
+    (_job(attempts=3), lambda payload: 1 / 0),                 # 重试次数用完
+    (_job(attempts=1), _unsupported),
+    (_job(kind="unknown"), None),                              # 没有注册处理函数
+])
+def test_run_job_fails_permanently(handlers, job, func):
+    if func is not None:
+        handlers[job["kind"]] = func
+    conn = _Conn()
+    assert not run_job(conn, job, "w1")
+    assert "status = 'failed'" in conn.executed[-1][0]
+
+
+def test_retry_job_only_failed():
+    assert retry_job(_Conn(rowcount=1), 1)
+    assert not retry_job(_Conn(rowcount=0), 1)
@@ -0,0 +1,25 @@
+# test_metrics.py
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import metrics
+
+
+@pytest.mark.skipif(os.name != "posix", reason="按 pid 判断进程是否存在只在 POSIX 上做")
+def test_other_processes_skip_dead_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    files = {
+        f"{os.getpid()}.json": "self",
+        f"{os.getppid()}.json": "alive",
+        f"{dead.pid}.json": "dead",
+        metrics.ARCHIVE_FILE: "archive",
+    }
+    for name, tag in files.items():
+        (tmp_path / name).write_text(json.dumps({"histograms": {}, "pool": {}, "tag": tag}))
+    assert sorted(o["tag"] for o in metrics._other_processes()) == ["alive", "archive"]
@@ -0,0 +1,36 @@
+# test_pagination.py
+import pytest
+
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, LIMIT_ERROR, parse_page_args, apply_keyset, split_page
+
+
+def test_parse_page_args_defaults():
+    assert parse_page_args({}) == (None, DEFAULT_LIMIT)
+    assert parse_page_args({"after": "", "limit": ""}) == (None, DEFAULT_LIMIT)
+
+
+def test_parse_page_args_caps_limit():
+    assert parse_page_args({"after": "P010", "limit": "20"}) == ("P010", 20)
+    assert parse_page_args({"limit": str(MAX_LIMIT * 10)}) == (None, MAX_LIMIT)
+
+
+@pytest.mark.parametrize("raw", ["0", "-5", "abc", "1.5"])
+def test_parse_page_args_rejects_bad_limit(raw):
+    with pytest.raises(ValueError, match=LIMIT_ERROR):
+        parse_page_args({"limit": raw})
+
+
+def test_apply_keyset():
+    sql, params = apply_keyset("SELECT * FROM t WHERE 1=1", [], None, 10)
+    assert sql == "SELECT * FROM t WHERE 1=1 ORDER BY id LIMIT %s"
+    assert params == [11]   # 多取一行判断是否还有下一页
+
+    sql, params = apply_keyset("SELECT * FROM t WHERE a=%s", ["x"], "P5", 10)
+    assert sql.endswith(" AND id > %s ORDER BY id LIMIT %s")
+    assert params == ["x", "P5", 11]
+
+
+def test_split_page():
+    rows = [{"id": i} for i in range(1, 4)]
+    assert split_page(rows, 3) == (rows, None)
+    assert split_page(rows, 2) == (rows[:2], 2)
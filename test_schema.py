@@ -0,0 +1,52 @@
+# test_schema.py
+import datetime
+
+import schema
+from schema import INSERT_MULTIMODAL_SQL, TableMapper, multimodal_values
+
+
+class _Cursor:
+    def __init__(self, column_names, rows):
+        self.column_names = column_names
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_renames_and_keeps_unlisted_columns():
+    cur = _Cursor(("id", "create_time", "gender"), [(1, "2024-01-01", "F")])
+    assert schema.PATIENTS.fetch_all(cur) == [{"id": 1, "createTime": "2024-01-01", "gender": "F"}]
+
+
+def test_keys_computed_once_per_column_set():
+    mapper = TableMapper("t", {"a_b": "aB"})
+    assert mapper.keys_for(["a_b", "c"]) is mapper.keys_for(("a_b", "c"))
+
+
+def test_appointments_hide_updated_at():
+    columns = ("id", "doctor_id", "status", "updated_at", "create_time")
+    row = ("A1", "D1", "待就诊", datetime.datetime(2024, 1, 1), "2024-01-01 08:00")
+    expected = {"id": "A1", "doctorId": "D1", "status": "待就诊", "createTime": "2024-01-01 08:00"}
+    assert schema.APPOINTMENTS.map_rows(columns, [row]) == [expected]
+    assert schema.APPOINTMENTS.map_row(columns, row) == expected
+
+
+def test_omit_down_to_single_column():
+    mapper = TableMapper("t", omit=("b",))
+    assert mapper.map_rows(("a", "b"), [(1, 2)]) == [{"a": 1}]
+
+
+def test_multimodal_items_post_processing():
+    columns = ("id", "file_path", "created_at")
+    item = schema.MULTIMODAL_ITEMS.map_row(columns, ("M1", "image/x.png", datetime.datetime(2024, 1, 2, 3, 4)))
+    assert item == {"id": "M1", "filePath": "image/x.png", "createdAt": "2024-01-02T03:04:00",
+                    "fileUrl": "/api/multimodal/file/M1"}
+
+
+def test_multimodal_values_source_defaults():
+    fields = {"id": "M1", "modality": "image"}
+    values = multimodal_values(fields.get, "image/x.png", "png")
+    assert len(values) == INSERT_MULTIMODAL_SQL.count("%s")
+    assert values[3:5] == ("Upload", "M1")
+    assert multimodal_values(fields.get, "image/x.png", "png", source_defaults=False)[3:5] == (None, None)
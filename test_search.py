@@ -0,0 +1,83 @@
+# test_search.py
+import pytest
+
+import search
+from search import available_types, has_index, has_table, phrase_matchable, snippet
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params):
+        self.conn.queries += 1
+        self._count = 1 if params[-1] in self.conn.existing else 0
+
+    def fetchone(self):
+        return (self._count,)
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, *existing):
+        self.existing = set(existing)
+        self.queries = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    search.clear_exists_cache()
+    yield
+    search.clear_exists_cache()
+
+
+def test_present_index_is_cached_for_good():
+    conn = _Conn("ft_patients_name")
+    assert has_index(conn, "patients", "ft_patients_name")
+    assert has_index(conn, "patients", "ft_patients_name")
+    assert conn.queries == 1
+
+
+def test_missing_table_is_rechecked_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(search.time, "monotonic", lambda: now[0])
+    conn = _Conn()
+    assert not has_table(conn, "multimodal_text")
+    assert not has_table(conn, "multimodal_text")
+    assert conn.queries == 1
+
+    # 建表后，过了 MISSING_RECHECK 才会重新查到
+    conn.existing.add("multimodal_text")
+    now[0] += search.MISSING_RECHECK + 1
+    assert has_table(conn, "multimodal_text")
+    assert conn.queries == 2
+
+
+def test_available_types_skips_missing_sources():
+    conn = _Conn("ft_patients_name")
+    assert available_types(conn, ["patient", "record", "document"]) == ["patient"]
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("张三", True),
+    ("王", False),           # 短于 ngram 词元
+    ("Bob", True),
+    ("Tom", False),          # 含停用词 "to"
+    ("Anna", False),         # 含停用词 "a"
+    ("Li Ming", False),      # 空格会被分词切开
+    ("张三!", False),
+])
+def test_phrase_matchable(term, expected):
+    assert phrase_matchable(term) is expected
+
+
+def test_snippet_centres_on_query():
+    text = "甲" * 100 + "高血压" + "乙" * 100
+    result = snippet(text, "高血压", width=5)
+    assert result == "…甲甲甲甲甲高血压乙乙乙乙乙…"
+    assert snippet("短文本", "不存在") == "短文本"
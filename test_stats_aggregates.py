@@ -0,0 +1,109 @@
+# test_stats_aggregates.py
+import pytest
+
+import search
+import stats_aggregates
+from stats_aggregates import COUNTER_SQL, apply, apply_deltas, collect, next_month
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        if "information_schema" in sql:
+            self._rows = [(1 if params[0] in self.conn.tables else 0,)]
+        elif sql.lstrip().startswith("SELECT LEFT(f.day, 7)"):
+            self._rows = self.conn.flow_rows
+        else:
+            self._rows = self.conn.day_rows
+
+    def executemany(self, sql, rows):
+        if self.conn.fail:
+            raise RuntimeError("deadlock")
+        self.conn.written.append((sql.split()[2], list(rows)))
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, tables=tuple(COUNTER_SQL), fail=False):
+        self.tables = set(tables)
+        self.fail = fail
+        self.day_rows = []
+        self.flow_rows = []
+        self.written = []
+        self.commits = self.rollbacks = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture(autouse=True)
+def _fresh_table_cache():
+    search.clear_exists_cache()
+    yield
+    search.clear_exists_cache()
+
+
+def test_next_month_wraps_year():
+    assert next_month("2024-01") == "2024-02"
+    assert next_month("2024-12") == "2025-01"
+
+
+def test_collect_builds_daily_monthly_and_flow_deltas():
+    conn = _Conn()
+    conn.day_rows = [("2024-03-05", 2)]
+    conn.flow_rows = [("2024-03", "挂号", "内科", 2)]
+    deltas = collect(conn, "appointments", [1, 2, None], sign=-1)
+    assert deltas["stats_daily"] == {("2024-03-05", "appointments"): -2}
+    assert deltas["stats_monthly"] == {("2024-03", "appointments"): -2}
+    assert deltas["stats_flow"] == {("2024-03", "挂号", "内科"): -2, ("all", "挂号", "内科"): -2}
+
+
+def test_collect_without_ids_reads_nothing():
+    assert collect(_Conn(), "patients", [None]) == {table: {} for table in COUNTER_SQL}
+
+
+def test_apply_deltas_writes_sorted_rows_and_commits():
+    conn = _Conn()
+    apply_deltas(conn, {"stats_daily": {("2024-03-06", "visits"): 1, ("2024-03-05", "visits"): 1,
+                                        ("2024-03-07", "visits"): 0}})
+    assert conn.written == [("stats_daily", [("2024-03-05", "visits", 1), ("2024-03-06", "visits", 1)])]
+    assert conn.commits == 1
+
+
+def test_apply_deltas_skips_when_tables_missing():
+    conn = _Conn(tables=())
+    apply_deltas(conn, {"stats_daily": {("2024-03-05", "visits"): 1}})
+    assert conn.written == [] and conn.commits == 0
+
+
+def test_apply_failure_is_logged_not_raised(caplog):
+    conn = _Conn(fail=True)
+    conn.day_rows = [("2024-03-05", 1)]
+    apply(conn, "patients", [7])
+    assert conn.rollbacks == 1 and conn.commits == 0
+    assert "scheduled refresh" in caplog.text
+
+
+def test_apply_collect_failure_is_logged_not_raised(monkeypatch, caplog):
+    def broken(*args):
+        raise RuntimeError("lost connection")
+    monkeypatch.setattr(stats_aggregates, "collect", broken)
+    apply(_Conn(), "patients", [7])
+    assert "collecting stats deltas" in caplog.text
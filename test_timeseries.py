@@ -0,0 +1,52 @@
+# test_timeseries.py
+import numpy as np
+import pytest
+
+from timeseries import RESAMPLE_MAX_BUCKETS, SeriesError, parse_interval, resample_mean
+
+
+def test_parse_interval():
+    assert parse_interval("500ms") == 500
+    assert parse_interval("1min") == 60_000
+    assert parse_interval("2h") == 7_200_000
+    for bad in ("", "0s", "5m", "1.5s"):
+        with pytest.raises(SeriesError):
+            parse_interval(bad)
+
+
+def test_resample_mean_outputs_only_occupied_buckets():
+    t = np.array([0, 400, 1000, 5000, 5200], dtype=np.int64)
+    values = {"v": np.array([1.0, 3.0, 10.0, 4.0, np.nan])}
+    bucket_t, out = resample_mean(t, values, 1000)
+    assert bucket_t.tolist() == [0, 1000, 5000]
+    assert out["v"].tolist() == [2.0, 10.0, 4.0]
+
+
+def test_resample_mean_drops_buckets_without_data():
+    t = np.array([0, 1000], dtype=np.int64)
+    values = {"a": np.array([np.nan, 1.0]), "b": np.array([np.nan, np.nan])}
+    bucket_t, out = resample_mean(t, values, 1000)
+    assert bucket_t.tolist() == [1000]
+    assert out["a"].tolist() == [1.0]
+    assert np.isnan(out["b"]).all()
+
+
+def test_resample_mean_sparse_window_memory_independent_of_span():
+    # 一年只有两个点，按 1 分钟分桶：只为两个桶分配空间
+    t = np.array([0, 365 * 86_400_000 - 1], dtype=np.int64)
+    bucket_t, out = resample_mean(t, {"v": np.array([1.0, 2.0])}, 60_000)
+    assert len(bucket_t) == 2
+    assert out["v"].tolist() == [1.0, 2.0]
+
+
+def test_resample_mean_rejects_too_many_buckets():
+    t = np.array([0, RESAMPLE_MAX_BUCKETS], dtype=np.int64)
+    with pytest.raises(SeriesError) as e:
+        resample_mean(t, {"v": np.array([1.0, 2.0])}, 1)
+    assert e.value.status == 400
+
+
+def test_resample_mean_empty():
+    t = np.array([], dtype=np.int64)
+    bucket_t, out = resample_mean(t, {"v": np.array([])}, 1000)
+    assert len(bucket_t) == 0
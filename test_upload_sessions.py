@@ -0,0 +1,74 @@
+# test_upload_sessions.py
+import hashlib
+import io
+
+import pytest
+
+from upload_sessions import UploadError, UploadSessionStore, fcntl
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadSessionStore(str(tmp_path))
+
+
+def test_chunks_resume_and_verify(store):
+    upload_id = store.create("a.bin", "other", total_size=10)["uploadId"]
+    assert store.write_chunk(upload_id, 0, io.BytesIO(b"hellX")) == 5
+    # 重传：从更早的位置写入，覆盖其后的旧数据
+    assert store.write_chunk(upload_id, 4, io.BytesIO(b"oworld")) == 10
+    assert store.status(upload_id)["offset"] == 10
+    _, sha256, size, meta = store.verify(upload_id, hashlib.sha256(b"helloworld").hexdigest())
+    assert (size, meta["filename"]) == (10, "a.bin")
+
+
+def test_rejects_gaps_and_oversize(store):
+    upload_id = store.create("a.bin", "other", total_size=4)["uploadId"]
+    with pytest.raises(UploadError) as e:
+        store.write_chunk(upload_id, 1, io.BytesIO(b"x"))
+    assert e.value.status == 409
+    with pytest.raises(UploadError) as e:
+        store.write_chunk(upload_id, 0, io.BytesIO(b"12345"))
+    assert e.value.status == 413
+
+
+def test_verify_checksum_mismatch(store):
+    upload_id = store.create("a.bin", "other")["uploadId"]
+    store.write_chunk(upload_id, 0, io.BytesIO(b"data"))
+    with pytest.raises(UploadError) as e:
+        store.verify(upload_id, "0" * 64)
+    assert e.value.status == 422
+
+
+@pytest.mark.skipif(fcntl is None, reason="flock 需要 fcntl")
+def test_concurrent_writer_gets_409(store):
+    upload_id = store.create("a.bin", "other")["uploadId"]
+    f, _ = store.open_chunk(upload_id, 0)
+    try:
+        with pytest.raises(UploadError) as e:
+            store.write_chunk(upload_id, 0, io.BytesIO(b"x"))
+        assert e.value.status == 409
+    finally:
+        f.close()
+    assert store.write_chunk(upload_id, 0, io.BytesIO(b"x")) == 1
+
+
+@pytest.mark.skipif(fcntl is None, reason="flock 需要 fcntl")
+def test_open_verified_holds_lock_until_closed(store):
+    upload_id = store.create("a.bin", "other")["uploadId"]
+    store.write_chunk(upload_id, 0, io.BytesIO(b"data"))
+    f, path, _, size, _ = store.open_verified(upload_id, hashlib.sha256(b"data").hexdigest())
+    with f:
+        # 校验之后、移入 blob 存储之前，分片不能被改写
+        with pytest.raises(UploadError) as e:
+            store.write_chunk(upload_id, 0, io.BytesIO(b"evil"))
+        assert e.value.status == 409
+    assert size == 4
+    with open(path, "rb") as part:
+        assert part.read() == b"data"
+
+
+def test_invalid_upload_id(store):
+    with pytest.raises(UploadError) as e:
+        store.status("../etc")
+    assert e.value.status == 400
@@ -0,0 +1,265 @@
+# text_extract.py
+"""
+上传文件的文本抽取（pdf / 纯文本类文件 / docx），结果写入旁表 multimodal_text，供全文检索使用。
+
+- pdf ：pdftotext（poppler-utils），没有时用 PyMuPDF，再没有用 pypdf
+- docx：直接解析 word/document.xml（标准库 zipfile）
+- txt / csv / md / json / xml / html / fasta 等：按 utf-8、gb18030 依次尝试解码
+- 增量：每条记录保存源文件 key（sha256，旧路径文件为 路径 + 大小 + 修改时间 的哈希），
+  key 未变的记录不重复抽取；不同记录引用同一文件（去重存储）时直接复用已抽取的文本
+
+上传后由后台任务 text.extract 处理；已有数据批量处理（进程池，按 CPU 核数并行）：
+    python text_extract.py --all [--workers 8] [--force]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html import unescape
+
+from derivatives import source_key
+
+try:
+    import fitz              # PyMuPDF，可选
+except ImportError:
+    fitz = None
+
+try:
+    import pypdf             # 可选
+except ImportError:
+    pypdf = None
+
+EXTRACT_MODALITIES = ("pdf", "text")
+TEXT_FORMATS = {"txt", "csv", "tsv", "md", "json", "xml", "html", "htm", "log", "fasta", "fa", "rtf"}
+MAX_TEXT_CHARS = 2_000_000    # 单个文件最多保存的字符数
+TOOL_TIMEOUT = 120
+
+TEXT_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS multimodal_text (
+        data_id      VARCHAR(50)  NOT NULL PRIMARY KEY,
+        source_key   CHAR(64)     NOT NULL,
+        extractor    VARCHAR(20)  NOT NULL,
+        char_count   INT          NOT NULL,
+        content      LONGTEXT     NOT NULL,
+        extracted_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_text_source (source_key),
+        FULLTEXT INDEX ft_multimodal_text_content (content) WITH PARSER ngram,
+        CONSTRAINT fk_text_multimodal FOREIGN KEY (data_id)
+            REFERENCES multimodal_data (id) ON DELETE CASCADE
+    )
+"""
+
+
+class ExtractError(Exception):
+    pass
+
+
+def ensure_schema(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute(TEXT_TABLE_SQL)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+# ---------- 各格式的抽取 ----------
+
+def _pdf_text(path):
+    if shutil.which("pdftotext"):
+        proc = subprocess.run(["pdftotext", "-enc", "UTF-8", "-layout", path, "-"],
+                              capture_output=True, timeout=TOOL_TIMEOUT)
+        if proc.returncode != 0:
+            raise ExtractError(proc.stderr.decode("utf-8", "replace").strip() or "pdftotext failed")
+        return proc.stdout.decode("utf-8", "replace"), "pdftotext"
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            return "\n".join(page.get_text() for page in doc), "pymupdf"
+    if pypdf is not None:
+        reader = pypdf.PdfReader(path)
+        return "\n".join(page.extract_text() or "" for page in reader.pages), "pypdf"
+    raise ExtractError("no pdf text extractor available (install poppler-utils, PyMuPDF or pypdf)")
+
+
+def _docx_text(path):
+    with zipfile.ZipFile(path) as z:
+        xml = z.read("word/document.xml").decode("utf-8", "replace")
+    xml = re.sub(r"</w:p>", "\n", xml)
+    return unescape(re.sub(r"<[^>]+>", "", xml)), "docx"
+
+
+def _plain_text(path):
+    with open(path, "rb") as f:
+        raw = f.read(MAX_TEXT_CHARS * 4)
+    for encoding in ("utf-8-sig", "gb18030"):
+        try:
+            return raw.decode(encoding), "plain"
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("utf-8", "replace"), "plain"
+
+
+def extract_file(path):
+    """返回 (文本, 抽取器名)；不支持的格式抛 ExtractError"""
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext == "pdf":
+        text, extractor = _pdf_text(path)
+    elif ext == "docx":
+        text, extractor = _docx_text(path)
+    elif ext in TEXT_FORMATS:
+        text, extractor = _plain_text(path)
+    else:
+        raise ExtractError(f"unsupported format: {ext or '(none)'}")
+    # 压缩空白，去掉 pdf 版式带来的大量空格
+    text = re.sub(r"[ \t　]+", " ", text)
+    text = re.sub(r"\n\s*\n+", "\n", text).strip()
+    return text[:MAX_TEXT_CHARS], extractor
+
+
+def _extract_job(data_id, abs_path, key):
+    # 进程池中执行，只做 CPU / IO 工作，不碰数据库
+    text, extractor = extract_file(abs_path)
+    return data_id, key, text, extractor
+
+
+# ---------- 数据库 ----------
+
+def stored_key(conn, data_id):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT source_key FROM multimodal_text WHERE data_id = %s", (data_id,))
+        row = cur.fetchone()
+        return row[0] if row else None
+    finally:
+        cur.close()
+
+
+def reuse_text(conn, data_id, key):
+    """同一文件已被其他记录抽取过时直接复制，返回是否复用成功"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "INSERT INTO multimodal_text (data_id, source_key, extractor, char_count, content) "
+            "SELECT %s, source_key, extractor, char_count, content FROM multimodal_text "
+            "WHERE source_key = %s AND data_id <> %s LIMIT 1 "
+            "ON DUPLICATE KEY UPDATE source_key = VALUES(source_key), extractor = VALUES(extractor), "
+            "char_count = VALUES(char_count), content = VALUES(content)",
+            (data_id, key, data_id),
+        )
+        conn.commit()
+        return cur.rowcount > 0
+    finally:
+        cur.close()
+
+
+def save_text(conn, data_id, key, text, extractor):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "INSERT INTO multimodal_text (data_id, source_key, extractor, char_count, content) "
+            "VALUES (%s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE source_key = VALUES(source_key), extractor = VALUES(extractor), "
+            "char_count = VALUES(char_count), content = VALUES(content)",
+            (data_id, key, extractor, len(text), text),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def extract_record(conn, data_id, abs_path, force=False):
+    """抽取单条记录（后台任务调用），返回结果摘要"""
+    key = source_key(abs_path)
+    if not force and stored_key(conn, data_id) == key:
+        return {"status": "unchanged"}
+    if not force and reuse_text(conn, data_id, key):
+        return {"status": "reused"}
+    text, extractor = extract_file(abs_path)
+    save_text(conn, data_id, key, text, extractor)
+    return {"status": "extracted", "extractor": extractor, "chars": len(text)}
+
+
+def _pending(conn, resolve, force):
+    """需要（重新）抽取的 (data_id, 绝对路径, key) 列表"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT m.id, m.file_path, t.source_key FROM multimodal_data m "
+            "LEFT JOIN multimodal_text t ON t.data_id = m.id "
+            f"WHERE m.modality IN ({', '.join(['%s'] * len(EXTRACT_MODALITIES))}) "
+            "AND m.file_path IS NOT NULL ORDER BY m.id",
+            EXTRACT_MODALITIES,
+        )
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    pending = []
+    for data_id, file_path, old_key in rows:
+        abs_path = resolve(file_path)
+        if abs_path is None:
+            continue
+        key = source_key(abs_path)
+        if force or key != old_key:
+            pending.append((data_id, abs_path, key))
+    return pending
+
+
+def extract_all(conn, resolve, workers=None, force=False, log=print):
+    """批量抽取：进程池并行解析文件，主进程写库；返回 (成功数, 失败数)"""
+    pending = _pending(conn, resolve, force)
+    log(f"{len(pending)} records to extract")
+    done = failed = 0
+    seen = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for data_id, abs_path, key in pending:
+            if key in seen and not force:
+                continue          # 同一文件只抽取一次，结束后复用
+            seen[key] = data_id
+            futures[pool.submit(_extract_job, data_id, abs_path, key)] = data_id
+        for future in as_completed(futures):
+            try:
+                data_id, key, text, extractor = future.result()
+                save_text(conn, data_id, key, text, extractor)
+                done += 1
+            except Exception as e:
+                failed += 1
+                log(f"{futures[future]}: {e}")
+    if not force:
+        for data_id, abs_path, key in pending:
+            if seen.get(key) != data_id and reuse_text(conn, data_id, key):
+                done += 1
+    return done, failed
+
+
+if __name__ == "__main__":
+    from db_utils import get_connection
+
+    parser = argparse.ArgumentParser(description="Extract text from pdf / document uploads")
+    parser.add_argument("--all", action="store_true", help="处理全部 pdf / text 记录（增量）")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，缺省为 CPU 核数")
+    parser.add_argument("--force", action="store_true", help="忽略已抽取结果，全部重新抽取")
+    args = parser.parse_args()
+    if not args.all:
+        parser.error("nothing to do, use --all")
+
+    upload_root = os.path.join(os.getcwd(), "uploaded_files")
+
+    def resolve(file_path):
+        for base in (os.getcwd(), upload_root):
+            path = os.path.normpath(os.path.join(base, file_path))
+            if os.path.exists(path):
+                return path
+        return None
+
+    conn = get_connection()
+    try:
+        ensure_schema(conn)
+        ok_count, failed_count = extract_all(conn, resolve, args.workers, args.force)
+        print(f"extracted {ok_count}, failed {failed_count}")
+    finally:
+        conn.close()
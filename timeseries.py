@@ -0,0 +1,331 @@
+# timeseries.py
+"""
+timeseries 模态（血压 / 血糖 / 体温 CSV）的列式存储与窗口查询。
+
+CSV 第一列（或名为 timestamp / time / date / 时间 / 日期 的列）为时间，其余数值列各为一个通道：
+
+    timestamp,systolic,diastolic
+    2024-01-01 08:00,120,80
+
+导入后存为 <root>/<key[0:2]>/<key>/：
+- t.npy          int64，毫秒时间戳（CSV 中的本地时间按原样记录，不做时区换算），已排序
+- <通道序号>.npy float64，缺失值为 NaN
+- meta.json      列名、行数、起止时间
+key 与派生图相同（源文件 sha256，旧路径文件为 路径 + 大小 + 修改时间 的哈希），源文件变化后自动重新导入。
+查询时用 np.load(mmap_mode="r") 只读映射，按时间二分查找窗口，不需要把整个文件读进内存。
+超长序列另存多级降采样金字塔 pyramid_<桶大小>.npy（见 downsample.py）。
+"""
+
+import csv
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from derivatives import source_key
+from downsample import (LTTB_PRESELECT, PYRAMID_BUCKETS, PYRAMID_MIN_POINTS,
+                        build_pyramid, select_indices)
+
+TIME_COLUMNS = {"timestamp", "time", "datetime", "date", "ts", "时间", "日期"}
+TIME_FORMATS = ("%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y/%m/%d", "%Y%m%d%H%M%S")
+NAT = np.iinfo(np.int64).min   # datetime64('NaT') 的 int64 表示
+SERIES_MAX_POINTS = 5000      # maxPoints 缺省值：窗口内点数超过该值时降采样
+SERIES_MAX_POINTS_LIMIT = 50000
+RESAMPLE_MAX_BUCKETS = 1_000_000   # 重采样窗口 / 桶宽之比的上限
+
+_INTERVAL = re.compile(r"^(\d+)(ms|s|min|h|d)$")
+_INTERVAL_MS = {"ms": 1, "s": 1000, "min": 60_000, "h": 3_600_000, "d": 86_400_000}
+
+
+class SeriesError(Exception):
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- 参数解析 ----------
+
+def parse_interval(value):
+    """"5min" / "1h" / "1d" -> 毫秒"""
+    m = _INTERVAL.match(value or "")
+    if not m or int(m.group(1)) <= 0:
+        raise SeriesError("resample must look like 30s, 5min, 1h or 1d", 400)
+    return int(m.group(1)) * _INTERVAL_MS[m.group(2)]
+
+
+def parse_time_arg(value):
+    """from / to 参数：毫秒时间戳或 ISO 时间（2024-01-01、2024-01-01T08:00）"""
+    if value in (None, ""):
+        return None
+    if re.fullmatch(r"-?\d{10,}", value):
+        return int(value)
+    try:
+        return int(np.datetime64(value, "ms").astype(np.int64))
+    except ValueError:
+        raise SeriesError(f"invalid time: {value}", 400)
+
+
+# ---------- CSV 解析 ----------
+
+def _parse_times(values):
+    # 先整列交给 numpy 解析 ISO 格式（最快），再尝试数字时间戳，最后逐个按常见格式解析
+    try:
+        return np.array(values, dtype="datetime64[ms]").astype(np.int64)
+    except ValueError:
+        pass
+    try:
+        nums = np.array([v or "nan" for v in values], dtype=np.float64)
+    except ValueError:
+        pass
+    else:
+        # 秒级时间戳转毫秒
+        if np.nanmax(np.abs(nums)) < 1e11:
+            nums = nums * 1000
+        return np.where(np.isnan(nums), NAT, nums).astype(np.int64)
+    for fmt in TIME_FORMATS:
+        try:
+            parsed = [datetime.strptime(v, fmt) if v else None for v in values]
+        except ValueError:
+            continue
+        return np.array(parsed, dtype="datetime64[ms]").astype(np.int64)
+    raise SeriesError("could not parse the time column")
+
+
+def _parse_numbers(values):
+    """数值列：空值记为 NaN；含非数字内容时返回 None（该列不作为通道）"""
+    try:
+        return np.array([v if v.strip() else "nan" for v in values], dtype=np.float64)
+    except ValueError:
+        return None
+
+
+def parse_csv(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        rows = [r for r in csv.reader(f, dialect) if any(c.strip() for c in r)]
+    if len(rows) < 2:
+        raise SeriesError("csv has no data rows")
+
+    header = [h.strip() for h in rows[0]]
+    width = len(header)
+    body = [r + [""] * (width - len(r)) if len(r) < width else r[:width] for r in rows[1:]]
+    columns = list(zip(*body))
+
+    time_idx = next((i for i, h in enumerate(header) if h.lower() in TIME_COLUMNS), 0)
+    t = _parse_times([c.strip() for c in columns[time_idx]])
+
+    channels = {}
+    for i, name in enumerate(header):
+        if i == time_idx:
+            continue
+        values = _parse_numbers(columns[i])
+        if values is not None:
+            channels[name or f"col{i}"] = values
+    if not channels:
+        raise SeriesError("csv has no numeric columns")
+
+    # 丢掉时间为空的行
+    valid = t != NAT
+    if not valid.all():
+        t = t[valid]
+        channels = {k: v[valid] for k, v in channels.items()}
+    if len(t) == 0:
+        raise SeriesError("csv has no rows with a valid time")
+
+    order = np.argsort(t, kind="stable")
+    if not np.all(order[:-1] < order[1:]):
+        t = t[order]
+        channels = {k: v[order] for k, v in channels.items()}
+    return t, channels
+
+
+# ---------- 存储 ----------
+
+class Series:
+    def __init__(self, directory, meta):
+        self.meta = meta
+        self.columns = meta["columns"]
+        self.t = np.load(os.path.join(directory, "t.npy"), mmap_mode="r")
+        self.values = {
+            name: np.load(os.path.join(directory, f"{i}.npy"), mmap_mode="r")
+            for i, name in enumerate(self.columns)
+        }
+        self.pyramid = {
+            bucket: np.load(os.path.join(directory, f"pyramid_{bucket}.npy"), mmap_mode="r")
+            for bucket in meta.get("pyramid", [])
+        }
+
+    def _bounds(self, start, end):
+        lo = 0 if start is None else int(np.searchsorted(self.t, start, side="left"))
+        hi = len(self.t) if end is None else int(np.searchsorted(self.t, end, side="right"))
+        return lo, hi
+
+    def window(self, start=None, end=None, columns=None):
+        """[start, end] 闭区间内的 (t, {列: 值})，不复制数据"""
+        lo, hi = self._bounds(start, end)
+        names = columns or self.columns
+        return self.t[lo:hi], {k: self.values[k][lo:hi] for k in names}
+
+    def downsample(self, start=None, end=None, max_points=SERIES_MAX_POINTS,
+                   method="lttb", columns=None):
+        """窗口内降采样到不超过 max_points 个点，返回 (t, {列: 值}, 窗口内原始点数)"""
+        lo, hi = self._bounds(start, end)
+        names = columns or self.columns
+        count = hi - lo
+        if count <= max_points:
+            return self.t[lo:hi], {k: self.values[k][lo:hi] for k in names}, count
+
+        # 从最粗的层级开始，找候选点仍然足够多的一层；都不够时用原始数据
+        idx = None
+        for bucket in sorted(self.pyramid, reverse=True):
+            level = self.pyramid[bucket]
+            a, b = np.searchsorted(level, lo), np.searchsorted(level, hi)
+            if b - a >= max_points * LTTB_PRESELECT:
+                idx = np.asarray(level[a:b])
+                break
+        if idx is None:
+            t = np.asarray(self.t[lo:hi])
+            values = {k: np.asarray(self.values[k][lo:hi]) for k in names}
+        else:
+            t = self.t[idx]
+            values = {k: self.values[k][idx] for k in names}
+
+        picked = select_indices(t, values, max_points, method)
+        return t[picked], {k: v[picked] for k, v in values.items()}, count
+
+
+class SeriesStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def ingest(self, abs_path):
+        """解析 CSV 写入列式存储（已导入过则跳过），返回 meta"""
+        key = source_key(abs_path)
+        directory = self._dir(key)
+        meta_path = os.path.join(directory, "meta.json")
+        with self._lock(key):
+            if os.path.exists(meta_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if meta["count"] > PYRAMID_MIN_POINTS and "pyramid" not in meta:
+                    # 加金字塔之前导入的超长序列：补建
+                    meta = self._add_pyramid(directory, meta)
+                return meta
+
+            t, channels = parse_csv(abs_path)
+            tmp_dir = f"{directory}.{uuid.uuid4().hex}.tmp"
+            os.makedirs(tmp_dir)
+            try:
+                np.save(os.path.join(tmp_dir, "t.npy"), t)
+                for i, values in enumerate(channels.values()):
+                    np.save(os.path.join(tmp_dir, f"{i}.npy"), values)
+                meta = {
+                    "columns": list(channels),
+                    "count": int(len(t)),
+                    "start": int(t[0]),
+                    "end": int(t[-1]),
+                }
+                if len(t) > PYRAMID_MIN_POINTS:
+                    for bucket in PYRAMID_BUCKETS:
+                        np.save(os.path.join(tmp_dir, f"pyramid_{bucket}.npy"),
+                                build_pyramid(channels, bucket))
+                    meta["pyramid"] = list(PYRAMID_BUCKETS)
+                with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                # 整个目录原子换入，另一个进程同时导入时以先完成的为准
+                try:
+                    os.rename(tmp_dir, directory)
+                except OSError:
+                    if not os.path.exists(meta_path):
+                        raise
+            finally:
+                if os.path.exists(tmp_dir):
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+            return meta
+
+    def _add_pyramid(self, directory, meta):
+        values = {
+            name: np.load(os.path.join(directory, f"{i}.npy"), mmap_mode="r")
+            for i, name in enumerate(meta["columns"])
+        }
+        for bucket in PYRAMID_BUCKETS:
+            path = os.path.join(directory, f"pyramid_{bucket}.npy")
+            np.save(path + ".tmp.npy", build_pyramid(values, bucket))
+            os.replace(path + ".tmp.npy", path)
+        meta = dict(meta, pyramid=list(PYRAMID_BUCKETS))
+        meta_path = os.path.join(directory, "meta.json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+        return meta
+
+    def load(self, abs_path):
+        meta = self.ingest(abs_path)
+        return Series(self._dir(source_key(abs_path)), meta)
+
+    def purge(self, abs_path):
+        shutil.rmtree(self._dir(source_key(abs_path)), ignore_errors=True)
+
+
+# ---------- 重采样与输出 ----------
+
+def resample_mean(t, values, step):
+    """
+    按固定时间桶（对齐到 step 的整数倍）取均值，只输出有数据的桶。
+    只给有数据的桶分配空间（np.unique 后对序号做 bincount），内存与点数成正比，与窗口 / 桶宽之比无关；
+    桶数超过 RESAMPLE_MAX_BUCKETS 的请求（如 1 年按 1ms 重采样）没有意义，直接 400
+    """
+    if len(t) == 0:
+        return t, values
+    buckets = np.asarray(t) // step
+    if int(buckets.max()) - int(buckets.min()) >= RESAMPLE_MAX_BUCKETS:
+        raise SeriesError(f"resample interval too small for this window "
+                          f"(more than {RESAMPLE_MAX_BUCKETS} buckets)", 400)
+    occupied, idx = np.unique(buckets, return_inverse=True)
+    idx = idx.reshape(-1)
+    n = len(occupied)
+    any_data = np.zeros(n, dtype=bool)
+    out = {}
+    for name, v in values.items():
+        v = np.asarray(v)
+        ok = ~np.isnan(v)
+        sums = np.bincount(idx[ok], weights=v[ok], minlength=n)
+        counts = np.bincount(idx[ok], minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[name] = np.where(counts > 0, sums / counts, np.nan)
+        any_data |= counts > 0
+    keep = np.flatnonzero(any_data)
+    bucket_t = occupied[keep] * step
+    return bucket_t, {name: v[keep] for name, v in out.items()}
+
+
+def to_json(t, values):
+    iso = np.datetime_as_string(np.asarray(t, dtype="datetime64[ms]"), unit="s")
+    return {
+        "t": iso.tolist(),
+        "values": {
+            # NaN -> null
+            name: [None if x != x else x for x in np.asarray(v, dtype=np.float64).tolist()]
+            for name, v in values.items()
+        },
+    }
@@ -0,0 +1,196 @@
+# upload_sessions.py
+"""
+大文件分片上传（可断点续传）的会话存储。
+
+流程：init -> 多次 PUT 分片（带 offset）-> complete
+- 每个会话在 <root>/<upload_id>.part 中累积数据，元信息存在 <upload_id>.json
+- 分片只能从当前已接收的位置（或更早的位置，用于重传）开始写，不允许留空洞
+- complete 时流式计算 sha256 与客户端给出的值比对，通过后由调用方原子移动到正式目录
+- 超过 SESSION_TTL 未完成的会话在新建会话时顺带清理
+- 写分片与 complete 校验都对 part 文件加非阻塞 flock：同一台机器上跨进程（gunicorn 多 worker、
+  ASGI 异步版本）互斥，同一会话已有请求在写时返回 409，客户端查询 offset 后重试。
+  complete 的锁从计算 sha256 一直持有到移入 blob 存储（open_verified），校验过的内容不会被并发的分片改掉。
+  多台机器共享存储时依赖文件系统对 flock 的支持；Windows 没有 fcntl，不加锁（仅本地开发）
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+
+SESSION_TTL = 24 * 3600               # 未完成会话保留时间（秒）
+MAX_UPLOAD_SIZE = 20 * 1024 ** 3      # 单个文件上限 20GB
+COPY_CHUNK = 1024 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class UploadSessionStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- 内部工具 ----------
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.root, f"{upload_id}.json")
+
+    def part_path(self, upload_id):
+        return os.path.join(self.root, f"{upload_id}.part")
+
+    @staticmethod
+    def _try_lock(f):
+        """对打开的 part 文件加独占锁，文件关闭时释放"""
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError("another request is writing this upload", 409)
+
+    def _load(self, upload_id):
+        # upload_id 由服务端生成，只允许十六进制字符，防止路径穿越
+        if not upload_id or any(c not in "0123456789abcdef" for c in upload_id):
+            raise UploadError("invalid upload id", 400)
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError("upload session not found", 404)
+
+    def _save(self, upload_id, meta):
+        tmp = self._meta_path(upload_id) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._meta_path(upload_id))
+
+    def _received(self, upload_id):
+        try:
+            return os.path.getsize(self.part_path(upload_id))
+        except FileNotFoundError:
+            return 0
+
+    # ---------- 对外接口 ----------
+
+    def create(self, filename, modality, total_size=None, sha256=None):
+        if total_size is not None and (total_size < 0 or total_size > MAX_UPLOAD_SIZE):
+            raise UploadError("totalSize out of range", 413)
+        self.purge_expired()
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "uploadId": upload_id,
+            "filename": filename,
+            "modality": modality,
+            "totalSize": total_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "createdAt": time.time(),
+        }
+        open(self.part_path(upload_id), "wb").close()
+        self._save(upload_id, meta)
+        return meta
+
+    def status(self, upload_id):
+        meta = self._load(upload_id)
+        meta["offset"] = self._received(upload_id)
+        return meta
+
+    def open_chunk(self, upload_id, offset):
+        """
+        加锁打开 part 文件并定位到 offset，返回 (文件, 大小上限)；调用方写完后关闭文件即释放锁。
+        异步版本用它在事件循环外打开文件，再边接收请求体边写
+        """
+        meta = self._load(upload_id)
+        limit = meta["totalSize"] if meta["totalSize"] is not None else MAX_UPLOAD_SIZE
+        f = open(self.part_path(upload_id), "r+b")
+        try:
+            self._try_lock(f)
+            received = os.fstat(f.fileno()).st_size
+            if offset < 0 or offset > received:
+                raise UploadError(f"offset must be between 0 and {received}", 409)
+            f.seek(offset)
+            f.truncate()           # 重传时丢弃 offset 之后的旧数据
+        except BaseException:
+            f.close()
+            raise
+        return f, limit
+
+    def write_chunk(self, upload_id, offset, stream):
+        """从 offset 处写入 stream 的全部内容，返回已接收的总字节数"""
+        f, limit = self.open_chunk(upload_id, offset)
+        with f:
+            written = offset
+            while True:
+                data = stream.read(COPY_CHUNK)
+                if not data:
+                    break
+                written += len(data)
+                if written > limit:
+                    raise UploadError("upload exceeds declared size", 413)
+                f.write(data)
+        return written
+
+    def open_verified(self, upload_id, sha256=None):
+        """
+        加锁打开 part 文件并校验大小与 sha256，返回 (文件, part 文件路径, sha256, size, meta)。
+        调用方移入 blob 存储之后再关闭文件释放锁，校验与移动之间其他请求写不进这个分片
+        """
+        meta = self._load(upload_id)
+        expected = (sha256 or meta["sha256"] or "").lower()
+        if not expected:
+            raise UploadError("sha256 is required to complete an upload", 400)
+        path = self.part_path(upload_id)
+        f = open(path, "rb")
+        try:
+            self._try_lock(f)
+            size = os.fstat(f.fileno()).st_size
+            if meta["totalSize"] is not None and size != meta["totalSize"]:
+                raise UploadError(f"incomplete upload: {size}/{meta['totalSize']} bytes", 409)
+            digest = hashlib.sha256()
+            for data in iter(lambda: f.read(COPY_CHUNK), b""):
+                digest.update(data)
+            actual = digest.hexdigest()
+            if actual != expected:
+                raise UploadError("checksum mismatch", 422)
+        except BaseException:
+            f.close()
+            raise
+        return f, path, actual, size, meta
+
+    def verify(self, upload_id, sha256=None):
+        """只校验不移动：返回 (part 文件路径, sha256, size, meta)，返回时锁已释放"""
+        f, *result = self.open_verified(upload_id, sha256)
+        f.close()
+        return tuple(result)
+
+    def discard(self, upload_id):
+        self._load(upload_id)
+        for path in (self.part_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def purge_expired(self):
+        now = time.time()
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-5]
+            try:
+                # 以最后一次写入分片的时间为准，正在进行的长上传不会被清理
+                last_active = max(os.path.getmtime(os.path.join(self.root, name)),
+                                  os.path.getmtime(self.part_path(upload_id)))
+                if now - last_active > SESSION_TTL:
+                    self.discard(upload_id)
+            except (OSError, UploadError):
+                pass
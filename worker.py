@@ -0,0 +1,100 @@
+# worker.py
+"""
+后台任务 worker。
+
+用法（在项目根目录下运行）：
+    python worker.py                 # 默认 2 个进程
+    python worker.py --workers 4
+    python worker.py --once          # 处理完当前到期的任务后退出（调试 / 定时任务用）
+
+每个进程各自维护连接池；SIGTERM / Ctrl+C 时处理完手上的任务再退出。
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+
+from db_utils import get_connection, close_pool
+from job_queue import claim, ensure_schema, requeue_stale, run_job
+import tasks  # noqa: F401  注册任务处理函数
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0           # 队列为空时的轮询间隔（秒）
+STALE_CHECK_EVERY = 60        # 每处理 / 轮询这么多次检查一次过期租约
+
+
+def _work(index, stop_event, once):
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(processName)s - %(levelname)s - %(message)s")
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # 由主进程统一处理 Ctrl+C
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Worker %s started.", worker_id)
+    ticks = 0
+    try:
+        while not stop_event.is_set():
+            job = None
+            try:
+                conn = get_connection()
+                try:
+                    if ticks % STALE_CHECK_EVERY == 0:
+                        requeued = requeue_stale(conn)
+                        if requeued:
+                            logger.warning("Requeued %d stale jobs.", requeued)
+                    ticks += 1
+                    job = claim(conn, worker_id)
+                    if job is not None:
+                        run_job(conn, job, worker_id)
+                finally:
+                    conn.close()
+            except Exception as e:
+                # 数据库暂时不可用等情况：稍后重试，不退出进程
+                logger.error("Worker %s loop error: %s", worker_id, str(e))
+                stop_event.wait(POLL_INTERVAL * 5)
+                continue
+            if job is None:
+                if once:
+                    break
+                stop_event.wait(POLL_INTERVAL)
+    finally:
+        close_pool()
+        logger.info("Worker %s stopped.", worker_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MedData Hub background job worker")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("MEDHUB_JOB_WORKERS", "2")))
+    parser.add_argument("--once", action="store_true", help="处理完当前任务后退出")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    conn = get_connection()
+    try:
+        ensure_schema(conn)
+    finally:
+        conn.close()
+    close_pool()      # 子进程各自建连接池，不继承父进程的连接
+
+    # spawn：子进程不继承父进程的 socket / 线程
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = ctx.Event()
+    procs = [ctx.Process(target=_work, args=(i, stop_event, args.once), name=f"worker-{i}")
+             for i in range(args.workers)]
+    for p in procs:
+        p.start()
+
+    def stop(signum, frame):
+        logger.info("Stopping workers...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
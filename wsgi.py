@@ -0,0 +1,13 @@
+# wsgi.py
+"""
+生产环境入口（WSGI）：
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+进程数、线程数、回收、优雅退出等见 gunicorn.conf.py；工厂结构的部署用 "app:create_app()" 代替 wsgi:app。
+app.py 注册了多模态蓝图（multimodal.py），文件 Range 下载、分片上传、variant、series 接口都在这个入口上。
+"""
+
+from app import app
+
+application = app